@@ -1,21 +1,54 @@
 import os
+import atexit
 from flask import Flask, render_template
 from dotenv import load_dotenv
 
-from routes.api import api_bp, init_generators
+from routes.api import api_bp, init_generators, init_job_queue, init_storage, shutdown_job_queue
+from utils.log import configure_logging
+from utils.uploads import UploadRequest
 
 load_dotenv()
+configure_logging()
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['AUDIO_FOLDER'] = 'static/audio'
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
+app.config['CHECKPOINT_FOLDER'] = os.getenv('CHECKPOINT_DIR', 'checkpoints')
+# Audio of jobs still synthesizing; share it between gunicorn workers like the job database
+app.config['STREAM_FOLDER'] = os.getenv('STREAM_DIR', 'streams')
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 100)) * 1024 * 1024
+app.config['JOB_DATABASE'] = os.getenv('JOB_DATABASE', 'jobs.db')
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 2))
+app.config['JOB_MAX_PENDING'] = int(os.getenv('JOB_MAX_PENDING', 20))
+# 'threads' runs each job on a worker thread; 'async' runs all jobs on one event loop
+app.config['JOB_MODE'] = os.getenv('JOB_MODE', 'threads')
+# Generated audio is evicted (least recently used first) beyond these limits
+app.config['AUDIO_MAX_MB'] = int(os.getenv('AUDIO_MAX_MB', 2048))
+app.config['AUDIO_MAX_AGE_DAYS'] = float(os.getenv('AUDIO_MAX_AGE_DAYS', 30))
+app.config['UPLOAD_MAX_AGE_HOURS'] = float(os.getenv('UPLOAD_MAX_AGE_HOURS', 24))
+# Checkpoints of unfinished generations kept for resuming retries
+app.config['CHECKPOINT_MAX_AGE_HOURS'] = float(os.getenv('CHECKPOINT_MAX_AGE_HOURS', 72))
+# Requests that may follow one job's growing stream at once; each holds a server thread
+app.config['MAX_STREAM_LISTENERS'] = int(os.getenv('MAX_STREAM_LISTENERS', 2))
+app.config['STORAGE_SWEEP_SECONDS'] = int(os.getenv('STORAGE_SWEEP_SECONDS', 600))
+# /readyz reports unavailable when the audio or upload disk has less free space than this
+app.config['READY_MIN_FREE_MB'] = int(os.getenv('READY_MIN_FREE_MB', 500))
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['AUDIO_FOLDER'], exist_ok=True)
 
-# Initialize generators with API key
+init_storage(app.config['AUDIO_FOLDER'], app.config['UPLOAD_FOLDER'], app.config['CHECKPOINT_FOLDER'],
+             app.config['STREAM_FOLDER'], app.config['AUDIO_MAX_MB'] * 1024 * 1024,
+             app.config['AUDIO_MAX_AGE_DAYS'] * 86400, app.config['UPLOAD_MAX_AGE_HOURS'] * 3600,
+             app.config['CHECKPOINT_MAX_AGE_HOURS'] * 3600, app.config['MAX_STREAM_LISTENERS'],
+             app.config['STORAGE_SWEEP_SECONDS'])
+
+# Initialize generators with API key (the API clients are created on first use)
 init_generators(os.getenv('ANTHROPIC_API_KEY'))
+init_job_queue(app.config['JOB_DATABASE'], app.config['JOB_WORKERS'], app.config['JOB_MAX_PENDING'],
+               app.config['JOB_MODE'])
+atexit.register(shutdown_job_queue)
 
 # Register blueprints
 app.register_blueprint(api_bp)
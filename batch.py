@@ -0,0 +1,293 @@
+"""Generate podcasts for a manifest of URLs and PDFs from the command line.
+
+Each line of the manifest is a JSON object with a `source` (an http(s) URL
+or the path of a PDF file) and optionally an `id`. Items go through three
+stages with separate worker pools, extraction, script writing and TTS, so
+a slow stage never leaves the others idle. Every finished item is appended
+to <output>/results.jsonl with its per-stage timings; items already
+completed there are skipped when the batch is run again, and unfinished
+ones resume from their checkpoints. Checkpoints are kept apart from the web
+app's (in <output>/checkpoints, or BATCH_CHECKPOINT_DIR), since a batch
+item does not take the job queue's single-flight key and would otherwise
+race a web job for the same source. Requests run in the batch admission
+lane, behind interactive web jobs.
+
+Usage: python batch.py manifest.jsonl [--output batch_output] [--extract-workers 4] [--llm-workers 2] [--tts-workers 2]
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from utils.log import configure_logging
+from utils.admission import lane, BATCH
+from utils.audio_utils import TTS_VOICE
+from utils.chapters import ChapterRecorder
+from utils.checkpoints import CheckpointStore
+from utils.content_extractor import extract_pdf_text, extract_web_content, pdf_digest
+from utils.http_fetcher import normalize_url
+from utils.metrics import PROCESSED_CHARACTERS
+from utils.storage import FileStore, write_atomic
+from utils.streaming import iter_segments
+
+logger = logging.getLogger('batch')
+
+STAGES = ('extract', 'script', 'tts')
+
+
+class BatchItem:
+    """One manifest entry and what has happened to it so far."""
+
+    def __init__(self, item_id, source, source_type, source_key):
+        self.id = item_id
+        self.source = source
+        self.source_type = source_type
+        self.source_key = source_key
+        self.content = None
+        self.script = None
+        self.audio = None
+        self.chapters = None
+        self.usage = {}
+        self.timings = {}
+        self.started = None
+
+
+def read_manifest(path):
+    """Return (items, errors) from a JSONL manifest; errors are result records for unusable lines.
+
+    A line whose source (after URL normalization) or id repeats an earlier
+    line's is not run: items for one source would share a checkpoint, and
+    their results would share an id. Repeated sources are recorded as
+    `duplicate`, repeated ids for another source as `invalid`.
+    """
+    items, errors = [], []
+    by_key, by_id = {}, {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                source = entry['source']
+                if re.match(r'^https?://', source):
+                    source_type, source_key = 'URL', f"url:{normalize_url(source)}"
+                elif source.lower().endswith('.pdf'):
+                    source_type, source_key = 'PDF', f"pdf:{pdf_digest(source)}"
+                else:
+                    raise ValueError("source must be an http(s) URL or a .pdf path")
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                errors.append({'id': f"line-{number}", 'status': 'invalid', 'error': str(e)})
+                continue
+            item_id = str(entry.get('id') or hashlib.sha256(source_key.encode()).hexdigest()[:16])
+            if source_key in by_key:
+                errors.append({'id': f"line-{number}", 'status': 'duplicate', 'duplicate_of': by_key[source_key]})
+                continue
+            if item_id in by_id:
+                errors.append({'id': f"line-{number}", 'status': 'invalid',
+                               'error': f"id {item_id} is already used on line {by_id[item_id]}"})
+                continue
+            by_key[source_key], by_id[item_id] = item_id, number
+            items.append(BatchItem(item_id, source, source_type, source_key))
+    return items, errors
+
+
+def completed_ids(results_path, audio_dir):
+    """Ids whose latest record in the results manifest is completed, with the audio still on disk."""
+    latest = {}
+    try:
+        with open(results_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short when the previous run was killed
+                latest[record.get('id')] = record
+    except FileNotFoundError:
+        return set()
+    return {
+        item_id for item_id, record in latest.items()
+        if record.get('status') == 'completed'
+        and os.path.isfile(os.path.join(audio_dir, os.path.basename(record.get('audio', ''))))
+    }
+
+
+class BatchRunner:
+    """Runs items through the extract, script and TTS stages and records each result."""
+
+    def __init__(self, script_gen, audio_gen, output_dir, checkpoint_dir,
+                 extract_workers=4, llm_workers=2, tts_workers=2):
+        self.script_gen = script_gen
+        self.audio_gen = audio_gen
+        self.audio_store = FileStore('batch_audio', os.path.join(output_dir, 'audio'))
+        self.scripts_dir = os.path.join(output_dir, 'scripts')
+        self.results_path = os.path.join(output_dir, 'results.jsonl')
+        self.checkpoints = CheckpointStore(checkpoint_dir)
+        self.workers = {'extract': extract_workers, 'script': llm_workers, 'tts': tts_workers}
+        os.makedirs(self.scripts_dir, exist_ok=True)
+        self._results_lock = threading.Lock()
+        self._remaining = 0
+        self._finished = threading.Condition()
+        self._counts = {}
+
+    def run(self, items):
+        """Process `items` (skipping completed ones) and return {status: count}."""
+        done = completed_ids(self.results_path, self.audio_store.directory)
+        todo = [item for item in items if item.id not in done]
+        self._counts = {'skipped': len(items) - len(todo)}
+        logger.info("Starting batch", extra={'items': len(todo), 'skipped': len(items) - len(todo), **self.workers})
+        if not todo:
+            return self._counts
+
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=stage)
+            for stage, workers in self.workers.items()
+        }
+        self._remaining = len(todo)
+        try:
+            for item in todo:
+                item.started = time.perf_counter()
+                self._submit('extract', item)
+            with self._finished:
+                self._finished.wait_for(lambda: self._remaining == 0)
+        finally:
+            for executor in self._executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+        return self._counts
+
+    def record(self, record):
+        """Append one result record to the results manifest."""
+        with self._results_lock:
+            with open(self.results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def _submit(self, stage, item):
+        self._executors[stage].submit(self._run_stage, stage, item)
+
+    def _run_stage(self, stage, item):
+        started = time.perf_counter()
+        try:
+            with lane(BATCH):
+                getattr(self, f"_{stage}")(item, self.checkpoints.open(item.source_key))
+        except Exception as e:
+            item.timings[stage] = round(time.perf_counter() - started, 3)
+            logger.exception("Batch item failed", extra={'item': item.id, 'stage': stage})
+            self._finish(item, 'failed', error=f"{stage}: {e}")
+            return
+        item.timings[stage] = round(time.perf_counter() - started, 3)
+        next_stage = STAGES.index(stage) + 1
+        if next_stage < len(STAGES):
+            self._submit(STAGES[next_stage], item)
+        else:
+            self._finish(item, 'completed', audio=item.audio, chapters=item.chapters)
+
+    def _extract(self, item, checkpoint):
+        content = checkpoint.get_text('text')
+        if content is None:
+            if item.source_type == 'PDF':
+                content = extract_pdf_text(item.source)
+            else:
+                content = extract_web_content(item.source)
+            PROCESSED_CHARACTERS.inc(len(content or ''), kind='extracted')
+            if not content or len(content.strip()) < 100:
+                raise ValueError('could not extract enough content from this source')
+            checkpoint.set_text('text', content)
+        item.content = content
+
+    def _script(self, item, checkpoint):
+        script = checkpoint.get_text('script')
+        if not script:
+            parts = []
+            with checkpoint.script_writer() as writer:
+                for delta in self.script_gen.stream_podcast_script(item.content, item.usage, writer.resume):
+                    parts.append(delta)
+                    writer.write(delta)
+            script = ''.join(parts).strip()
+            if not script:
+                raise ValueError('no script was generated')
+            writer.finish(script)
+            PROCESSED_CHARACTERS.inc(len(script), kind='script')
+        write_atomic(os.path.join(self.scripts_dir, f"{item.id}.txt"), script.encode('utf-8'))
+        item.script = script
+
+    def _tts(self, item, checkpoint):
+        recorder = ChapterRecorder(TTS_VOICE)
+        audio = self.audio_gen.create_audio_streaming(recorder.segments(iter_segments([item.script])),
+                                                      recorder.on_part(), checkpoint)
+        if not audio:
+            raise ValueError('audio generation failed')
+        filename = self.audio_store.save(audio, '.mp3')
+        item.audio = os.path.join(self.audio_store.directory, filename)
+        chapters = recorder.index(item.script)
+        if chapters:
+            name = os.path.splitext(filename)[0] + '.json'
+            self.audio_store.save_as(name, json.dumps(chapters).encode('utf-8'))
+            item.chapters = os.path.join(self.audio_store.directory, name)
+        checkpoint.discard()
+
+    def _finish(self, item, status, **fields):
+        item.timings['total'] = round(time.perf_counter() - item.started, 3)
+        record = {
+            'id': item.id,
+            'source': item.source,
+            'status': status,
+            **fields,
+            'script': os.path.join(self.scripts_dir, f"{item.id}.txt") if item.script else None,
+            'content_chars': len(item.content or ''),
+            'script_chars': len(item.script or ''),
+            'usage': item.usage,
+            # Seconds per stage; the rest of `total` was spent waiting for a free worker
+            'timings': item.timings,
+            'finished_at': time.time(),
+        }
+        self.record(record)
+        logger.info("Batch item finished", extra={'item': item.id, 'status': status, **item.timings})
+        # Free the text and script; a batch may hold hundreds of items
+        item.content = item.script = None
+        with self._finished:
+            self._counts[status] = self._counts.get(status, 0) + 1
+            self._remaining -= 1
+            self._finished.notify_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest', help='JSONL file with one {"source": ..., "id": ...} object per line')
+    parser.add_argument('--output', default='batch_output', help='directory for audio, scripts and results.jsonl')
+    parser.add_argument('--checkpoints',
+                        help='checkpoint directory (default: BATCH_CHECKPOINT_DIR or <output>/checkpoints); '
+                             'never one a running web app uses')
+    parser.add_argument('--extract-workers', type=int, default=4)
+    parser.add_argument('--llm-workers', type=int, default=2)
+    parser.add_argument('--tts-workers', type=int, default=2)
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure_logging()
+    checkpoints = args.checkpoints or os.getenv('BATCH_CHECKPOINT_DIR') or os.path.join(args.output, 'checkpoints')
+
+    # Imported here so the API clients are only set up for a real run
+    from utils.script_generator import ScriptGenerator
+    from utils.audio_utils import AudioGenerator
+
+    items, errors = read_manifest(args.manifest)
+    runner = BatchRunner(ScriptGenerator(os.getenv('ANTHROPIC_API_KEY')), AudioGenerator(), args.output,
+                         checkpoints, args.extract_workers, args.llm_workers, args.tts_workers)
+    for error in errors:
+        runner.record(error)
+    counts = runner.run(items)
+    for error in errors:
+        counts[error['status']] = counts.get(error['status'], 0) + 1
+    print(json.dumps(counts))
+    return 1 if counts.get('failed') or counts.get('invalid') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
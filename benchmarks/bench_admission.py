@@ -0,0 +1,100 @@
+"""Measure upstream admission control against a fake TTS API that answers 429s.
+
+Runs concurrent TTS jobs against FakeOpenAI with a requests-per-minute
+limit, once with no client-side limit (requests are sent as fast as the
+workers allow and recover only through retries) and once with the
+Limiter set to the provider's limit, and reports 429s, failed jobs and
+wall time. Then floods a limiter with batch-lane requests, adds a few
+interactive ones, and checks that the interactive lane is served first.
+
+Usage: python -m benchmarks.bench_admission [--rpm 120] [--jobs 30] [--chars 20000]
+"""
+import os
+import time
+import argparse
+import threading
+
+# Measure synthesis, not cache hits
+os.environ['CACHE_MAX_MB'] = '0'
+
+from utils.admission import Limiter, lane, BATCH, INTERACTIVE
+from utils.audio_utils import AudioGenerator
+from benchmarks.fake_clients import FakeOpenAI
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def run_jobs(limiter, args):
+    client = FakeOpenAI(latency=args.latency, rpm=args.rpm)
+    generator = AudioGenerator(openai_client=client, max_concurrency=args.concurrency,
+                               max_retries=args.retries, limiter=limiter)
+    script = "This is a sentence of a long podcast script about research. " * (args.chars // 61)
+    results = []
+
+    def job():
+        results.append(generator.create_audio(script) is not None)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=job) for _ in range(args.jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return client, results.count(False), time.perf_counter() - started
+
+
+def run_lanes(rpm, batch, interactive):
+    """Return {lane: [seconds waited]} for a batch backlog joined by a few interactive requests."""
+    limiter = Limiter('lanes', rpm=rpm)
+    # Use up the burst allowance so every request below has to queue
+    for _ in range(rpm):
+        limiter.acquire()
+    waits = {BATCH: [], INTERACTIVE: []}
+
+    def request(name):
+        with lane(name):
+            waits[name].append(limiter.acquire())
+
+    threads = [threading.Thread(target=request, args=(BATCH,)) for _ in range(batch)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    late = [threading.Thread(target=request, args=(INTERACTIVE,)) for _ in range(interactive)]
+    for thread in late:
+        thread.start()
+    for thread in threads + late:
+        thread.join()
+    return waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rpm', type=int, default=120, help="the fake provider's requests per minute")
+    parser.add_argument('--jobs', type=int, default=30, help='concurrent TTS jobs')
+    parser.add_argument('--chars', type=int, default=20000, help='script length per job')
+    parser.add_argument('--concurrency', type=int, default=4, help='TTS calls in flight per job')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    for label, limiter in (('no limit', Limiter('tts-unlimited')),
+                           (f'rpm={args.rpm}', Limiter('tts-limited', rpm=args.rpm))):
+        client, failed, wall = run_jobs(limiter, args)
+        print(f"{label:<10} calls={client.calls:<5} 429s={client.rate_limit.rejected:<5} "
+              f"failed_jobs={failed}/{args.jobs:<4} time={wall:6.2f}s")
+
+    # One request per 0.1s: lane order decides who waits
+    waits = run_lanes(rpm=600, batch=30, interactive=5)
+    for name, values in waits.items():
+        print(f"lane={name:<12} requests={len(values):<3} p50_wait={percentile(values, 0.5):6.2f}s "
+              f"max_wait={max(values):6.2f}s")
+    if max(waits[INTERACTIVE]) >= percentile(waits[BATCH], 0.5):
+        raise SystemExit("Interactive requests were not admitted ahead of the batch backlog")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Check the chapter index of generated audio and compare re-recording one chapter with the whole podcast.
+
+Synthesizes a script with the offline FakeOpenAI client while recording
+the chapter index, then verifies that every chapter's text span, byte
+range and duration match the script and the MP3 frames. Then re-records
+one chapter in another voice, splices it in, checks that only that
+chapter changed, and reports TTS calls and time against synthesizing the
+whole podcast again.
+
+Usage: python -m benchmarks.bench_chapters [--sentences 300] [--latency 0.2] [--chapter 2]
+"""
+import os
+import time
+import argparse
+
+# Every synthesis must reach the fake client, not the local audio cache
+os.environ['CACHE_MAX_MB'] = '0'
+os.environ['OPENAI_TTS_RPM'] = '0'
+
+from utils import mp3
+from utils.audio_utils import AudioGenerator, TTS_VOICE
+from utils.chapters import ChapterRecorder, splice
+from benchmarks.fake_clients import FakeOpenAI, FAKE_SCRIPT_SENTENCES
+from utils.streaming import iter_segments
+
+
+def synthesize(generator, script):
+    """Return (audio, chapters) for `script`."""
+    recorder = ChapterRecorder(TTS_VOICE)
+    audio = generator.create_audio_streaming(recorder.segments(iter_segments([script])), recorder.on_part())
+    return audio, recorder.index(script)
+
+
+def check_index(script, audio, chapters):
+    """Raise SystemExit unless the chapters tile the script and the audio exactly."""
+    problems = []
+    offset, start = chapters[0]['byte_offset'], 0.0
+    for chapter in chapters:
+        text = script[chapter['text_start']:chapter['text_end']]
+        if not text or text != text.strip():
+            problems.append(f"chapter {chapter['index']}: text span does not cover a segment")
+        if chapter['byte_offset'] != offset:
+            problems.append(f"chapter {chapter['index']}: starts at byte {chapter['byte_offset']}, expected {offset}")
+        piece = audio[chapter['byte_offset']:chapter['byte_offset'] + chapter['byte_length']]
+        first, size, seconds = mp3.measure(piece)
+        if first != 0 or size != len(piece):
+            problems.append(f"chapter {chapter['index']}: byte range is not whole MP3 frames")
+        if abs(seconds - chapter['duration']) > 0.001 or abs(start - chapter['start']) > 0.01:
+            problems.append(f"chapter {chapter['index']}: timing does not match its frames")
+        offset += chapter['byte_length']
+        start += seconds
+    if abs(start - mp3.duration(audio)) > 0.01:
+        problems.append("chapter durations do not add up to the audio's duration")
+    if problems:
+        raise SystemExit("Inconsistent chapter index:\n  " + "\n  ".join(problems))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sentences', type=int, default=300, help='script length in sentences')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per fake TTS call')
+    parser.add_argument('--chapter', type=int, default=2, help='chapter to re-record')
+    parser.add_argument('--voice', default='nova')
+    args = parser.parse_args()
+
+    script = ' '.join(FAKE_SCRIPT_SENTENCES[i % len(FAKE_SCRIPT_SENTENCES)] for i in range(args.sentences))
+    client = FakeOpenAI(latency=args.latency)
+    generator = AudioGenerator(openai_client=client)
+
+    started = time.perf_counter()
+    audio, chapters = synthesize(generator, script)
+    full_seconds = time.perf_counter() - started
+    full_calls = client.calls
+    if not chapters:
+        raise SystemExit("No chapter index was recorded")
+    check_index(script, audio, chapters)
+    print(f"{len(chapters)} chapters, {mp3.duration(audio):.1f}s of audio, {len(audio)} bytes: index ok")
+
+    index = min(args.chapter, len(chapters) - 1)
+    chapter = chapters[index]
+    started = time.perf_counter()
+    part = generator.synthesize_segment(script[chapter['text_start']:chapter['text_end']], args.voice)
+    spliced, spliced_chapters = splice(audio, chapters, index, part, args.voice)
+    splice_seconds = time.perf_counter() - started
+    check_index(script, spliced, spliced_chapters)
+
+    for before, after in zip(chapters, spliced_chapters):
+        if before['index'] == index:
+            if after['voice'] != args.voice:
+                raise SystemExit("The re-recorded chapter does not carry its new voice")
+            continue
+        old = audio[before['byte_offset']:before['byte_offset'] + before['byte_length']]
+        new = spliced[after['byte_offset']:after['byte_offset'] + after['byte_length']]
+        if old != new or after['voice'] != before['voice']:
+            raise SystemExit(f"Chapter {before['index']} changed although only chapter {index} was re-recorded")
+    if client.voices[args.voice] != 1:
+        raise SystemExit(f"Expected one TTS call in {args.voice}, got {client.voices[args.voice]}")
+
+    print(f"whole podcast    tts_calls={full_calls:<4} time={full_seconds:6.2f}s")
+    print(f"chapter {index:<8} tts_calls={client.calls - full_calls:<4} time={splice_seconds:6.2f}s "
+          f"(voice {args.voice}, other chapters unchanged)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark the shared text chunker on multi-megabyte inputs.
+
+Times the chunker against the previous `current_chunk + sentence`
+implementation on random documents (ordinary prose, abbreviations,
+newlines, ?/!, and oversized sentences). Its invariants are checked by
+tests/test_text_chunker.py.
+
+Usage: python -m benchmarks.bench_chunker [--mb 1 4]
+"""
+import time
+import random
+import argparse
+
+from utils.text_chunker import iter_chunks
+
+PIECES = [
+    "The model was trained on a large corpus", "Dr. Smith et al. reported similar results",
+    "Is this really the case?", "Yes!", "See Fig. 3 for details", "Costs rose 4.5% in the U.S. last year",
+    "\n\nA new paragraph starts here", "It works, e.g. for images and text", "J. R. R. Tolkien wrote it",
+]
+
+
+def old_chunk_text(text, max_length=4500):
+    """AudioGenerator._chunk_text before the shared chunker."""
+    if len(text) <= max_length:
+        return [text]
+
+    chunks = []
+    sentences = text.split('. ')
+    current_chunk = ""
+
+    for sentence in sentences:
+        if len(current_chunk + sentence) > max_length and current_chunk:
+            chunks.append(current_chunk.strip() + '.')
+            current_chunk = sentence
+        else:
+            current_chunk += sentence + '. ' if current_chunk else sentence
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+def random_document(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.01:
+            piece = ' '.join(rng.choice(PIECES) for _ in range(rng.randint(50, 400)))  # run-on sentence
+        elif rng.random() < 0.002:
+            piece = 'x' * rng.randint(100, 9000)  # unbroken blob
+        else:
+            piece = rng.choice(PIECES) + rng.choice(['. ', '? ', '! ', '.\n', '. '])
+        parts.append(piece)
+        length += len(piece)
+    return ''.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mb', type=float, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+
+    for mb in args.mb:
+        text = random_document(rng, int(mb * 1e6))
+        for label, func in (('old split+concat', lambda: old_chunk_text(text, 4000)),
+                            ('shared chunker', lambda: list(iter_chunks(text, max_chars=4000)))):
+            start = time.perf_counter()
+            chunks = func()
+            elapsed = time.perf_counter() - start
+            print(f"{mb:g} MB  {label:<17} {elapsed * 1000:8.1f} ms  {len(chunks):>5} chunks  "
+                  f"longest {max(map(len, chunks))} chars")
+
+
+if __name__ == '__main__':
+    main()
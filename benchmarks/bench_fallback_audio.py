@@ -0,0 +1,58 @@
+"""Micro-benchmark of the fallback WAV synthesizer against the old per-sample loop.
+
+Usage: python -m benchmarks.bench_fallback_audio [--words 500 5000]
+"""
+import math
+import time
+import struct
+import argparse
+
+from utils.audio_utils import AudioGenerator
+
+
+def per_sample_loop(text):
+    """The fallback AudioGenerator used before: capped at 30s, one struct.pack per sample."""
+    duration = min(30, max(5, len(text) // 100))
+    sample_rate = 22050
+    samples = duration * sample_rate
+
+    audio_data = bytearray()
+    for i in range(samples):
+        sample = int(16000 * math.sin(2 * math.pi * 440 * i / sample_rate))
+        audio_data.extend(struct.pack('<h', sample))
+
+    header = struct.pack('<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + len(audio_data), b'WAVE', b'fmt ', 16,
+        1, 1, sample_rate, sample_rate * 2, 2, 16, b'data', len(audio_data))
+    return header + audio_data
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, nargs='+', default=[500, 5000])
+    args = parser.parse_args()
+
+    generator = AudioGenerator(openai_client=object())
+    for words in args.words:
+        text = ' '.join(['word'] * words)
+        elapsed, old = timed(lambda: per_sample_loop(text), repeat=1)
+        seconds = (len(old) - 44) / 44100
+        print(f"{words} words  old loop:   {elapsed * 1000:8.1f} ms for {seconds:6.1f}s of audio "
+              f"({seconds / elapsed:8.0f}x real time)")
+        elapsed, new = timed(lambda: generator._fallback_audio(text))
+        seconds = (len(new) - 44) / 44100
+        print(f"{words} words  bulk write: {elapsed * 1000:8.1f} ms for {seconds:6.1f}s of audio "
+              f"({seconds / elapsed:8.0f}x real time)")
+
+
+if __name__ == '__main__':
+    main()
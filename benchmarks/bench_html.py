@@ -0,0 +1,82 @@
+"""Throughput of the lxml HTML extractor against the BeautifulSoup one.
+
+Runs over every .html file in --corpus, or over generated article pages
+with deeply nested divs when no corpus is given. Also reports how much of
+each backend's output the other one covers; tests/test_html_extractor.py
+checks their parity.
+
+Usage: python -m benchmarks.bench_html [--corpus DIR] [--pages 20]
+"""
+import os
+import time
+import random
+import argparse
+
+from utils.content_extractor import parse_html_content
+
+WORDS = ("model data results training network analysis method study performance "
+         "learning evaluation benchmark research accuracy system approach").split()
+
+
+def sentence(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + '.'
+
+
+def make_page(rng, sections=40, depth=8):
+    """An article page with navigation, scripts and paragraphs wrapped in nested divs."""
+    body = []
+    for number in range(sections):
+        inner = f"<h2>Section {number}</h2>" + ''.join(f"<p>{sentence(rng)} {sentence(rng)}</p>" for _ in range(4))
+        inner += "<ul>" + ''.join(f"<li>{sentence(rng)}</li>" for _ in range(3)) + "</ul>"
+        for _ in range(depth):
+            inner = f"<div class='block'>{inner}</div>"
+        body.append(inner)
+    return (
+        "<html><head><script>var tracking = 1;</script><style>p {}</style></head><body>"
+        "<header><nav><a href='/'>Home</a></nav></header>"
+        f"<div id='page'><article>{''.join(body)}</article></div>"
+        "<footer>Subscribe to our newsletter</footer></body></html>"
+    )
+
+
+def load_corpus(directory):
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+
+def coverage(text, reference):
+    """Fraction of the distinct words in `text` that also appear in `reference`."""
+    words = set(text.split())
+    return len(words & set(reference.split())) / len(words) if words else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', help='directory of saved .html pages')
+    parser.add_argument('--pages', type=int, default=20, help='generated pages when no corpus is given')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = load_corpus(args.corpus) if args.corpus else [make_page(rng) for _ in range(args.pages)]
+    total_mb = sum(len(page) for page in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB of HTML")
+
+    outputs = {}
+    for backend in ('bs4', 'lxml'):
+        start = time.perf_counter()
+        outputs[backend] = [parse_html_content(page, backend=backend) for page in pages]
+        elapsed = time.perf_counter() - start
+        chars = sum(map(len, outputs[backend]))
+        print(f"  {backend:<5} {elapsed * 1000:8.1f} ms  {total_mb / elapsed:6.2f} MB/s  {chars:>9} chars out")
+
+    lxml_in_bs4 = min(coverage(a, b) for a, b in zip(outputs['lxml'], outputs['bs4']))
+    bs4_in_lxml = min(coverage(b, a) for a, b in zip(outputs['lxml'], outputs['bs4']))
+    print(f"  word coverage: lxml words in bs4 output {lxml_in_bs4:.1%}, bs4 words in lxml output {bs4_in_lxml:.1%}")
+
+
+if __name__ == '__main__':
+    main()
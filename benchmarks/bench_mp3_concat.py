@@ -0,0 +1,90 @@
+"""Compare in-process MP3 frame concatenation with the previous ffmpeg concat path.
+
+Usage: python -m benchmarks.bench_mp3_concat [--parts 40] [--seconds 240]
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.fake_clients import silent_mp3
+from utils.mp3 import concat_mp3, duration
+
+
+def ffmpeg_concat(audio_parts):
+    """The temp-file + ffmpeg subprocess approach AudioGenerator used before."""
+    temp_files = []
+    for i, part in enumerate(audio_parts):
+        temp_file = tempfile.NamedTemporaryFile(suffix=f'_part_{i}.mp3', delete=False)
+        temp_file.write(part)
+        temp_file.close()
+        temp_files.append(temp_file.name)
+
+    output_file = tempfile.NamedTemporaryFile(suffix='_combined.mp3', delete=False)
+    output_file.close()
+
+    file_list = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
+    for temp_file in temp_files:
+        file_list.write(f"file '{temp_file}'\n")
+    file_list.close()
+
+    try:
+        subprocess.run([
+            'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
+            '-i', file_list.name, '-c', 'copy', output_file.name
+        ], check=True, capture_output=True)
+        with open(output_file.name, 'rb') as f:
+            return f.read()
+    finally:
+        for temp_file in temp_files + [file_list.name, output_file.name]:
+            os.unlink(temp_file)
+
+
+def make_part(seconds):
+    """A TTS-like part: ID3v2 tag, a Xing frame and silent audio frames."""
+    id3 = b'ID3\x04\x00\x00\x00\x00\x00\x17' + bytes(23)
+    audio = silent_mp3(seconds)
+    frame_size = audio.index(b'\xff\xfb', 1)
+    xing = bytearray(audio[:frame_size])
+    xing[4 + 17:4 + 21] = b'Xing'
+    return id3 + bytes(xing) + audio
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts', type=int, default=40)
+    parser.add_argument('--seconds', type=float, default=240, help='audio length of each part')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    parts = [make_part(args.seconds) for _ in range(args.parts)]
+    total_mb = sum(map(len, parts)) / 1e6
+    print(f"{args.parts} parts, {total_mb:.1f} MB, {args.parts * args.seconds / 60:.0f} minutes of audio")
+
+    elapsed, combined = timed(lambda: concat_mp3(parts), args.repeat)
+    print(f"in-process concat: {elapsed * 1000:8.1f} ms  {len(combined) / 1e6:.1f} MB  {duration(combined) / 60:.1f} min")
+
+    with tempfile.TemporaryFile() as out:
+        elapsed, _ = timed(lambda: (out.seek(0), concat_mp3(parts, out)), args.repeat)
+    print(f"in-process to file:{elapsed * 1000:8.1f} ms")
+
+    if shutil.which('ffmpeg'):
+        elapsed, combined = timed(lambda: ffmpeg_concat(parts), args.repeat)
+        print(f"ffmpeg concat:     {elapsed * 1000:8.1f} ms  {len(combined) / 1e6:.1f} MB")
+    else:
+        print("ffmpeg concat:     skipped (ffmpeg not installed)")
+
+
+if __name__ == '__main__':
+    main()
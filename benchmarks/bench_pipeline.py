@@ -0,0 +1,243 @@
+"""End-to-end benchmark of POST /generate with fake Anthropic and OpenAI clients.
+
+Builds a fixture corpus of PDFs (uploaded as files) and HTML pages (served
+from a local HTTP server), pushes every document through /generate and
+/jobs/<id> with the Flask test client, and reports p50/p95 latency, peak
+RSS and throughput per pipeline stage. Stage timings come from the
+`utils.metrics` span log records; RSS is sampled in the background.
+
+Pass --async to run the jobs on the async job loop (JOB_MODE=async), where
+--workers no longer limits how many generations are in flight.
+
+Usage: python -m benchmarks.bench_pipeline [--docs 4] [--workers 2] [--tokens-per-second 200] [--async]
+"""
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Measure the pipeline, not cache hits or rate limits, and keep job state out of the working tree
+WORK_DIR = tempfile.mkdtemp(prefix='bench_pipeline_')
+os.environ['CACHE_MAX_MB'] = '0'
+os.environ['ANTHROPIC_RPM'] = os.environ['OPENAI_TTS_RPM'] = '0'
+os.environ['JOB_DATABASE'] = os.path.join(WORK_DIR, 'jobs.db')
+os.environ['OPENAI_API_KEY'] = ''
+
+from benchmarks.bench_pdf import make_pdf
+from benchmarks.fake_clients import FakeAnthropic, FakeOpenAI, FakeAsyncAnthropic, FakeAsyncOpenAI
+
+PARAGRAPH = (
+    "Engineers at the city transit agency replaced the signalling system on the oldest line last "
+    "spring. Trains now run every four minutes at peak, and delays fell by a third in the first month. "
+)
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>Transit report {number}</title></head>
+<body>
+<nav><a href="/">Home</a> <a href="/news">News</a> <a href="/about">About</a></nav>
+<article><h1>Transit report {number}</h1>{paragraphs}</article>
+<footer>Copyright 2025. All rights reserved.</footer>
+</body></html>
+"""
+
+
+def make_html(number, paragraphs):
+    body = ''.join(f"<p>{PARAGRAPH * 3}</p>" for _ in range(paragraphs))
+    return HTML_TEMPLATE.format(number=number, paragraphs=body).encode()
+
+
+def build_corpus(directory, docs, pdf_pages, html_paragraphs):
+    """Write the fixture documents and return [(kind, name, size_bytes)]."""
+    corpus = []
+    for number in range(docs):
+        name = f"paper_{number}.pdf"
+        data = make_pdf(pdf_pages)
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data)
+        corpus.append(('pdf', name, len(data)))
+
+        name = f"article_{number}.html"
+        data = make_html(number, html_paragraphs)
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(data)
+        corpus.append(('html', name, len(data)))
+    return corpus
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    """Serve `directory` on a free local port and return the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class RssSampler(threading.Thread):
+    """Record (time, rss_bytes) every `interval` seconds until stopped."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append((time.time(), current_rss()))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def peak(self, start, end):
+        inside = [rss for t, rss in self.samples if start <= t <= end]
+        return max(inside) if inside else None
+
+
+class StageRecorder(logging.Handler):
+    """Collect (stage, start, end) from the span records logged by utils.metrics."""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.spans = []
+
+    def emit(self, record):
+        stage = getattr(record, 'stage', None)
+        if stage and hasattr(record, 'duration_ms'):
+            self.spans.append((stage, record.created - record.duration_ms / 1000, record.created))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def submit(client, kind, name, directory, base_url):
+    if kind == 'pdf':
+        with open(os.path.join(directory, name), 'rb') as f:
+            data = {'file': (io.BytesIO(f.read()), name)}
+        response = client.post('/generate', data=data, content_type='multipart/form-data')
+    else:
+        response = client.post('/generate', json={'source': f"{base_url}/{name}"})
+    if response.status_code != 202:
+        raise SystemExit(f"/generate returned {response.status_code} for {name}: {response.get_json()}")
+    return response.get_json()['status_url']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=4, help='documents of each kind (PDF and HTML)')
+    parser.add_argument('--pdf-pages', type=int, default=20)
+    parser.add_argument('--html-paragraphs', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=2, help='job worker threads')
+    parser.add_argument('--tokens-per-second', type=float, default=200)
+    parser.add_argument('--first-token-latency', type=float, default=0.5)
+    parser.add_argument('--output-tokens', type=int, default=1500)
+    parser.add_argument('--tts-latency', type=float, default=0.3)
+    parser.add_argument('--tts-jitter', type=float, default=0.1)
+    parser.add_argument('--async', dest='async_mode', action='store_true', help='use the async job mode')
+    args = parser.parse_args()
+
+    # Imported here so the environment above is in place before the app configures itself
+    from app import app
+    from routes import api
+    from utils.script_generator import ScriptGenerator
+    from utils.audio_utils import AudioGenerator
+    from utils.storage import FileStore
+    from utils.checkpoints import CheckpointStore
+
+    logging.getLogger().setLevel(logging.WARNING)
+    recorder = StageRecorder()
+    metrics_logger = logging.getLogger('utils.metrics')
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.addHandler(recorder)
+    metrics_logger.propagate = False
+
+    fixtures = os.path.join(WORK_DIR, 'fixtures')
+    os.makedirs(fixtures)
+    for folder in ('UPLOAD_FOLDER', 'AUDIO_FOLDER'):
+        app.config[folder] = os.path.join(WORK_DIR, folder.lower())
+        os.makedirs(app.config[folder])
+    api.audio_store = FileStore('audio', app.config['AUDIO_FOLDER'])
+    api.checkpoint_store = CheckpointStore(os.path.join(WORK_DIR, 'checkpoints'))
+    corpus = build_corpus(fixtures, args.docs, args.pdf_pages, args.html_paragraphs)
+    server = serve(fixtures)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    llm_options = dict(tokens_per_second=args.tokens_per_second, first_token_latency=args.first_token_latency,
+                       output_tokens=args.output_tokens)
+    tts_options = dict(latency=args.tts_latency, jitter=args.tts_jitter)
+    if args.async_mode:
+        anthropic_client, openai_client = FakeAsyncAnthropic(**llm_options), FakeAsyncOpenAI(**tts_options)
+        api.script_gen = ScriptGenerator(None, client=FakeAnthropic(**llm_options), async_client=anthropic_client)
+        api.audio_gen = AudioGenerator(openai_client=FakeOpenAI(**tts_options), async_openai_client=openai_client)
+    else:
+        anthropic_client, openai_client = FakeAnthropic(**llm_options), FakeOpenAI(**tts_options)
+        api.script_gen = ScriptGenerator(None, client=anthropic_client)
+        api.audio_gen = AudioGenerator(openai_client=openai_client)
+    mode = 'async' if args.async_mode else 'threads'
+    api.init_job_queue(app.config['JOB_DATABASE'], args.workers, len(corpus), mode)
+
+    sampler = RssSampler()
+    sampler.start()
+    client = app.test_client()
+    started = time.time()
+    pending = {submit(client, kind, name, fixtures, base_url): (kind, name) for kind, name, _ in corpus}
+    jobs = []
+    while pending:
+        for status_url in list(pending):
+            job = client.get(status_url).get_json()
+            if job['status'] in ('completed', 'failed'):
+                kind, name = pending.pop(status_url)
+                jobs.append((kind, name, job))
+                recorder.spans.append((f"job:{kind}", job['created_at'], job['updated_at']))
+        time.sleep(0.05)
+    wall = time.time() - started
+    sampler.stop()
+    server.shutdown()
+
+    failed = [(name, job.get('error')) for _, name, job in jobs if job['status'] != 'completed']
+    input_mb = sum(size for _, _, size in corpus) / 1e6
+    workers = 'async loop' if args.async_mode else f"{args.workers} workers"
+    print(f"{len(jobs)} jobs ({len(failed)} failed) in {wall:.2f}s with {workers}: "
+          f"{len(jobs) / wall:.2f} jobs/s, {input_mb / wall:.3f} MB/s of input, "
+          f"{anthropic_client.calls} LLM calls, {openai_client.calls} TTS calls")
+    for name, error in failed:
+        print(f"  failed: {name}: {error}")
+
+    by_stage = {}
+    for stage, start, end in recorder.spans:
+        by_stage.setdefault(stage, []).append((start, end))
+    print(f"{'stage':<16} {'count':>5} {'p50 ms':>9} {'p95 ms':>9} {'per s':>7} {'peak RSS MB':>12}")
+    for stage, spans in sorted(by_stage.items()):
+        durations = [(end - start) * 1000 for start, end in spans]
+        peaks = [peak for peak in (sampler.peak(start, end) for start, end in spans) if peak]
+        peak_mb = f"{max(peaks) / 1e6:.0f}" if peaks else '-'
+        print(f"{stage:<16} {len(spans):>5} {percentile(durations, 0.5):>9.1f} "
+              f"{percentile(durations, 0.95):>9.1f} {len(spans) / wall:>7.2f} {peak_mb:>12}")
+
+
+if __name__ == '__main__':
+    main()
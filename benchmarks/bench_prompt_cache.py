@@ -0,0 +1,63 @@
+"""Report the prompt cache token accounting of script requests.
+
+Sends repeated script requests for the same and for different documents
+to the offline FakeAnthropic client and prints the usage reported for
+each, with the input cost relative to sending every prompt uncached. The
+request layout itself is checked by tests/test_prompt_cache.py.
+
+Usage: python -m benchmarks.bench_prompt_cache [--docs 2] [--repeats 3] [--doc-chars 40000]
+"""
+import os
+import argparse
+
+# Every request must reach the fake client, not the local script cache
+os.environ['CACHE_MAX_MB'] = '0'
+
+from benchmarks.fake_clients import FakeAnthropic
+from utils.script_generator import ScriptGenerator
+
+# Input token price multipliers for cache writes and reads (5-minute cache)
+CACHE_WRITE_PRICE = 1.25
+CACHE_READ_PRICE = 0.1
+
+SENTENCE = "The committee measured water quality at forty sites along the river every week for two years. "
+
+
+def make_document(number, chars):
+    return f"Report {number}. " + SENTENCE * (chars // len(SENTENCE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=2, help='distinct documents')
+    parser.add_argument('--repeats', type=int, default=3, help='requests per document')
+    parser.add_argument('--doc-chars', type=int, default=40000)
+    args = parser.parse_args()
+
+    client = FakeAnthropic(tokens_per_second=1e6, first_token_latency=0, output_tokens=200)
+    generator = ScriptGenerator(None, client=client)
+
+    print(f"{'doc':>3} {'run':>3} {'input':>7} {'cache_write':>11} {'cache_read':>10} {'relative cost':>13}")
+    totals = {'uncached': 0, 'billed': 0}
+    for number in range(args.docs):
+        document = make_document(number, args.doc_chars)
+        for run in range(args.repeats):
+            usage = {}
+            script = ''.join(generator.stream_podcast_script(document, usage))
+            if not script:
+                raise SystemExit("No script returned")
+
+            written = usage.get('cache_creation_input_tokens') or 0
+            read = usage.get('cache_read_input_tokens') or 0
+            uncached = usage['input_tokens'] + written + read
+            billed = usage['input_tokens'] + written * CACHE_WRITE_PRICE + read * CACHE_READ_PRICE
+            totals['uncached'] += uncached
+            totals['billed'] += billed
+            print(f"{number:>3} {run:>3} {usage['input_tokens']:>7} {written:>11} {read:>10} "
+                  f"{billed / uncached:>13.2f}")
+
+    print(f"input cost {totals['billed'] / totals['uncached']:.2f}x of uncached prompts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Measure how long `import app` takes and how cheap the health probes are.
+
+Imports the app in fresh interpreters (in a scratch directory, so job
+state and storage stay out of the working tree), reports the median
+import time and the slowest top-level imports from `-X importtime`, and
+checks that the PDF, HTML and API client libraries are not loaded until a
+job needs them. Then calls /healthz and /readyz through the Flask test
+client and reports their latency, checking that neither loads those
+libraries or creates an API client.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--probes 2000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use by extraction and the API clients, never at startup
+LAZY_MODULES = ('fitz', 'bs4', 'lxml', 'anthropic', 'openai', 'requests', 'httpx')
+
+IMPORT_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import app
+print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))
+"""
+
+
+def child_env(work_dir):
+    env = dict(os.environ, PYTHONPATH=ROOT, JOB_DATABASE=os.path.join(work_dir, 'jobs.db'),
+               CHECKPOINT_DIR=os.path.join(work_dir, 'checkpoints'), CACHE_DIR=os.path.join(work_dir, 'cache'))
+    # The probes must pass on key configuration alone, without any request
+    env.setdefault('ANTHROPIC_API_KEY', 'sk-ant-placeholder')
+    env.setdefault('OPENAI_API_KEY', 'sk-placeholder')
+    return env
+
+
+def import_once(work_dir):
+    """Import the app in a fresh interpreter; return (seconds, loaded module names)."""
+    output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=work_dir, env=child_env(work_dir),
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['seconds'], set(result['modules'])
+
+
+def slowest_imports(work_dir, count):
+    """Return [(cumulative microseconds, module)] of the slowest imports made directly by the app."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=work_dir,
+                            env=child_env(work_dir), capture_output=True, text=True, check=True).stderr
+    timings, children = [], []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Imports are listed after the imports they made, two more spaces in per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == 'app':
+                timings = children
+            children = []
+    return sorted(timings, reverse=True)[:count]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def probe_latency(work_dir, probes):
+    """Call each probe `probes` times in this process; return {path: ([request seconds], [view seconds])}.
+
+    Request times include the Flask test client; view times are the probe
+    functions alone, called inside one request context.
+    """
+    os.chdir(work_dir)
+    os.environ.update(child_env(work_dir))
+    from app import app as flask_app
+    from routes import api
+
+    client = flask_app.test_client()
+    latencies = {}
+    for path, view in (('/healthz', api.healthz), ('/readyz', api.readyz)):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise SystemExit(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+        timings = []
+        for _ in range(probes):
+            started = time.perf_counter()
+            client.get(path)
+            timings.append(time.perf_counter() - started)
+        view_timings = []
+        with flask_app.test_request_context(path):
+            for _ in range(probes):
+                started = time.perf_counter()
+                view()
+                view_timings.append(time.perf_counter() - started)
+        latencies[path] = (timings, view_timings)
+
+    loaded = sorted(name for name in LAZY_MODULES if name in sys.modules)
+    if loaded:
+        raise SystemExit(f"Probes imported {', '.join(loaded)}")
+    if api.script_gen._client is not None or api.audio_gen._openai_client is not None:
+        raise SystemExit("Probes created an API client")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to import the app in')
+    parser.add_argument('--probes', type=int, default=2000, help='requests per probe endpoint')
+    parser.add_argument('--top', type=int, default=8, help='slowest imports to list')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_startup_')
+    import_once(work_dir)  # warm the bytecode and filesystem caches
+    seconds = []
+    for _ in range(args.runs):
+        elapsed, modules = import_once(work_dir)
+        seconds.append(elapsed)
+    print(f"import app: median={statistics.median(seconds) * 1000:.0f}ms "
+          f"min={min(seconds) * 1000:.0f}ms over {args.runs} runs, {len(modules)} modules loaded")
+    for cumulative, name in slowest_imports(work_dir, args.top):
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+    loaded = sorted(name for name in LAZY_MODULES if name in modules)
+    if loaded:
+        raise SystemExit(f"Loaded at startup: {', '.join(loaded)}")
+
+    for path, (timings, view_timings) in probe_latency(work_dir, args.probes).items():
+        print(f"{path:<9} request p50={percentile(timings, 0.5) * 1e6:5.0f}us p99={percentile(timings, 0.99) * 1e6:5.0f}us  "
+              f"view p50={percentile(view_timings, 0.5) * 1e6:5.0f}us p99={percentile(view_timings, 0.99) * 1e6:5.0f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Measure concurrent TTS chunk synthesis against a fake client with injected latency.
+
+Usage: python -m benchmarks.bench_tts [--latency 0.5] [--chars 60000]
+"""
+import os
+import time
+import argparse
+
+# Measure synthesis, not cache hits
+os.environ['CACHE_MAX_MB'] = '0'
+
+from utils.audio_utils import AudioGenerator
+from benchmarks.fake_clients import FakeOpenAI
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per fake TTS call')
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--chars', type=int, default=60000, help='script length in characters')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    script = "This is a sentence of a long podcast script about research. " * (args.chars // 61)
+
+    baseline = None
+    for concurrency in args.concurrency:
+        client = FakeOpenAI(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+        generator = AudioGenerator(openai_client=client, max_concurrency=concurrency, max_retries=3)
+        start = time.perf_counter()
+        audio = generator.create_audio(script)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"concurrency={concurrency:<3} calls={client.calls:<4} peak_in_flight={client.max_in_flight:<3} "
+              f"time={elapsed:6.2f}s speedup={baseline / elapsed:4.1f}x bytes={len(audio or b'')}")
+
+
+if __name__ == '__main__':
+    main()
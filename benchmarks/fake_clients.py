@@ -0,0 +1,334 @@
+"""Local stand-ins for the paid API clients, used by the benchmarks."""
+import time
+import hashlib
+import random
+import asyncio
+import threading
+from collections import Counter
+
+from utils.admission import TokenBucket
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono, no padding: 417 bytes per frame
+MP3_FRAME_HEADER = b'\xff\xfb\x90\xc4'
+MP3_FRAME_SIZE = 417
+MP3_FRAME_SECONDS = 1152 / 44100
+
+# Shorter prompt prefixes are not cached by the real API either
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def silent_mp3(seconds):
+    """Return a headerless MP3 stream of silent frames lasting about `seconds`."""
+    frame = MP3_FRAME_HEADER + bytes(MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    return frame * max(1, int(seconds / MP3_FRAME_SECONDS))
+
+
+class FakeRateLimitError(Exception):
+    """Raised like the SDKs' RateLimitError: `status_code` 429 and a Retry-After response header."""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.2f}s")
+        self.response = _Response({'retry-after': f"{retry_after:.3f}"})
+
+
+class FakeServerError(Exception):
+    """Raised like the SDKs' InternalServerError: `status_code` 500, safe to retry."""
+
+    status_code = 500
+
+
+class _Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class _RateLimit:
+    """Server-side requests-per-minute limit, enforced with a token bucket like the real APIs."""
+
+    def __init__(self, rpm):
+        self._bucket = TokenBucket(rpm) if rpm else None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self):
+        if not self._bucket:
+            return
+        with self._lock:
+            wait = self._bucket.wait_time(1, time.monotonic())
+            if wait > 0:
+                self.rejected += 1
+                raise FakeRateLimitError(wait)
+            self._bucket.take(1)
+
+
+class _SpeechResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Speech:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, voice, input, response_format="mp3", **kwargs):
+        self._enter(voice)
+        try:
+            self._client.rate_limit.check()
+            time.sleep(self._delay())
+            return self._respond(input)
+        finally:
+            self._exit()
+
+    def _enter(self, voice):
+        client = self._client
+        with client._lock:
+            client.calls += 1
+            client.voices[voice] += 1
+            client.in_flight += 1
+            client.max_in_flight = max(client.max_in_flight, client.in_flight)
+
+    def _exit(self):
+        with self._client._lock:
+            self._client.in_flight -= 1
+
+    def _delay(self):
+        return self._client.latency + random.uniform(0, self._client.jitter)
+
+    def _respond(self, input):
+        if random.random() < self._client.failure_rate:
+            raise FakeServerError("Simulated TTS failure")
+        # Roughly 15 characters of speech per second
+        return _SpeechResponse(silent_mp3(len(input) / 15))
+
+
+class _AsyncSpeech(_Speech):
+    async def create(self, model, voice, input, response_format="mp3", **kwargs):
+        self._enter(voice)
+        try:
+            self._client.rate_limit.check()
+            await asyncio.sleep(self._delay())
+            return self._respond(input)
+        finally:
+            self._exit()
+
+
+class _Audio:
+    def __init__(self, client, speech_class=_Speech):
+        self.speech = speech_class(client)
+
+
+class FakeOpenAI:
+    """Offline replacement for `OpenAI` covering `audio.speech.create`.
+
+    Each call sleeps for `latency` plus up to `jitter` seconds and fails with
+    FakeServerError (a 500) with probability `failure_rate`, so concurrency
+    and retry behaviour can be measured without network access. With `rpm`,
+    calls beyond that many requests per minute are rejected with
+    FakeRateLimitError (a 429).
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, failure_rate=0.0, rpm=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit = _RateLimit(rpm)
+        self.calls = 0
+        self.voices = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.audio = _Audio(self)
+
+
+FAKE_SCRIPT_SENTENCES = (
+    "Welcome back to the show, where we take a close look at a new piece of writing.",
+    "Today's source makes a surprisingly practical argument, so let's walk through it step by step.",
+    "The first thing that stands out is how carefully the authors frame the problem.",
+    "They back it up with a few concrete numbers, and those numbers are worth pausing on.",
+    "Of course, there are limitations, and the text is honest about most of them.",
+    "So what does this mean for you, the listener, in day to day terms?",
+)
+
+
+class _Event:
+    def __init__(self, type, **fields):
+        self.type = type
+        self.__dict__.update(fields)
+
+
+class _Text:
+    def __init__(self, text):
+        self.type = 'text'
+        self.text = text
+
+
+class _Usage:
+    def __init__(self, input_tokens=0, output_tokens=0, cache_creation_input_tokens=None,
+                 cache_read_input_tokens=None):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_creation_input_tokens = cache_creation_input_tokens
+        self.cache_read_input_tokens = cache_read_input_tokens
+
+
+def _prompt_blocks(system, messages):
+    """Flatten a request's system prompt and messages into [(text, has_cache_control)]."""
+    blocks = []
+    for content in [system] + [message['content'] for message in messages]:
+        if isinstance(content, str):
+            blocks.append((content, False))
+        elif content:
+            blocks.extend((block.get('text', ''), 'cache_control' in block) for block in content)
+    return blocks
+
+
+class _Message:
+    def __init__(self, text, usage):
+        self.content = [_Text(text)]
+        self.usage = usage
+
+
+class _Messages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, max_tokens, messages, system=None, stream=False, **kwargs):
+        time.sleep(self._start(model, max_tokens, messages, system, stream, kwargs))
+        return self._respond(max_tokens, system, messages, stream)
+
+    def _start(self, model, max_tokens, messages, system, stream, kwargs):
+        """Record the request and return the delay before the first token."""
+        client = self._client
+        with client._lock:
+            client.calls += 1
+            client.requests.append({'model': model, 'max_tokens': max_tokens, 'system': system,
+                                    'messages': messages, 'stream': stream, **kwargs})
+        client.rate_limit.check()
+        return client.first_token_latency + random.uniform(0, client.jitter)
+
+    def _respond(self, max_tokens, system, messages, stream):
+        client = self._client
+        if random.random() < client.failure_rate:
+            raise FakeServerError("Simulated Anthropic failure")
+        usage = client._prompt_usage(system, messages)
+        output_tokens = min(max_tokens, client.output_tokens)
+        if not stream:
+            usage.output_tokens = output_tokens
+            return _Message(' '.join(client._words(output_tokens)), usage)
+        return self._stream(usage, output_tokens)
+
+    def _stream(self, usage, output_tokens):
+        started = time.perf_counter()
+        for due, event in self._events(usage, output_tokens):
+            delay = started + due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield event
+
+    def _events(self, usage, output_tokens):
+        """Yield (seconds after the first token, event) in the order the real API sends them."""
+        client = self._client
+        usage.output_tokens = 1
+        yield 0, _Event('message_start', message=_Message('', usage))
+        yield 0, _Event('content_block_start', index=0, content_block=_Text(''))
+        # A delta every few tokens, paced to the configured rate
+        words = client._words(output_tokens)
+        per_delta = 5
+        for i in range(0, len(words), per_delta):
+            text = ' '.join(words[i:i + per_delta]) + ' '
+            yield i / client.tokens_per_second, _Event(
+                'content_block_delta', index=0, delta=_Event('text_delta', text=text))
+        done = len(words) / client.tokens_per_second
+        yield done, _Event('content_block_stop', index=0)
+        yield done, _Event('message_delta', delta=_Event('message_delta', stop_reason='end_turn'),
+                           usage=_Usage(None, output_tokens))
+        yield done, _Event('message_stop')
+
+
+class _AsyncMessages(_Messages):
+    async def create(self, model, max_tokens, messages, system=None, stream=False, **kwargs):
+        await asyncio.sleep(self._start(model, max_tokens, messages, system, stream, kwargs))
+        return self._respond(max_tokens, system, messages, stream)
+
+    async def _stream(self, usage, output_tokens):
+        started = time.perf_counter()
+        for due, event in self._events(usage, output_tokens):
+            delay = started + due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield event
+
+
+class FakeAnthropic:
+    """Offline replacement for `anthropic.Anthropic` covering `messages.create`.
+
+    Streaming requests wait `first_token_latency` (plus up to `jitter`)
+    seconds, then emit `output_tokens` tokens of podcast-like prose at
+    `tokens_per_second`, one word per token, with the same event types as
+    the real API. Every request's arguments are kept in `requests`. With
+    `rpm`, requests beyond that many per minute raise FakeRateLimitError.
+
+    Prompt caching is simulated: a prompt prefix ending at a block with
+    `cache_control` is remembered, and later requests starting with it
+    report it as `cache_read_input_tokens`. Tokens are counted as four
+    characters each.
+    """
+
+    def __init__(self, tokens_per_second=80, first_token_latency=1.0, output_tokens=2000,
+                 jitter=0.0, failure_rate=0.0, rpm=None):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.output_tokens = output_tokens
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit = _RateLimit(rpm)
+        self.calls = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self.messages = _Messages(self)
+
+    def _prompt_usage(self, system, messages):
+        """Return the input usage of a prompt, reading and writing the simulated prompt cache."""
+        blocks = _prompt_blocks(system, messages)
+        total = 0
+        digest = hashlib.sha256()
+        breakpoints = []
+        for text, cached in blocks:
+            total += len(text) // 4
+            digest.update(text.encode())
+            if cached and total >= MIN_CACHEABLE_TOKENS:
+                breakpoints.append((total, digest.copy().hexdigest()))
+        if not any(cached for _, cached in blocks):
+            return _Usage(total)
+
+        with self._lock:
+            read = max((tokens for tokens, key in breakpoints if key in self._cached_prefixes), default=0)
+            written = breakpoints[-1][0] - read if breakpoints else 0
+            self._cached_prefixes.update(key for _, key in breakpoints)
+        return _Usage(total - read - max(written, 0), 0, max(written, 0), read)
+
+    def _words(self, count):
+        words = []
+        while len(words) < count:
+            for sentence in FAKE_SCRIPT_SENTENCES:
+                words.extend(sentence.split())
+        return words[:count]
+
+
+class FakeAsyncAnthropic(FakeAnthropic):
+    """FakeAnthropic with the awaitable interface of `anthropic.AsyncAnthropic`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = _AsyncMessages(self)
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    """FakeOpenAI with the awaitable interface of `openai.AsyncOpenAI`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.audio = _Audio(self, _AsyncSpeech)
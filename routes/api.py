@@ -1,81 +1,230 @@
 import os
 import re
-import uuid
-from datetime import datetime
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
+import json
+import shutil
+import time
+import asyncio
+import logging
+from flask import Blueprint, Response, request, jsonify, redirect, send_from_directory, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
 
-from utils.content_extractor import extract_pdf_text, extract_web_content
+from utils.content_extractor import extract_pdf_text, extract_web_content, aextract_web_content, pdf_digest
 from utils.script_generator import ScriptGenerator
-from utils.audio_utils import AudioGenerator
+from utils.audio_utils import AudioGenerator, TTS_VOICE, TTS_VOICES
+from utils.chapters import ChapterRecorder, splice
+from utils.streaming import iter_segments, aiter_segments
+from utils.mp3 import strip_headers
+from utils.progressive import (init_streams, open_stream, get_stream, finish_stream, acquire_listener,
+                               release_listener)
+from utils.cache import get_cache
+from utils.http_fetcher import normalize_url
+from utils.storage import FileStore, CONTENT_NAME, start_sweeper
+from utils.checkpoints import CheckpointStore
+from utils.uploads import upload_source, release_upload
+from utils.job_queue import JobQueue, AsyncJobQueue, JobError, QueueFullError
+from utils.metrics import REGISTRY, PROCESSED_BYTES, PROCESSED_CHARACTERS, span
+
+logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
 
+QUEUE_PENDING = REGISTRY.gauge('narrator_jobs_pending', 'Jobs queued or running in this process')
+QUEUE_WORKERS = REGISTRY.gauge('narrator_job_workers', 'Job worker threads in this process')
+CACHE_BYTES = REGISTRY.gauge('narrator_cache_size_bytes', 'Bytes stored in the disk cache')
+CACHE_HITS = REGISTRY.gauge('narrator_cache_hits', 'Disk cache hits per namespace since start', ('namespace',))
+CACHE_MISSES = REGISTRY.gauge('narrator_cache_misses', 'Disk cache misses per namespace since start', ('namespace',))
+
 # Initialize generators
 script_gen = None
 audio_gen = None
+job_queue = None
+audio_store = None
+checkpoint_store = None
+
+def init_job_queue(db_path, max_workers, max_pending, mode='threads'):
+    """Create the worker pool (or, in 'async' mode, the event loop) that runs generation jobs."""
+    global job_queue
+    queue_class = AsyncJobQueue if mode == 'async' else JobQueue
+    job_queue = queue_class(db_path, max_workers=max_workers, max_pending=max_pending)
+    logger.info("Job queue ready", extra={'mode': mode, 'workers': max_workers, 'max_pending': max_pending})
+
+def shutdown_job_queue():
+    """Stop the job queue taking jobs, so /healthz and /readyz report it down while the process exits."""
+    if job_queue is not None:
+        job_queue.shutdown()
+
+def init_storage(audio_folder, upload_folder, checkpoint_folder, stream_folder, audio_max_bytes, audio_max_age,
+                 upload_max_age, checkpoint_max_age, max_stream_listeners, sweep_interval):
+    """Set up the audio, checkpoint and progressive stream stores and sweep them and the upload folder in the background."""
+    global audio_store, checkpoint_store
+    audio_store = FileStore('audio', audio_folder, max_bytes=audio_max_bytes, max_age=audio_max_age)
+    checkpoint_store = CheckpointStore(checkpoint_folder, max_age=checkpoint_max_age)
+    streams = init_streams(stream_folder, max_stream_listeners)
+    uploads = FileStore('uploads', upload_folder, max_age=upload_max_age)
+    start_sweeper([audio_store, checkpoint_store, streams, uploads], sweep_interval)
 
 def init_generators(anthropic_api_key):
     """Initialize the generators with API keys."""
     global script_gen, audio_gen
     try:
-        print("Initializing script generator...")
         script_gen = ScriptGenerator(anthropic_api_key)
-        print("Initializing audio generator...")
         audio_gen = AudioGenerator()
-        print("Generators initialized successfully")
-        print(f"Script generator: {script_gen is not None}")
-        print(f"Audio generator: {audio_gen is not None}")
-    except Exception as e:
-        print(f"Error initializing generators: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.info("Generators initialized")
+    except Exception:
+        logger.exception("Error initializing generators")
         script_gen = None
         audio_gen = None
 
+def save_audio(audio_data):
+    """Store audio bytes under their content hash and return the URL to serve them from."""
+    with span('disk_write', bytes=len(audio_data)) as fields:
+        filename = audio_store.save(audio_data, '.mp3')
+        fields['file'] = filename
+    PROCESSED_BYTES.inc(len(audio_data), kind='audio')
+    return f"/static/audio/{filename}"
+
 def generate_audio(script):
-    print(f"=== GENERATE AUDIO CALLED ===")
-    print(f"Script length: {len(script)} characters")
-    print(f"Audio generator available: {audio_gen is not None}")
-    
     try:
         if not audio_gen:
-            print("ERROR: Audio generator not initialized")
+            logger.error("Audio generator not initialized")
             return None, "Audio generator not initialized"
         
-        print("Calling audio_gen.create_audio...")
         audio_data = audio_gen.create_audio(script)
-        print(f"Audio data returned: {audio_data is not None}")
-        
         if not audio_data:
-            print("ERROR: No audio data returned")
+            logger.error("No audio data returned", extra={'script_chars': len(script)})
             return None, "Audio generation failed"
         
-        print(f"Audio data size: {len(audio_data)} bytes")
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"podcast_{timestamp}.mp3"
-        filepath = os.path.join(current_app.config['AUDIO_FOLDER'], filename)
-        
-        print(f"Saving audio to: {filepath}")
-        with open(filepath, 'wb') as f:
-            f.write(audio_data)
-        
-        print("Audio file saved successfully")
-        return f"/static/audio/{filename}", None
+        return save_audio(audio_data), None
     except Exception as e:
-        print(f"ERROR in generate_audio: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in generate_audio")
+        return None, str(e)
+
+def generate_audio_streaming(segments, on_part=None, checkpoint=None):
+    """Like generate_audio, but synthesizes script segments as they are produced.
+    
+    Errors raised while producing the segments propagate to the caller.
+    """
+    if not audio_gen:
+        logger.error("Audio generator not initialized")
+        for _ in segments:
+            pass
+        return None, "Audio generator not initialized"
+    
+    audio_data = audio_gen.create_audio_streaming(segments, on_part, checkpoint)
+    if not audio_data:
+        logger.error("No audio data returned")
+        return None, "Audio generation failed"
+    
+    try:
+        return save_audio(audio_data), None
+    except Exception as e:
+        logger.exception("Error saving streamed audio")
+        return None, str(e)
+
+async def agenerate_audio_streaming(segments, on_part=None, checkpoint=None):
+    """Async variant of generate_audio_streaming for an async iterable of segments."""
+    if not audio_gen:
+        logger.error("Audio generator not initialized")
+        async for _ in segments:
+            pass
+        return None, "Audio generator not initialized"
+    
+    audio_data = await audio_gen.acreate_audio_streaming(segments, on_part, checkpoint)
+    if not audio_data:
+        logger.error("No audio data returned")
+        return None, "Audio generation failed"
+    
+    try:
+        return await asyncio.to_thread(save_audio, audio_data), None
+    except Exception as e:
+        logger.exception("Error saving streamed audio")
         return None, str(e)
 
 @api_bp.route('/static/audio/<filename>')
 def serve_audio(filename):
-    """Serve audio files."""
-    return send_from_directory(current_app.config['AUDIO_FOLDER'], filename)
+    """Serve audio files.
+    
+    Content-addressed files never change, so they get their hash as a
+    strong ETag and may be cached forever.
+    """
+    if not CONTENT_NAME.match(filename):
+        return send_from_directory(current_app.config['AUDIO_FOLDER'], filename)
+    
+    response = send_from_directory(
+        current_app.config['AUDIO_FOLDER'], filename,
+        etag=filename.rsplit('.', 1)[0], max_age=365 * 24 * 3600
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    audio_store.touch(filename)
+    return response
+
+@api_bp.route('/cache/stats')
+def cache_stats():
+    """Report cache size and hit/miss counters per namespace."""
+    return jsonify(get_cache().stats())
+
+def _collect_metrics():
+    """Copy queue and cache counters into their gauges before /metrics is rendered."""
+    if job_queue:
+        stats = job_queue.stats()
+        QUEUE_PENDING.set(stats['pending'])
+        QUEUE_WORKERS.set(stats['workers'])
+    stats = get_cache().stats()
+    CACHE_BYTES.set(stats['size_bytes'])
+    for namespace, hits in stats['hits'].items():
+        CACHE_HITS.set(hits, namespace=namespace)
+    for namespace, misses in stats['misses'].items():
+        CACHE_MISSES.set(misses, namespace=namespace)
+
+REGISTRY.add_collector(_collect_metrics)
+
+@api_bp.route('/metrics')
+def metrics():
+    """Expose pipeline metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@api_bp.route('/healthz')
+def healthz():
+    """Liveness probe: the process answers and its job workers can still run jobs."""
+    if job_queue is None or not job_queue.alive():
+        return jsonify({'status': 'unhealthy', 'error': 'job workers are not running'}), 503
+    return jsonify({'status': 'ok'})
+
+@api_bp.route('/readyz')
+def readyz():
+    """Readiness probe: room in the job queue, free disk for audio and uploads, and API clients configured.
+
+    Reads only in-process state and filesystem statistics, never the
+    network, so it is cheap enough to poll under load.
+    """
+    checks = {}
+    if job_queue is None:
+        checks['workers'] = {'ok': False}
+    else:
+        stats = job_queue.stats()
+        checks['workers'] = {'ok': job_queue.alive() and stats['pending'] < stats['max_pending'], **stats}
+
+    min_free = current_app.config['READY_MIN_FREE_MB'] * 1024 * 1024
+    for name in ('AUDIO_FOLDER', 'UPLOAD_FOLDER'):
+        folder = current_app.config[name]
+        try:
+            free = shutil.disk_usage(folder).free
+        except OSError:
+            checks[folder] = {'ok': False}
+            continue
+        checks[folder] = {'ok': free >= min_free, 'free_mb': free // (1024 * 1024)}
+
+    checks['anthropic'] = {'ok': bool(script_gen and script_gen.configured)}
+    # Without an OpenAI key jobs still finish, with the SAPI or fallback audio
+    checks['tts'] = {'ok': audio_gen is not None, 'backend': audio_gen.backend if audio_gen else None}
+
+    ready = all(check['ok'] for check in checks.values())
+    return jsonify({'status': 'ready' if ready else 'unavailable', 'checks': checks}), 200 if ready else 503
 
 @api_bp.route('/test-api')
 def test_api():
-    """Test Anthropic API connection."""
+    """Test Anthropic API connection with a real (billed) request; probes should use /readyz."""
     try:
         response = script_gen.client.messages.create(
             model="claude-opus-4-1-20250805",
@@ -88,84 +237,514 @@ def test_api():
 
 @api_bp.route('/generate', methods=['POST'])
 def generate_podcast():
-    """Main endpoint for generating podcasts from content."""
-    print("=== GENERATE PODCAST ROUTE CALLED ===")
-    print(f"Request method: {request.method}")
-    print(f"Request content type: {request.content_type}")
-    print(f"Request files: {list(request.files.keys())}")
-    print(f"Request is_json: {request.is_json}")
+    """Queue a podcast generation job and return its id right away.
     
+    Requests for a source that is already being generated (same normalized
+    URL or same PDF bytes) get the id of that job instead of a new one.
+    """
     try:
-        content = None
-        
         # Handle PDF file upload
         if 'file' in request.files:
             file = request.files['file']
             if not file.filename or not file.filename.lower().endswith('.pdf'):
                 return jsonify({'error': 'Please upload a PDF file'}), 400
             
-            temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}.pdf")
-            file.save(temp_path)
-            content = extract_pdf_text(temp_path)
-            os.remove(temp_path)
+            # Handed to the worker in memory (or mapped from the spooled temp file)
+            source = upload_source(file)
             source_type = 'PDF Upload'
+            source_key = f"pdf:{pdf_digest(source)}"
             
         # Handle URL input
         elif request.is_json:
             data = request.get_json()
-            url = data.get('source')
+            source = data.get('source')
             
-            if not url or not re.match(r'^https?://', url):
+            if not source or not re.match(r'^https?://', source):
                 return jsonify({'error': 'Please provide a valid URL'}), 400
             
-            content = extract_web_content(url)
+            try:
+                source_key = f"url:{normalize_url(source)}"
+            except ValueError:
+                return jsonify({'error': 'Please provide a valid URL'}), 400
             source_type = 'URL'
-        
-        # Validate extracted content
-        if not content or len(content.strip()) < 100:
-            return jsonify({'error': 'Could not extract enough content from this source'}), 400
-        
-        print(f"Extracted {len(content)} characters of content")
-        print(f"About to call create_podcast_script...")
+        else:
+            return jsonify({'error': 'Please provide a URL or upload a PDF'}), 400
         
         # Check if generators are initialized
         if not script_gen:
+            if source_type == 'PDF Upload':
+                release_upload(source)
             return jsonify({'error': 'Anthropic client not initialized. Check API key configuration.'}), 500
         
-        # Generate podcast script
-        script = script_gen.create_podcast_script(content)
-        print(f"Script result: {script is not None}")
-        if not script:
-            print("Script generation returned None")
-            return jsonify({'error': 'Failed to generate podcast script. Check console for details.'}), 500
+        try:
+            job_func = arun_generation_job if job_queue.asynchronous else run_generation_job
+            job_id, created = job_queue.submit_unique(
+                source_key, job_func, current_app._get_current_object(), source_type, source, source_key
+            )
+        except QueueFullError as e:
+            if source_type == 'PDF Upload':
+                release_upload(source)
+            return jsonify({'error': str(e)}), 503
         
-        print(f"Generated script with {len(script)} characters")
+        status = 'queued'
+        if created:
+            logger.info("Queued job", extra={'job_id': job_id, 'source_type': source_type})
+        else:
+            # The job in progress already has its own copy of the upload
+            if source_type == 'PDF Upload':
+                release_upload(source)
+            status = (job_queue.get(job_id) or {}).get('status', status)
+            logger.info("Attached to job in progress", extra={'job_id': job_id, 'source_type': source_type})
+        return jsonify({
+            'job_id': job_id,
+            'status': status,
+            'coalesced': not created,
+            'status_url': f"/jobs/{job_id}"
+        }), 202
         
-        # Save script to file
-        script_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}.txt")
-        with open(script_path, 'w', encoding='utf-8') as f:
-            f.write(script)
+    except RequestEntityTooLarge:
+        limit_mb = current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        return jsonify({'error': f'The upload is larger than {limit_mb} MB'}), 413
+    except Exception as e:
+        logger.exception("Error in generate_podcast")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@api_bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the stage, progress and final result of a generation job."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@api_bp.route('/jobs/<job_id>/audio')
+def job_audio(job_id):
+    """Serve a job's audio while it is still being synthesized.
+    
+    Requests without a Range header get a streamed response that follows the
+    audio as new parts finish, for as long as the job is alive; each holds
+    a server thread, so only MAX_STREAM_LISTENERS may follow one job's
+    stream at once and further ones get a 503. Range requests are answered
+    from the part that has already been generated. Once the job is done
+    this redirects to the saved file.
+    """
+    stream = get_stream(job_id)
+    if not stream:
+        job = job_queue.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        audio_url = job.get('result', {}).get('audio_url')
+        if audio_url:
+            return redirect(audio_url)
+        if job['status'] in ('completed', 'failed'):
+            return jsonify({'error': 'No audio was generated for this job'}), 404
+        return jsonify({'error': 'Audio is not ready yet'}), 409
+    
+    if stream.failed:
+        return jsonify({'error': 'Audio generation failed'}), 404
+    
+    headers = {'Accept-Ranges': 'bytes', 'Cache-Control': 'no-store'}
+    byte_range = request.range
+    if not byte_range or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return _follow_stream(job_id, stream, headers)
+    
+    start, end = byte_range.ranges[0]
+    available = stream.size
+    total = str(available) if stream.finished else '*'
+    if start < 0:
+        # Suffix ranges need the final length
+        if not stream.finished:
+            return Response(status=416, headers={**headers, 'Content-Range': 'bytes */*'})
+        start = max(0, available + start)
+    if start == 0 and end is None and not stream.finished:
+        return _follow_stream(job_id, stream, headers)
+    
+    end = available if end is None else min(end, available)
+    if start >= end:
+        return Response(status=416, headers={**headers, 'Content-Range': f'bytes */{total}'})
+    
+    headers['Content-Range'] = f'bytes {start}-{end - 1}/{total}'
+    return Response(stream.read(start, end), status=206, mimetype='audio/mpeg', headers=headers)
+
+@api_bp.route('/jobs/<job_id>/chapters/<int:index>', methods=['POST'])
+def resynthesize_chapter(job_id, index):
+    """Queue re-synthesis of one chapter of a finished podcast.
+    
+    Takes an optional JSON body {"voice": "nova"} (default: the chapter's
+    current voice) and, like /generate, returns the id of a job to poll.
+    Only that chapter's text goes to TTS; every other chapter's frames are
+    reused as they are. Once spliced in, the podcast job's result is
+    updated with the new audio and chapter index, which are also the
+    result of the new job.
+    """
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    result = job.get('result') or {}
+    chapters = result.get('chapters')
+    if not chapters:
+        return jsonify({'error': 'This job has no chapter index'}), 409
+    if index >= len(chapters):
+        return jsonify({'error': 'Chapter not found'}), 404
+    
+    voice = (request.get_json(silent=True) or {}).get('voice') or chapters[index]['voice']
+    if voice not in TTS_VOICES:
+        return jsonify({'error': f"Unknown voice, choose one of: {', '.join(TTS_VOICES)}"}), 400
+    if not audio_gen or audio_gen.backend != 'openai':
+        return jsonify({'error': 'OpenAI TTS is not configured'}), 503
+    if not audio_store.exists(os.path.basename(result['audio_url'])):
+        return jsonify({'error': 'The audio has expired, please generate the podcast again'}), 410
+    
+    try:
+        job_func = arun_chapter_job if job_queue.asynchronous else run_chapter_job
+        chapter_job_id, created = job_queue.submit_unique(
+            f"chapter:{job_id}:{index}:{voice}", job_func, job_id, index, voice
+        )
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    if created:
+        logger.info("Queued chapter job", extra={'job_id': chapter_job_id, 'podcast_job_id': job_id,
+                                                 'chapter': index, 'voice': voice})
+    return jsonify({
+        'job_id': chapter_job_id,
+        'status': (job_queue.get(chapter_job_id) or {}).get('status', 'queued'),
+        'coalesced': not created,
+        'status_url': f"/jobs/{chapter_job_id}"
+    }), 202
+
+def _follow_stream(job_id, stream, headers):
+    """Stream a job's audio from the start as it grows, if one of its listener slots is free."""
+    if not acquire_listener(job_id):
+        return jsonify({'error': 'Too many listeners on this stream, the podcast can be played once it is ready'}), \
+            503, {'Retry-After': '30'}
+    response = Response(stream.iter_from(0, alive=lambda: job_queue.active(job_id)),
+                        mimetype='audio/mpeg', headers=headers)
+    response.call_on_close(lambda: release_listener(job_id))
+    return response
+
+def run_chapter_job(job_id, podcast_job_id, index, voice):
+    """Re-synthesize chapter `index` of a podcast job in `voice` and splice it into the podcast's audio."""
+    text = _chapter_text(job_id, podcast_job_id, index)
+    try:
+        # Not from the audio cache: that holds the very take being replaced
+        part = audio_gen.synthesize_segment(text, voice, refresh=True)
+    except Exception as e:
+        raise JobError('Audio generation failed') from e
+    return _splice_chapter(job_id, podcast_job_id, index, part, voice)
+
+async def arun_chapter_job(job_id, podcast_job_id, index, voice):
+    """Async variant of run_chapter_job."""
+    text = _chapter_text(job_id, podcast_job_id, index)
+    try:
+        part = await audio_gen.asynthesize_segment(text, voice, refresh=True)
+    except Exception as e:
+        raise JobError('Audio generation failed') from e
+    return await asyncio.to_thread(_splice_chapter, job_id, podcast_job_id, index, part, voice)
+
+def run_generation_job(job_id, app, source_type, source, source_key):
+    """Run extraction, script generation and audio synthesis for one job.
+    
+    Every finished stage (extracted text, script and its TTS segments, each
+    TTS chunk) is checkpointed under the source key, so a request retried
+    after the job was interrupted resumes where the last attempt stopped.
+    The checkpoint is discarded once the audio is saved.
+    """
+    with app.app_context():
+        run = _GenerationRun(job_id, source_type, source, source_key)
+        if run.resume_text() is None:
+            with run.extract_span() as fields:
+                if source_type == 'PDF Upload':
+                    content = _extract_upload(source)
+                else:
+                    content = extract_web_content(source)
+                fields['chars'] = len(content or '')
+            run.save_text(content)
         
-        # Generate audio
-        audio_url, audio_error = generate_audio(script)
+        # Stream the script into TTS so audio synthesis overlaps with writing
+        saved_segments = run.resume_script()
+        if saved_segments:
+            segments = iter(saved_segments)
+        else:
+            segments = _checkpoint_segments(run, iter_segments(_script_deltas(run)))
         
-        response = {
-            'success': True,
-            'script': script,
-            'source_type': source_type,
-            'content_length': len(content),
-            'script_length': len(script)
-        }
+        audio_url = None
+        try:
+            audio_url, audio_error = generate_audio_streaming(
+                run.chapters.segments(segments), run.on_part(), run.checkpoint
+            )
+        finally:
+            finish_stream(job_id, failed=not audio_url)
+        return run.finish(audio_url, audio_error)
+
+async def arun_generation_job(job_id, app, source_type, source, source_key):
+    """Async variant of run_generation_job for the async job mode.
+    
+    Network waits (fetching, the script stream, TTS) are awaited on the job
+    loop; extraction and other blocking work runs in worker threads.
+    """
+    with app.app_context():
+        run = await asyncio.to_thread(_GenerationRun, job_id, source_type, source, source_key)
+        if await asyncio.to_thread(run.resume_text) is None:
+            with run.extract_span() as fields:
+                if source_type == 'PDF Upload':
+                    content = await asyncio.to_thread(_extract_upload, source)
+                else:
+                    content = await aextract_web_content(source)
+                fields['chars'] = len(content or '')
+            await asyncio.to_thread(run.save_text, content)
         
-        if audio_url:
-            response['audio_url'] = audio_url
+        saved_segments = await asyncio.to_thread(run.resume_script)
+        if saved_segments:
+            segments = _areplay(saved_segments)
         else:
-            response['audio_error'] = audio_error or "Audio generation failed"
+            segments = _acheckpoint_segments(run, aiter_segments(_ascript_deltas(run)))
         
-        return jsonify(response)
+        audio_url = None
+        try:
+            audio_url, audio_error = await agenerate_audio_streaming(
+                run.chapters.asegments(segments), run.on_part(), run.checkpoint
+            )
+        finally:
+            finish_stream(job_id, failed=not audio_url)
+        return await asyncio.to_thread(run.finish, audio_url, audio_error)
+
+class _GenerationRun:
+    """Checkpoints, progress and result of one generation job.
+    
+    Shared by run_generation_job and arun_generation_job, which do the
+    network I/O (fetching, the script stream, TTS) themselves. The methods
+    here only touch local disk and the job database; the async job calls
+    them through asyncio.to_thread.
+    """
+    
+    def __init__(self, job_id, source_type, source, source_key):
+        self.job_id = job_id
+        self.source_type = source_type
+        self.source = source
+        self.checkpoint = checkpoint_store.open(source_key)
+        self.chapters = ChapterRecorder(TTS_VOICE)
+        self.content = None
+        self.saved_script = None
+        self.script_parts = []
+        self.segments = []
+        self.usage = {}
+        self.started = None
+    
+    def resume_text(self):
+        """Return the checkpointed extracted text, or None if the source has to be extracted."""
+        job_queue.update(self.job_id, 'extracting', 0.05)
+        self.content = self.checkpoint.get_text('text')
+        if self.content is not None:
+            _discard_source(self.source_type, self.source)
+            logger.info("Using checkpointed text", extra={'job_id': self.job_id, 'chars': len(self.content)})
+        return self.content
+    
+    def extract_span(self):
+        return span('extract', job_id=self.job_id, source_type=self.source_type)
+    
+    def save_text(self, content):
+        _check_content(content)
+        self.checkpoint.set_text('text', content)
+        self.content = content
+    
+    def resume_script(self):
+        """Start the script stage; returns the checkpointed TTS segments of a finished script, if any.
         
+        A retry replays exactly those segments instead of splitting the
+        script again, so the names of the TTS chunks they saved match.
+        """
+        job_queue.update(self.job_id, 'writing_script', 0.15)
+        self.started = time.time()
+        self.saved_script = self.checkpoint.get_text('script')
+        saved_segments = self.checkpoint.get_json('segments') if self.saved_script else None
+        if saved_segments:
+            logger.info("Using checkpointed script", extra={'job_id': self.job_id, 'segments': len(saved_segments)})
+            self.script_parts.append(self.saved_script)
+        return saved_segments
+    
+    def saved_deltas(self):
+        """The checkpointed script (finished, but not yet split) as the only delta, or None."""
+        if not self.saved_script:
+            return None
+        logger.info("Using checkpointed script", extra={'job_id': self.job_id})
+        self.script_parts.append(self.saved_script)
+        return [self.saved_script]
+    
+    def add_delta(self, writer, delta):
+        self.script_parts.append(delta)
+        writer.write(delta)
+        return delta
+    
+    def script_failed(self, error):
+        logger.exception("Script streaming failed", extra={'job_id': self.job_id})
+        return JobError('Failed to generate podcast script. Check console for details.')
+    
+    def finish_script(self, writer):
+        writer.finish(''.join(self.script_parts).strip())
+    
+    def save_segments(self):
+        self.checkpoint.set_json('segments', self.segments)
+    
+    def on_part(self):
+        return self.chapters.on_part(_progressive_parts(self.job_id, self.started))
+    
+    def finish(self, audio_url, audio_error):
+        """Return the job result; once the audio is saved, index its chapters and drop the checkpoint."""
+        script = _finished_script(self.job_id, self.script_parts, self.started)
+        result = _job_result(script, self.source_type, self.content, audio_url, audio_error, self.usage)
+        if audio_url:
+            _save_chapters(result, self.chapters.index(script))
+            self.checkpoint.discard()
+        return result
+
+def _script_deltas(run):
+    saved = run.saved_deltas()
+    if saved:
+        yield from saved
+        return
+    try:
+        with run.checkpoint.script_writer() as writer:
+            for delta in script_gen.stream_podcast_script(run.content, run.usage, writer.resume):
+                yield run.add_delta(writer, delta)
+    except Exception as e:
+        raise run.script_failed(e) from e
+    run.finish_script(writer)
+
+async def _ascript_deltas(run):
+    saved = await asyncio.to_thread(run.saved_deltas)
+    if saved:
+        for delta in saved:
+            yield delta
+        return
+    writer = await asyncio.to_thread(run.checkpoint.script_writer)
+    try:
+        # Small appends to a local file; not worth a thread hop per delta
+        with writer:
+            async for delta in script_gen.astream_podcast_script(run.content, run.usage, writer.resume):
+                yield run.add_delta(writer, delta)
     except Exception as e:
-        print(f"Error in generate_podcast: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
\ No newline at end of file
+        raise run.script_failed(e) from e
+    await asyncio.to_thread(run.finish_script, writer)
+
+def _checkpoint_segments(run, segments):
+    """Pass the script's TTS segments through and checkpoint the list once the script is split."""
+    for segment in segments:
+        run.segments.append(segment)
+        yield segment
+    run.save_segments()
+
+async def _acheckpoint_segments(run, segments):
+    async for segment in segments:
+        run.segments.append(segment)
+        yield segment
+    await asyncio.to_thread(run.save_segments)
+
+async def _areplay(segments):
+    for segment in segments:
+        yield segment
+
+def _save_chapters(result, chapters):
+    """Add the chapter index to a job result and store it as JSON alongside the audio."""
+    if not chapters:
+        return
+    # Named by its own content hash, like the audio, so it can be served as immutable
+    filename = audio_store.save(json.dumps(chapters).encode('utf-8'), '.json')
+    result['chapters'] = chapters
+    result['chapters_url'] = f"/static/audio/{filename}"
+
+def _chapter_text(job_id, podcast_job_id, index):
+    """Start a chapter job and return the text of the chapter to re-record."""
+    job_queue.update(job_id, 'generating_audio', 0.1)
+    result = (job_queue.get(podcast_job_id) or {}).get('result') or {}
+    chapter = result['chapters'][index]
+    return result['script'][chapter['text_start']:chapter['text_end']]
+
+def _splice_chapter(job_id, podcast_job_id, index, part, voice):
+    """Splice a re-synthesized chapter into the podcast job's current audio and update its result.
+    
+    Runs inside the job database's write lock, so re-recordings of other
+    chapters of the same podcast finishing at the same time each build on
+    the audio the previous one saved.
+    """
+    if not part:
+        raise JobError('OpenAI TTS is not configured')
+    job_queue.update(job_id, 'saving', 0.9)
+    
+    def splice_into(result):
+        try:
+            with open(os.path.join(audio_store.directory, os.path.basename(result['audio_url'])), 'rb') as f:
+                audio = f.read()
+        except FileNotFoundError:
+            raise JobError('The audio has expired, please generate the podcast again')
+        audio, chapters = splice(audio, result['chapters'], index, part, voice)
+        result['audio_url'] = save_audio(audio)
+        _save_chapters(result, chapters)
+        return result
+    
+    result = job_queue.update_result(podcast_job_id, splice_into)
+    if not result:
+        raise JobError('The podcast job no longer exists')
+    logger.info("Re-synthesized chapter", extra={'podcast_job_id': podcast_job_id, 'chapter': index, 'voice': voice})
+    return {'podcast_job_id': podcast_job_id, 'audio_url': result['audio_url'],
+            'chapters_url': result['chapters_url'], 'chapters': result['chapters']}
+
+def _discard_source(source_type, source):
+    if source_type == 'PDF Upload':
+        release_upload(source)
+
+def _extract_upload(source):
+    """Extract an uploaded PDF and release its buffer."""
+    PROCESSED_BYTES.inc(len(source), kind='upload')
+    try:
+        return extract_pdf_text(source)
+    finally:
+        release_upload(source)
+
+def _check_content(content):
+    PROCESSED_CHARACTERS.inc(len(content or ''), kind='extracted')
+    if not content or len(content.strip()) < 100:
+        raise JobError('Could not extract enough content from this source')
+
+def _progressive_parts(job_id, started):
+    """Return an on_part callback that serves finished parts from /jobs/<id>/audio."""
+    audio_stream = open_stream(job_id)
+    
+    def on_part(index, audio_bytes):
+        # Headerless frames so the parts play back as one continuous stream
+        audio_stream.append(strip_headers(audio_bytes))
+        if index == 0:
+            logger.info("First audio ready", extra={'job_id': job_id,
+                                                    'seconds': round(time.time() - started, 1)})
+            job_queue.update(job_id, 'generating_audio', 0.5)
+    
+    return on_part
+
+def _finished_script(job_id, script_parts, started):
+    script = ''.join(script_parts).strip()
+    if not script:
+        logger.error("Script generation returned nothing", extra={'job_id': job_id})
+        raise JobError('Failed to generate podcast script. Check console for details.')
+    
+    PROCESSED_CHARACTERS.inc(len(script), kind='script')
+    logger.info("Generated script", extra={'job_id': job_id, 'chars': len(script),
+                                           'seconds': round(time.time() - started, 1)})
+    return script
+
+def _job_result(script, source_type, content, audio_url, audio_error, usage):
+    result = {
+        'success': True,
+        'script': script,
+        'source_type': source_type,
+        'content_length': len(content),
+        'script_length': len(script),
+        # Empty when the script came from the local cache
+        'usage': usage
+    }
+    
+    if audio_url:
+        result['audio_url'] = audio_url
+    else:
+        result['audio_error'] = audio_error or "Audio generation failed"
+    
+    return result
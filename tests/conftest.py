@@ -0,0 +1,55 @@
+"""Shared test setup: the offline fake clients stand in for the paid APIs."""
+import os
+import sys
+
+import pytest
+
+# Every request must reach the fake clients, not the local cache, and never wait for admission
+os.environ['CACHE_MAX_MB'] = '0'
+os.environ['ANTHROPIC_RPM'] = os.environ['OPENAI_TTS_RPM'] = '0'
+os.environ['OPENAI_API_KEY'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Imported after the environment above is set, since the app reads it at import time
+from routes import api
+from benchmarks.fake_clients import FakeAnthropic, FakeAsyncAnthropic, FAKE_SCRIPT_SENTENCES
+from utils.checkpoints import CheckpointStore
+from utils.job_queue import JobQueue
+from utils.script_generator import ScriptGenerator
+from utils.storage import FileStore
+
+
+class ApiEnv:
+    """routes.api on temporary stores, writing scripts with the fake Anthropic client, for one source URL."""
+
+    url = 'https://example.com/article'
+    source_key = f'url:{url}'
+
+    def __init__(self, tmp_path, monkeypatch, mode):
+        self.audio_folder = str(tmp_path / 'audio')
+        monkeypatch.setattr(api, 'audio_store', FileStore('audio', self.audio_folder))
+        monkeypatch.setattr(api, 'checkpoint_store', CheckpointStore(str(tmp_path / 'checkpoints')))
+        monkeypatch.setattr(api, 'job_queue', JobQueue(str(tmp_path / 'jobs.db'), max_workers=4))
+        anthropic_class = FakeAsyncAnthropic if mode == 'async' else FakeAnthropic
+        self.anthropic = anthropic_class(tokens_per_second=100000, first_token_latency=0, output_tokens=1500)
+        monkeypatch.setattr(api, 'script_gen', ScriptGenerator(None, client=self.anthropic,
+                                                               async_client=self.anthropic))
+
+    def seed_text(self):
+        """Save extracted text for the source, unless it has some, so jobs start without fetching."""
+        checkpoint = api.checkpoint_store.open(self.source_key)
+        if checkpoint.get_text('text') is None:
+            checkpoint.set_text('text', ' '.join(FAKE_SCRIPT_SENTENCES * 5))
+        return checkpoint
+
+
+@pytest.fixture
+def mode():
+    """The job mode `api_env` runs in; test modules override it to cover 'async' too."""
+    return 'threads'
+
+
+@pytest.fixture
+def api_env(mode, tmp_path, monkeypatch):
+    return ApiEnv(tmp_path, monkeypatch, mode)
@@ -0,0 +1,46 @@
+"""Batch manifests run each source once, however often it is listed."""
+import json
+
+import batch
+from utils.audio_utils import AudioGenerator
+from benchmarks.fake_clients import FakeAnthropic, FakeOpenAI, FAKE_SCRIPT_SENTENCES
+from utils.script_generator import ScriptGenerator
+
+
+def write_manifest(path, entries):
+    path.write_text(''.join(json.dumps(entry) + '\n' for entry in entries))
+    return str(path)
+
+
+def test_repeated_sources_and_ids_are_not_run(tmp_path):
+    manifest = write_manifest(tmp_path / 'manifest.jsonl', [
+        {'source': 'https://example.com/a'},
+        {'source': 'https://EXAMPLE.com/a#intro'},
+        {'source': 'https://example.com/b', 'id': 'b'},
+        {'source': 'https://example.com/c', 'id': 'b'},
+    ])
+    items, errors = batch.read_manifest(manifest)
+
+    assert [item.source for item in items] == ['https://example.com/a', 'https://example.com/b']
+    assert errors == [
+        {'id': 'line-2', 'status': 'duplicate', 'duplicate_of': items[0].id},
+        {'id': 'line-4', 'status': 'invalid', 'error': 'id b is already used on line 3'},
+    ]
+
+
+def test_duplicate_lines_cost_one_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'extract_web_content', lambda url: ' '.join(FAKE_SCRIPT_SENTENCES * 5))
+    manifest = write_manifest(tmp_path / 'manifest.jsonl', [{'source': 'https://example.com/a'}] * 3)
+    llm = FakeAnthropic(tokens_per_second=100000, first_token_latency=0, output_tokens=300)
+    tts = FakeOpenAI(latency=0)
+    runner = batch.BatchRunner(ScriptGenerator(None, client=llm), AudioGenerator(openai_client=tts),
+                               str(tmp_path / 'out'), str(tmp_path / 'checkpoints'))
+
+    items, errors = batch.read_manifest(manifest)
+    assert runner.run(items) == {'skipped': 0, 'completed': 1}
+    assert [error['status'] for error in errors] == ['duplicate', 'duplicate']
+    assert llm.calls == 1
+
+    with open(runner.results_path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record['id'] for record in records] == [items[0].id]
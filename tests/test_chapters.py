@@ -0,0 +1,111 @@
+"""Re-recording a chapter runs as a job and splices into the podcast's latest audio."""
+import time
+import hashlib
+
+import pytest
+from flask import Flask
+
+from routes import api
+from utils import mp3, cache
+from utils.audio_utils import AudioGenerator
+from utils.cache import DiskCache
+from benchmarks.fake_clients import FakeOpenAI
+
+
+def wait(job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = api.job_queue.get(job_id)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def client(api_env, monkeypatch):
+    monkeypatch.setattr(api, 'audio_gen', AudioGenerator(openai_client=FakeOpenAI(latency=0.05), max_retries=0))
+
+    app = Flask(__name__)
+    app.config['AUDIO_FOLDER'] = api_env.audio_folder
+    app.register_blueprint(api.api_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def podcast(client, api_env):
+    """The job id of a finished podcast."""
+    api_env.seed_text()
+    job_id = api.job_queue.submit(api.run_generation_job, Flask(__name__), 'URL', api_env.url, api_env.source_key)
+    job = wait(job_id)
+    assert job['status'] == 'completed' and len(job['result']['chapters']) >= 3
+    return job_id
+
+
+def test_chapter_is_resynthesized_in_a_job(client, podcast):
+    response = client.post(f'/jobs/{podcast}/chapters/1', json={'voice': 'nova'})
+    assert response.status_code == 202
+    job = wait(response.get_json()['job_id'])
+    assert job['status'] == 'completed'
+
+    after = api.job_queue.get(podcast)['result']
+    assert job['result']['audio_url'] == after['audio_url']
+    assert job['result']['chapters'] == after['chapters']
+    assert [chapter['voice'] for chapter in after['chapters']][:3] == ['alloy', 'nova', 'alloy']
+    assert api.audio_gen.openai_client.voices['nova'] == 1
+
+
+def test_chapter_in_its_current_voice_is_recorded_again(client, podcast, tmp_path, monkeypatch):
+    # With the audio cache on, the chapter's current take is cached under its text and voice
+    monkeypatch.setattr(cache, '_cache', DiskCache(str(tmp_path / 'cache'), 64 * 1024 * 1024))
+    tts = api.audio_gen.openai_client
+    chapter = api.job_queue.get(podcast)['result']['chapters'][1]
+    text = api.job_queue.get(podcast)['result']['script'][chapter['text_start']:chapter['text_end']]
+    api.audio_gen.synthesize_segment(text, 'alloy')
+    calls = tts.calls
+
+    response = client.post(f'/jobs/{podcast}/chapters/1')
+    assert wait(response.get_json()['job_id'])['status'] == 'completed'
+    assert tts.calls == calls + 1
+    assert api.audio_gen.synthesize_segment(text, 'alloy') is not None
+    assert tts.calls == calls + 1  # the new take was cached
+
+
+def test_concurrent_chapters_are_all_kept(client, podcast):
+    responses = [client.post(f'/jobs/{podcast}/chapters/{index}', json={'voice': voice})
+                 for index, voice in ((0, 'nova'), (2, 'echo'))]
+    for response in responses:
+        assert wait(response.get_json()['job_id'])['status'] == 'completed'
+
+    result = api.job_queue.get(podcast)['result']
+    assert [chapter['voice'] for chapter in result['chapters']][:3] == ['nova', 'alloy', 'echo']
+    with open(f"{api.audio_store.directory}/{result['audio_url'].rsplit('/', 1)[1]}", 'rb') as f:
+        audio = f.read()
+    assert abs(mp3.duration(audio) - sum(chapter['duration'] for chapter in result['chapters'])) < 0.01
+
+
+def test_identical_requests_share_a_job(client, podcast):
+    first = client.post(f'/jobs/{podcast}/chapters/1', json={'voice': 'nova'}).get_json()
+    second = client.post(f'/jobs/{podcast}/chapters/1', json={'voice': 'nova'}).get_json()
+    assert second['job_id'] == first['job_id'] and second['coalesced']
+    wait(first['job_id'])
+
+
+def test_chapter_index_is_named_by_its_content(client, podcast):
+    first_url = api.job_queue.get(podcast)['result']['chapters_url']
+    wait(client.post(f'/jobs/{podcast}/chapters/1', json={'voice': 'nova'}).get_json()['job_id'])
+    result = api.job_queue.get(podcast)['result']
+    assert result['chapters_url'] != first_url
+
+    response = client.get(result['chapters_url'])
+    assert response.status_code == 200
+    assert response.get_json() == result['chapters']
+    name = result['chapters_url'].rsplit('/', 1)[1]
+    assert name == hashlib.sha256(response.get_data()).hexdigest()[:32] + '.json'
+    assert response.headers['ETag'].strip('"') == name[:-len('.json')]
+
+
+def test_invalid_requests(client, podcast):
+    assert client.post('/jobs/missing/chapters/0').status_code == 404
+    assert client.post(f'/jobs/{podcast}/chapters/99').status_code == 404
+    assert client.post(f'/jobs/{podcast}/chapters/0', json={'voice': 'nobody'}).status_code == 400
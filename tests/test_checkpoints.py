@@ -0,0 +1,120 @@
+"""A retried job resumes from its checkpoint instead of redoing finished work."""
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+from flask import Flask
+
+from routes import api
+from utils.audio_utils import AudioGenerator
+from utils.checkpoints import CheckpointStore
+from benchmarks.fake_clients import FakeOpenAI, FakeAsyncOpenAI
+
+
+class Pipeline:
+    """Runs generation jobs for one source against the fake clients, in the thread or async job mode."""
+
+    def __init__(self, env, mode, monkeypatch):
+        self.env = env
+        self.mode = mode
+        self.monkeypatch = monkeypatch
+        self.app = Flask(__name__)
+        self.anthropic = env.anthropic
+
+    def openai(self, successes=None):
+        """Return a fake TTS client whose calls after the first `successes` raise."""
+        client = (FakeAsyncOpenAI if self.mode == 'async' else FakeOpenAI)(latency=0)
+        if successes is not None:
+            create = client.audio.speech.create
+            lock = threading.Lock()
+            made = []
+
+            def check():
+                with lock:
+                    made.append(1)
+                    if len(made) > successes:
+                        raise RuntimeError("Simulated TTS outage")
+
+            if self.mode == 'async':
+                async def limited(**kwargs):
+                    check()
+                    return await create(**kwargs)
+            else:
+                def limited(**kwargs):
+                    check()
+                    return create(**kwargs)
+            client.audio.speech.create = limited
+        return client
+
+    def run(self, openai_client):
+        self.env.seed_text()
+        self.monkeypatch.setattr(api, 'audio_gen', AudioGenerator(
+            openai_client=openai_client, async_openai_client=openai_client, max_retries=0))
+        if self.mode == 'async':
+            return asyncio.run(api.arun_generation_job('job', self.app, 'URL', self.env.url, self.env.source_key))
+        return api.run_generation_job('job', self.app, 'URL', self.env.url, self.env.source_key)
+
+
+@pytest.fixture(params=['threads', 'async'])
+def mode(request):
+    return request.param
+
+
+@pytest.fixture
+def pipeline(api_env, mode, monkeypatch):
+    return Pipeline(api_env, mode, monkeypatch)
+
+
+def test_retry_reuses_saved_chunks(pipeline):
+    first = pipeline.run(pipeline.openai(successes=3))
+    assert 'audio_url' not in first
+
+    checkpoint = api.checkpoint_store.open(pipeline.env.source_key)
+    segments = checkpoint.get_json('segments')
+    assert len(segments) > 4
+    assert len([name for name in os.listdir(checkpoint.directory) if name.startswith('chunk-')]) == 3
+
+    client = pipeline.openai()
+    second = pipeline.run(client)
+    assert second['audio_url']
+    assert second['script'] == first['script']
+    # Only the chunks the first attempt did not save are synthesized, and the script is not rewritten
+    assert client.calls == len(segments) - 3
+    assert pipeline.anthropic.calls == 1
+    assert len(second['chapters']) == len(segments)
+
+
+def test_finished_job_leaves_no_checkpoint(pipeline):
+    first = pipeline.run(pipeline.openai())
+    assert first['audio_url']
+    assert api.checkpoint_store.open(pipeline.env.source_key).get_text('script') is None
+
+    # The next request for the source writes the script again instead of replaying the old result
+    pipeline.run(pipeline.openai())
+    assert pipeline.anthropic.calls == 2
+
+
+def test_reading_a_checkpoint_does_not_extend_its_life(tmp_path):
+    store = CheckpointStore(str(tmp_path), max_age=3600)
+    checkpoint = store.open('url:https://example.com/article')
+    checkpoint.set_text('text', 'extracted')
+    stale = time.time() - 7200
+    os.utime(checkpoint.directory, (stale, stale))
+
+    assert store.open('url:https://example.com/article').get_text('text') == 'extracted'
+    store.sweep()
+    assert not os.path.exists(checkpoint.directory)
+
+
+def test_interrupted_script_is_continued(pipeline):
+    written = "Welcome back to the show. Today we follow a river study."
+    checkpoint = api.checkpoint_store.open(pipeline.env.source_key)
+    with checkpoint.open_partial('script', written + ' '):
+        pass
+
+    result = pipeline.run(pipeline.openai())
+    assert result['script'].startswith(written)
+    assert result['script'].count(written) == 1
+    assert pipeline.anthropic.requests[0]['messages'][-1] == {'role': 'assistant', 'content': written}
@@ -0,0 +1,76 @@
+"""The lxml extractor gives the BeautifulSoup extractor's output, without its duplicated nested text."""
+import os
+import glob
+
+import pytest
+
+from utils.content_extractor import parse_html_content, _parse_html_bs4
+from utils.html_extractor import parse_html_lxml
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'html', '*.html')))
+
+PARAGRAPHS = [f"Paragraph {number} explains one more step of the method in detail." for number in range(6)]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def nested_page(depth=6):
+    """An article whose paragraphs sit in `depth` levels of divs, with loose text around an inner block."""
+    body = ''
+    for paragraph in PARAGRAPHS:
+        block = f"<p>{paragraph}</p>"
+        for _ in range(depth):
+            block = f"<div class='wrapper'>{block}</div>"
+        body += block
+    body += ("<div>Loose text before the inner paragraph of a block."
+             "<p>The inner paragraph of the same block.</p>"
+             "Loose text after the inner paragraph of a block.</div>")
+    return f"<html><body><nav>Home Archive About</nav><article>{body}</article></body></html>"
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_lxml_matches_bs4_on_fixture_pages(path):
+    html = read(path)
+    assert parse_html_lxml(html) == _parse_html_bs4(html)
+
+
+def test_fixture_pages_exist():
+    assert len(FIXTURES) >= 5
+
+
+def test_boilerplate_is_dropped():
+    text = parse_html_lxml(read(FIXTURES[0]))
+    for boilerplate in ('Home', 'Related:', 'Share this', 'Subscribe', 'analytics', 'line-height'):
+        assert boilerplate not in text
+
+
+@pytest.mark.parametrize('parse', [parse_html_lxml, _parse_html_bs4])
+def test_inline_markup_keeps_words_apart(parse):
+    text = parse(read(os.path.join(os.path.dirname(FIXTURES[0]), 'inline_markup.html')))
+    assert "The team sampled forty sites along the river, following the published method so" in text
+    assert "and most sharply after heavy rain, when" in text
+
+
+def test_nested_divs_emit_each_text_once():
+    text = parse_html_lxml(nested_page())
+    for paragraph in PARAGRAPHS:
+        assert text.count(paragraph) == 1
+    assert text.endswith("Loose text before the inner paragraph of a block. The inner paragraph of the same block. "
+                         "Loose text after the inner paragraph of a block.")
+    # BeautifulSoup repeats a paragraph once for every div around it
+    assert _parse_html_bs4(nested_page()).count(PARAGRAPHS[0]) > 1
+
+
+def test_nested_divs_keep_every_bs4_paragraph():
+    html = nested_page()
+    bs4_words = set(_parse_html_bs4(html).replace('.', '. ').split())
+    assert bs4_words <= set(parse_html_lxml(html).split())
+
+
+def test_parse_html_content_uses_the_requested_backend():
+    html = nested_page()
+    assert parse_html_content(html, backend='lxml') == parse_html_lxml(html)
+    assert parse_html_content(html, backend='bs4') == _parse_html_bs4(html)
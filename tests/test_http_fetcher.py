@@ -0,0 +1,36 @@
+"""URLs are normalized so requests for the same page share one job, and only those."""
+import pytest
+from flask import Flask
+
+from routes import api
+from utils.http_fetcher import normalize_url
+
+
+@pytest.mark.parametrize('first, second', [
+    ('HTTPS://Example.com:443/a?b=2&a=1#top', 'https://example.com/a?a=1&b=2'),
+    ('https://example.com/a?utm_source=x&fbclid=y&id=7', 'https://example.com/a?id=7'),
+    ('https://example.com', 'https://example.com/'),
+])
+def test_same_page(first, second):
+    assert normalize_url(first) == normalize_url(second)
+
+
+@pytest.mark.parametrize('first, second', [
+    ('https://github.com/org/repo/blob/x?ref=main', 'https://github.com/org/repo/blob/x?ref=v2'),
+    ('https://example.com/a?id=1', 'https://example.com/a?id=2'),
+    ('https://example.com:8443/a', 'https://example.com/a'),
+])
+def test_different_pages(first, second):
+    assert normalize_url(first) != normalize_url(second)
+
+
+@pytest.mark.parametrize('url', ['http://example.com:99999/', 'https://example.com:port/', 'http://[::1/'])
+def test_unparsable_urls_are_rejected(url):
+    with pytest.raises(ValueError):
+        normalize_url(url)
+
+    app = Flask(__name__)
+    app.register_blueprint(api.api_bp)
+    response = app.test_client().post('/generate', json={'source': url})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Please provide a valid URL'
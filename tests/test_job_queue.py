@@ -0,0 +1,44 @@
+"""A shut down job queue takes no more jobs, and the health probes report it down."""
+import threading
+
+import pytest
+from flask import Flask
+
+from routes import api
+from utils.job_queue import JobQueue, AsyncJobQueue, QueueFullError
+
+
+@pytest.mark.parametrize('queue_class', [JobQueue, AsyncJobQueue])
+def test_shut_down_queue_is_reported_down(queue_class, tmp_path, monkeypatch):
+    queue = queue_class(str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(api, 'job_queue', queue)
+    app = Flask(__name__)
+    app.config.update(AUDIO_FOLDER=str(tmp_path), UPLOAD_FOLDER=str(tmp_path), READY_MIN_FREE_MB=0)
+    app.register_blueprint(api.api_bp)
+    client = app.test_client()
+    assert queue.alive()
+    assert client.get('/healthz').status_code == 200
+    assert client.get('/readyz').get_json()['checks']['workers']['ok']
+
+    api.shutdown_job_queue()
+    assert not queue.alive()
+    assert client.get('/healthz').status_code == 503
+    assert not client.get('/readyz').get_json()['checks']['workers']['ok']
+    with pytest.raises(QueueFullError):
+        queue.submit(lambda job_id: None)
+
+
+def test_shutdown_waits_for_running_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    started, release = threading.Event(), threading.Event()
+
+    def job(job_id):
+        started.set()
+        release.wait(5)
+        return {'done': True}
+
+    job_id = queue.submit(job)
+    started.wait(5)
+    threading.Timer(0.1, release.set).start()
+    queue.shutdown()
+    assert queue.get(job_id)['status'] == 'completed'
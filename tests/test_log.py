@@ -0,0 +1,28 @@
+"""Log lines keep their key=value fields next to the message, ahead of any traceback."""
+import sys
+import logging
+
+from utils.log import KeyValueFormatter
+
+
+def format_record(exc_info=None, **extra):
+    logger = logging.getLogger('narrator.test')
+    record = logger.makeRecord(logger.name, logging.ERROR, __file__, 1, "Chunk failed", (), exc_info, extra=extra)
+    return KeyValueFormatter('%(levelname)s %(name)s %(message)s').format(record)
+
+
+def test_fields_follow_the_message():
+    assert format_record(chunk=3, error="HTTP 503 busy") == 'ERROR narrator.test Chunk failed chunk=3 error="HTTP 503 busy"'
+
+
+def test_traceback_comes_after_the_fields():
+    try:
+        raise ValueError("bad chunk")
+    except ValueError:
+        text = format_record(sys.exc_info(), chunk=3)
+
+    first, *rest = text.split('\n')
+    assert first == 'ERROR narrator.test Chunk failed chunk=3'
+    assert rest[0] == 'Traceback (most recent call last):'
+    assert rest[-1] == 'ValueError: bad chunk'
+    assert text.count('Traceback') == 1
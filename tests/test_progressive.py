@@ -0,0 +1,119 @@
+"""Progressive streams live in files any worker can serve, and only a few requests may follow each one."""
+import time
+import threading
+
+import pytest
+from flask import Flask
+
+from routes import api
+from utils.job_queue import JobQueue
+from utils import progressive
+from utils.progressive import ProgressiveAudio, open_stream, get_stream, finish_stream
+
+
+@pytest.fixture
+def streams(tmp_path, monkeypatch):
+    monkeypatch.setattr(progressive, '_directory', str(tmp_path))
+    monkeypatch.setattr(progressive, '_max_listeners', 1)
+    monkeypatch.setattr(progressive, '_listeners', {})
+    monkeypatch.setattr(progressive, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(progressive, 'ALIVE_CHECK_INTERVAL', 0.05)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def client(streams, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, 'job_queue', JobQueue(str(tmp_path / 'jobs.db')))
+    app = Flask(__name__)
+    app.register_blueprint(api.api_bp)
+    return app.test_client()
+
+
+def test_stream_is_readable_from_another_process(streams):
+    stream = open_stream('job1')
+    stream.append(b'first part ')
+    # A reader in another worker only has the directory and the job id
+    reader = ProgressiveAudio(streams, 'job1')
+    assert reader.size == 11 and not reader.finished
+    assert reader.read(6, 10) == b'part'
+
+    stream.append(b'second part')
+    finish_stream('job1')
+    assert reader.finished and not reader.failed
+    assert reader.read(0) == b'first part second part'
+
+
+def test_listener_follows_parts_until_the_end(streams):
+    stream = open_stream('job2')
+    stream.append(b'a' * 10)
+    received = []
+    listener = threading.Thread(target=lambda: received.extend(get_stream('job2').iter_from(4, block_size=4)))
+    listener.start()
+    stream.append(b'b' * 10)
+    finish_stream('job2')
+    listener.join(5)
+    assert not listener.is_alive()
+    assert b''.join(received) == b'a' * 6 + b'b' * 10
+
+
+def test_listener_waits_while_the_job_is_alive(streams):
+    stream = open_stream('job5')
+    stream.append(b'a')
+    alive = threading.Event()
+    alive.set()
+    received = []
+    listener = threading.Thread(target=lambda: received.extend(stream.iter_from(0, alive=alive.is_set)))
+    listener.start()
+
+    # A slow part is waited for as long as the job is alive
+    listener.join(0.5)
+    assert listener.is_alive()
+    stream.append(b'b')
+    # A job that dies without finishing the stream releases its listeners
+    alive.clear()
+    listener.join(5)
+    assert not listener.is_alive()
+    assert b''.join(received) == b'ab'
+
+
+def test_failed_and_unknown_streams(streams):
+    open_stream('job3')
+    finish_stream('job3', failed=True)
+    assert get_stream('job3').failed
+    assert get_stream('missing') is None
+    assert get_stream('../job3') is None
+
+
+def test_followers_are_capped(client, streams):
+    stream = open_stream('job4')
+    stream.append(b'\xff' * 100)
+
+    following = client.get('/jobs/job4/audio', buffered=False)
+    assert following.status_code == 200
+    rejected = client.get('/jobs/job4/audio')
+    assert rejected.status_code == 503 and rejected.headers['Retry-After']
+    # The cap is per stream: another job's stream can still be followed
+    open_stream('job6').append(b'\xff' * 10)
+    other = client.get('/jobs/job6/audio', buffered=False)
+    assert other.status_code == 200
+    other.close()
+    # Range requests answer from what is there and do not hold a slot
+    assert client.get('/jobs/job4/audio', headers={'Range': 'bytes=10-19'}).status_code == 206
+
+    following.close()
+    finish_stream('job4')
+    assert client.get('/jobs/job4/audio').get_data() == b'\xff' * 100
+
+
+def test_job_is_active_until_it_ends(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    release = threading.Event()
+    job_id = queue.submit(lambda job_id: release.wait(5))
+    assert queue.active(job_id)
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while queue.get(job_id)['status'] != 'completed' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not queue.active(job_id)
+    assert not queue.active('missing')
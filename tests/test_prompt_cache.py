@@ -0,0 +1,83 @@
+"""Script requests are laid out for Anthropic prompt caching."""
+import asyncio
+
+import pytest
+
+from benchmarks.fake_clients import FakeAnthropic, FakeAsyncAnthropic
+from utils.script_generator import ScriptGenerator, CACHE_CONTROL
+
+SENTENCE = "The committee measured water quality at forty sites along the river every week for two years. "
+
+
+def make_document(number, chars=40000):
+    return f"Report {number}. " + SENTENCE * (chars // len(SENTENCE))
+
+
+def stream_script(mode, document, usage=None, resume=None):
+    """Return (script, request) for one script request through the fake client in `mode`."""
+    if mode == 'async':
+        client = FakeAsyncAnthropic(tokens_per_second=1e6, first_token_latency=0, output_tokens=200)
+        generator = ScriptGenerator(None, async_client=client)
+
+        async def collect():
+            return ''.join([delta async for delta in generator.astream_podcast_script(document, usage, resume)])
+
+        return asyncio.run(collect()), client
+    client = FakeAnthropic(tokens_per_second=1e6, first_token_latency=0, output_tokens=200)
+    generator = ScriptGenerator(None, client=client)
+    return ''.join(generator.stream_podcast_script(document, usage, resume)), client
+
+
+def assert_cacheable(request, document):
+    system = request['system']
+    assert isinstance(system, list) and system[-1].get('cache_control') == CACHE_CONTROL
+
+    content = request['messages'][0]['content']
+    assert isinstance(content, list) and len(content) >= 2
+    # The document is the first user block, ending in its own breakpoint
+    assert document in content[0]['text'] and content[0].get('cache_control') == CACHE_CONTROL
+    # Per-request instructions follow, uncached and without the document
+    for block in content[1:]:
+        assert document not in block['text'] and 'cache_control' not in block
+
+
+@pytest.mark.parametrize('mode', ['threads', 'async'])
+def test_script_request_is_laid_out_for_prompt_caching(mode):
+    document = make_document(0)
+    script, client = stream_script(mode, document)
+    assert script
+    assert len(client.requests) == 1
+    assert_cacheable(client.requests[0], document)
+
+
+def test_repeat_requests_read_the_prompt_cache():
+    client = FakeAnthropic(tokens_per_second=1e6, first_token_latency=0, output_tokens=200)
+    generator = ScriptGenerator(None, client=client)
+    document = make_document(0)
+
+    first, second, other = {}, {}, {}
+    ''.join(generator.stream_podcast_script(document, first))
+    ''.join(generator.stream_podcast_script(document, second))
+    ''.join(generator.stream_podcast_script(make_document(1), other))
+
+    assert first['cache_creation_input_tokens'] and not first.get('cache_read_input_tokens')
+    # The instructions and the document come from the cache; only the tail is billed in full
+    assert second['cache_read_input_tokens'] >= first['cache_creation_input_tokens']
+    assert second['input_tokens'] < first['cache_creation_input_tokens'] // 10
+    # Another document is a new prefix and is written to the cache on its own
+    assert other['cache_creation_input_tokens'] and not other.get('cache_read_input_tokens')
+    for request in client.requests:
+        assert_cacheable(request, request['messages'][0]['content'][0]['text'][len('Content: '):])
+
+
+def test_resumed_request_keeps_the_cached_prefix():
+    document = make_document(0)
+    resume = "Welcome back to the show. Today we look at a river study.  "
+    usage = {}
+    script, client = stream_script('threads', document, usage, resume)
+
+    request = client.requests[0]
+    assert_cacheable(request, document)
+    # The interrupted script is prefilled as the assistant turn, trailing whitespace stripped
+    assert request['messages'][-1] == {'role': 'assistant', 'content': resume.rstrip()}
+    assert script.startswith(resume.rstrip())
@@ -0,0 +1,141 @@
+"""Upstream requests are retried only when the error is transient, and admission waits stay out of stage timings."""
+import time
+import asyncio
+import logging
+
+import pytest
+
+from utils.admission import Limiter, UPSTREAM_RETRIES
+from utils.audio_utils import AudioGenerator
+from benchmarks.fake_clients import FakeAnthropic, FakeOpenAI, FakeAsyncOpenAI
+from utils.script_generator import ScriptGenerator
+
+DOCUMENT = "The committee measured water quality at forty sites along the river every week. " * 20
+
+
+class StatusError(Exception):
+    """An API error with an HTTP status and a short Retry-After, like the SDKs raise."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type('Response', (), {'headers': {'retry-after': '0.01'}})()
+
+
+class SlowLimiter(Limiter):
+    """Admits every request after `wait` seconds."""
+
+    def __init__(self, wait):
+        super().__init__('test', None, None)
+        self.wait = wait
+
+    def acquire(self, tokens=0):
+        time.sleep(self.wait)
+        return self.wait
+
+    async def aacquire(self, tokens=0):
+        await asyncio.sleep(self.wait)
+        return self.wait
+
+
+def retries_counted():
+    return sum(UPSTREAM_RETRIES._values.values())
+
+
+def failing(client, statuses, mode='threads'):
+    """Make the fake client's first requests raise StatusError with `statuses`, in order."""
+    statuses = list(statuses)
+    if hasattr(client, 'audio'):
+        owner, create = client.audio.speech, client.audio.speech.create
+    else:
+        owner, create = client.messages, client.messages.create
+
+    def check():
+        if statuses:
+            raise StatusError(statuses.pop(0))
+
+    if mode == 'async':
+        async def wrapped(**kwargs):
+            check()
+            return await create(**kwargs)
+    else:
+        def wrapped(**kwargs):
+            check()
+            return create(**kwargs)
+    owner.create = wrapped
+    return client
+
+
+def synthesize(mode, client, limiter=None):
+    if mode == 'async':
+        generator = AudioGenerator(async_openai_client=client, openai_client=client, limiter=limiter)
+
+        async def collect():
+            async def segments():
+                yield "A single sentence to speak."
+            return await generator.acreate_audio_streaming(segments())
+
+        return asyncio.run(collect())
+    generator = AudioGenerator(openai_client=client, limiter=limiter)
+    return generator.create_audio_streaming(["A single sentence to speak."])
+
+
+def tts_client(mode):
+    return (FakeAsyncOpenAI if mode == 'async' else FakeOpenAI)(latency=0)
+
+
+@pytest.mark.parametrize('mode', ['threads', 'async'])
+@pytest.mark.parametrize('status', [400, 401])
+def test_tts_client_errors_are_not_retried(mode, status):
+    client = failing(tts_client(mode), [status], mode)
+    before = retries_counted()
+
+    assert synthesize(mode, client) is None
+    assert client.calls == 0
+    assert retries_counted() == before
+
+
+@pytest.mark.parametrize('mode', ['threads', 'async'])
+def test_tts_server_errors_are_retried(mode):
+    client = failing(tts_client(mode), [503, 429], mode)
+    before = retries_counted()
+
+    assert synthesize(mode, client)
+    assert client.calls == 1
+    assert retries_counted() == before + 2
+
+
+def test_script_client_errors_are_not_retried():
+    client = failing(FakeAnthropic(tokens_per_second=1e6, first_token_latency=0, output_tokens=100), [400])
+    generator = ScriptGenerator(None, client=client)
+    before = retries_counted()
+
+    with pytest.raises(StatusError):
+        ''.join(generator.stream_podcast_script(DOCUMENT))
+    assert client.calls == 0
+    assert retries_counted() == before
+
+
+def stage_records(caplog, stage):
+    return [r for r in caplog.records if getattr(r, 'stage', None) == stage and r.getMessage() == "Stage finished"]
+
+
+@pytest.mark.parametrize('mode', ['threads', 'async'])
+def test_tts_admission_wait_is_not_timed_as_synthesis(mode, caplog):
+    with caplog.at_level(logging.INFO):
+        assert synthesize(mode, tts_client(mode), limiter=SlowLimiter(0.2))
+
+    [record] = stage_records(caplog, 'tts_chunk')
+    assert record.admission_ms == 200
+    assert record.duration_ms < 100
+
+
+def test_script_admission_wait_is_not_timed_as_generation(caplog):
+    client = FakeAnthropic(tokens_per_second=1e6, first_token_latency=0, output_tokens=100)
+    generator = ScriptGenerator(None, client=client, limiter=SlowLimiter(0.2))
+    with caplog.at_level(logging.INFO):
+        assert ''.join(generator.stream_podcast_script(DOCUMENT))
+
+    [record] = stage_records(caplog, 'script_llm')
+    assert record.admission_ms == 200
+    assert record.duration_ms < 100
@@ -0,0 +1,8 @@
+"""Starting the app loads no parser or API client library; jobs import them on first use."""
+from benchmarks.bench_startup import LAZY_MODULES, import_once
+
+
+def test_heavy_libraries_stay_out_of_startup(tmp_path):
+    _, modules = import_once(str(tmp_path))
+    assert 'app' in modules
+    assert sorted(name for name in LAZY_MODULES if name in modules) == []
@@ -0,0 +1,55 @@
+"""Segments cut from a streamed script depend only on the text, not on how it arrived."""
+import random
+import asyncio
+
+import pytest
+
+from benchmarks.fake_clients import FAKE_SCRIPT_SENTENCES
+from utils.streaming import SentenceSplitter, iter_segments, aiter_segments
+
+SCRIPT = (' '.join(FAKE_SCRIPT_SENTENCES[i % len(FAKE_SCRIPT_SENTENCES)] for i in range(300))
+          + '\n\nA new paragraph starts here. ' + 'word ' * 1500)
+
+
+def random_deltas(text, seed):
+    rng = random.Random(seed)
+    deltas = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 400)
+        deltas.append(text[position:position + size])
+        position += size
+    return deltas
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_segments_do_not_depend_on_delta_sizes(seed):
+    assert list(iter_segments(random_deltas(SCRIPT, seed))) == list(iter_segments([SCRIPT]))
+
+
+def test_async_segments_match():
+    async def deltas():
+        for delta in random_deltas(SCRIPT, 0):
+            yield delta
+
+    async def collect():
+        return [segment async for segment in aiter_segments(deltas())]
+
+    assert asyncio.run(collect()) == list(iter_segments([SCRIPT]))
+
+
+def test_segment_sizes():
+    splitter = SentenceSplitter()
+    segments = list(iter_segments([SCRIPT]))
+    assert splitter.first_min_chars <= len(segments[0]) < splitter.min_chars
+    assert all(len(segment) <= splitter.max_chars for segment in segments)
+    # Every segment ends a sentence, except where a run without any boundary is cut on whitespace
+    for segment in segments[:-1]:
+        assert segment.endswith(('.', '?', 'word'))
+    assert ' '.join(segments).split() == SCRIPT.split()
+
+
+def test_boundary_at_the_end_of_a_delta_waits_for_more_text():
+    splitter = SentenceSplitter(min_chars=10, first_min_chars=10)
+    assert splitter.feed("First sentence is here.") == []
+    assert splitter.feed("..  Next") == ["First sentence is here..."]
@@ -0,0 +1,91 @@
+"""Invariants of the shared sentence-aware chunker on random documents."""
+import re
+import random
+
+import pytest
+
+from utils.text_chunker import iter_chunks, iter_sentences, estimate_tokens
+
+PIECES = [
+    "The model was trained on a large corpus", "Dr. Smith et al. reported similar results",
+    "Is this really the case?", "Yes!", "See Fig. 3 for details", "Costs rose 4.5% in the U.S. last year",
+    "\n\nA new paragraph starts here", "It works, e.g. for images and text", "J. R. R. Tolkien wrote it",
+]
+
+
+def random_document(rng, size):
+    """Prose with abbreviations, newlines and ?/!, plus the odd run-on sentence and unbroken blob."""
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.01:
+            piece = ' '.join(rng.choice(PIECES) for _ in range(rng.randint(50, 400)))
+        elif rng.random() < 0.002:
+            piece = 'x' * rng.randint(100, 9000)
+        else:
+            piece = rng.choice(PIECES) + rng.choice(['. ', '? ', '! ', '.\n', '. '])
+        parts.append(piece)
+        length += len(piece)
+    return ''.join(parts)
+
+
+def documents(count=200):
+    rng = random.Random(0)
+    return [(random_document(rng, rng.randint(0, 20000)), rng.choice([50, 200, 1000, 4000])) for _ in range(count)]
+
+
+def squeeze(text):
+    return re.sub(r'\s+', '', text)
+
+
+@pytest.mark.parametrize('text, max_chars', documents())
+def test_chunks_keep_the_limit_and_the_text(text, max_chars):
+    chunks = list(iter_chunks(text, max_chars=max_chars))
+    assert all(0 < len(chunk) <= max_chars for chunk in chunks)
+    assert squeeze(''.join(chunks)) == squeeze(text)
+
+
+@pytest.mark.parametrize('text, max_chars', documents(50))
+def test_chunks_keep_the_token_budget(text, max_chars):
+    budget = max_chars // 4
+    chunks = list(iter_chunks(text, max_tokens=budget))
+    assert all(estimate_tokens(chunk) <= budget + 1 for chunk in chunks)
+    assert squeeze(''.join(chunks)) == squeeze(text)
+
+
+def test_sentences_tile_the_text():
+    text = random_document(random.Random(1), 5000)
+    spans = list(iter_sentences(text))
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+
+
+def test_abbreviations_and_initials_do_not_end_sentences():
+    text = "Dr. Smith et al. compared it, e.g. in Fig. 3 of the U.S. study by J. R. R. Tolkien. Then it ended."
+    assert [text[start:end].strip() for start, end in iter_sentences(text)] == [
+        "Dr. Smith et al. compared it, e.g. in Fig. 3 of the U.S. study by J. R. R. Tolkien.",
+        "Then it ended.",
+    ]
+
+
+def test_chunks_end_on_sentence_boundaries():
+    sentences = [f"Sentence number {number} is here." for number in range(40)]
+    for chunk in iter_chunks(' '.join(sentences), max_chars=100):
+        assert chunk.endswith('.')
+        assert chunk.startswith('Sentence')
+
+
+def test_overlap_repeats_the_end_of_the_previous_chunk():
+    text = ' '.join(f"Sentence number {number} is here." for number in range(40))
+    chunks = list(iter_chunks(text, max_chars=120, overlap=30))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        head = chunk.split('.')[0]
+        assert head in previous
+        assert len(chunk) <= 120
+
+
+def test_exactly_one_limit_is_required():
+    with pytest.raises(ValueError):
+        list(iter_chunks("text", max_chars=10, max_tokens=10))
+    with pytest.raises(ValueError):
+        list(iter_chunks("text"))
@@ -0,0 +1,239 @@
+"""Shared admission control for upstream API calls: rate limits, priority lanes and backoff."""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+# Waiting requests are admitted in this order, first in first out within a lane
+LANES = (INTERACTIVE, BATCH)
+
+# Statuses worth retrying: timeouts, rate limits, server errors and Anthropic's 529 "overloaded"
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504, 529)
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 60.0
+# How often a waiting async request, or one that is not first in line, checks again
+POLL_INTERVAL = 0.05
+
+# (requests/min, tokens/min) when <NAME>_RPM / <NAME>_TPM are not set: the providers' entry tiers
+DEFAULT_LIMITS = {
+    'anthropic': (50, 0),
+    'openai_tts': (500, 0),
+}
+
+ADMISSION_WAITING = REGISTRY.gauge(
+    'narrator_admission_waiting', 'Upstream requests waiting for admission', ('provider', 'lane'))
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    'narrator_admission_wait_seconds', 'Time upstream requests waited for admission', ('provider', 'lane'))
+UPSTREAM_RETRIES = REGISTRY.counter(
+    'narrator_upstream_retries_total', 'Upstream requests retried, by provider and HTTP status', ('provider', 'status'))
+
+_lane = contextvars.ContextVar('admission_lane', default=INTERACTIVE)
+
+
+@contextmanager
+def lane(name):
+    """Run upstream calls made inside the block (and tasks/threads started with its context) in `name`."""
+    if name not in LANES:
+        raise ValueError(f"Unknown admission lane {name!r}")
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """Allows `per_minute` units per minute, in bursts of up to `per_minute`."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (requests above capacity wait for a full bucket)."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(amount, self.capacity)
+        return 0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount):
+        # May go negative; later requests then wait until it refills
+        self.level -= amount
+
+
+class Limiter:
+    """Admission control for one provider, shared by every job in the process.
+
+    Requests wait in priority lanes until the requests-per-minute and
+    tokens-per-minute buckets allow them (either limit may be None). When
+    the provider answers 429 with a Retry-After, every request to it is
+    held back for that long, not just the one that was rejected.
+    """
+
+    def __init__(self, name, rpm=None, tpm=None):
+        self.name = name
+        self._requests = TokenBucket(rpm) if rpm else None
+        self._tokens = TokenBucket(tpm) if tpm else None
+        self._paused_until = 0.0
+        self._waiting = {lane_name: deque() for lane_name in LANES}
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens=0):
+        """Block until a request of `tokens` (estimated) tokens may be sent; return the seconds waited."""
+        ticket, started = self._enqueue()
+        try:
+            with self._cond:
+                while True:
+                    wait = self._admit(ticket, tokens)
+                    if wait == 0:
+                        break
+                    self._cond.wait(POLL_INTERVAL if wait is None else wait)
+        finally:
+            self._dequeue(ticket)
+        return self._waited(ticket, started)
+
+    async def aacquire(self, tokens=0):
+        """Async variant of acquire; waits without blocking the event loop."""
+        ticket, started = self._enqueue()
+        try:
+            while True:
+                with self._cond:
+                    wait = self._admit(ticket, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(POLL_INTERVAL if wait is None else min(wait, POLL_INTERVAL * 10))
+        finally:
+            self._dequeue(ticket)
+        return self._waited(ticket, started)
+
+    def settle(self, estimated, actual):
+        """Charge the token bucket for the difference between a request's estimate and its usage."""
+        if self._tokens and actual is not None:
+            with self._cond:
+                self._tokens.take(actual - estimated)
+
+    def backoff(self, attempt, error=None):
+        """Return how long to wait before retry `attempt` (0-based) of a request that raised `error`.
+
+        Uses the error's Retry-After when there is one (and pauses the whole
+        provider for that long), otherwise exponential backoff with full jitter.
+        """
+        status = getattr(error, 'status_code', None)
+        UPSTREAM_RETRIES.inc(provider=self.name, status=status or 'error')
+        delay = retry_after(error)
+        if delay is None:
+            return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt + 1)))
+        if status == 429:
+            with self._cond:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        # A little jitter so paused requests do not all return at the same instant
+        return delay + random.uniform(0, BACKOFF_BASE)
+
+    def _enqueue(self):
+        ticket = _Ticket(_lane.get())
+        with self._cond:
+            self._waiting[ticket.lane].append(ticket)
+        ADMISSION_WAITING.inc(provider=self.name, lane=ticket.lane)
+        return ticket, time.monotonic()
+
+    def _dequeue(self, ticket):
+        with self._cond:
+            queue = self._waiting[ticket.lane]
+            if ticket in queue:
+                queue.remove(ticket)
+            self._cond.notify_all()
+        ADMISSION_WAITING.dec(provider=self.name, lane=ticket.lane)
+
+    def _admit(self, ticket, tokens):
+        """Admit `ticket` if it is first in line and the limits allow; otherwise return the wait.
+
+        Must be called holding self._cond. Returns 0 once admitted, or None
+        while another request is ahead in line.
+        """
+        head = next((queue[0] for queue in self._waiting.values() if queue), None)
+        if head is not ticket:
+            return None
+        now = time.monotonic()
+        wait = max(
+            self._paused_until - now,
+            self._requests.wait_time(1, now) if self._requests else 0,
+            self._tokens.wait_time(tokens, now) if self._tokens else 0,
+        )
+        if wait > 0:
+            return wait
+        if self._requests:
+            self._requests.take(1)
+        if self._tokens:
+            self._tokens.take(tokens)
+        self._waiting[ticket.lane].popleft()
+        self._cond.notify_all()
+        return 0
+
+    def _waited(self, ticket, started):
+        waited = time.monotonic() - started
+        ADMISSION_WAIT_SECONDS.observe(waited, provider=self.name, lane=ticket.lane)
+        return waited
+
+
+class _Ticket:
+    """A request waiting for admission; compared by identity."""
+
+    __slots__ = ('lane',)
+
+    def __init__(self, lane_name):
+        self.lane = lane_name
+
+
+def is_retryable(error):
+    """True if `error` is an API error worth retrying (rate limit, overload, server error)."""
+    return getattr(error, 'status_code', None) in RETRY_STATUSES
+
+
+def retry_after(error):
+    """Return the delay in seconds requested by an API error's Retry-After headers, if any."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return max(0.0, float(headers['retry-after-ms']) / 1000)
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Return the shared limiter for a provider, configured from <NAME>_RPM and <NAME>_TPM (0 disables)."""
+    with _limiters_lock:
+        if name not in _limiters:
+            prefix = name.upper()
+            defaults = DEFAULT_LIMITS.get(name, (0, 0))
+            rpm = int(os.getenv(f'{prefix}_RPM', defaults[0]))
+            tpm = int(os.getenv(f'{prefix}_TPM', defaults[1]))
+            _limiters[name] = Limiter(name, rpm or None, tpm or None)
+            logger.info("Admission limits", extra={'provider': name, 'rpm': rpm, 'tpm': tpm})
+        return _limiters[name]
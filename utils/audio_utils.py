@@ -1,167 +1,355 @@
 import os
 import io
+import sys
+import time
 import math
+import array
+import asyncio
+import functools
 import struct
+import logging
 import tempfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+from .cache import get_cache
+from .admission import get_limiter, is_retryable
+from .mp3 import concat_mp3
+from .text_chunker import iter_chunks
+from .metrics import span
 
 try:
     import win32com.client
 except ImportError:
     win32com = None
 
+logger = logging.getLogger(__name__)
+
+TTS_MODEL = "tts-1-hd"
+TTS_VOICE = "alloy"
+# Voices a chapter can be re-recorded in
+TTS_VOICES = ("alloy", "ash", "coral", "echo", "fable", "nova", "onyx", "sage", "shimmer")
+
+# The fallback tone lasts as long as the script would take to read aloud
+FALLBACK_WORDS_PER_MINUTE = int(os.getenv('FALLBACK_WPM', 150))
+FALLBACK_SAMPLE_RATE = 22050
+
+
 class AudioGenerator:
-    def __init__(self):
-        self.openai_client = None
-        self._init_openai_tts()
+    def __init__(self, openai_client=None, max_concurrency=None, max_retries=None, async_openai_client=None,
+                 limiter=None):
+        self._openai_client = openai_client
+        self._async_openai_client = async_openai_client
+        self.limiter = limiter or get_limiter('openai_tts')
+        self._openai_key = None
+        self._client_lock = threading.Lock()
+        self.max_concurrency = max_concurrency or int(os.getenv('TTS_CONCURRENCY', 4))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('TTS_MAX_RETRIES', 3))
+        if not self._openai_client:
+            self._init_openai_tts()
     
     def _init_openai_tts(self):
-        """Initialize OpenAI TTS."""
+        """Configure OpenAI TTS; the client itself is created on first use."""
+        openai_key = os.getenv('OPENAI_API_KEY')
+        if openai_key:
+            self._openai_key = openai_key
+            logger.info("OpenAI TTS configured")
+        else:
+            logger.warning("OpenAI API key not found")
+    
+    @property
+    def backend(self):
+        """The TTS backend create_audio will use: 'openai', 'sapi' or 'fallback'.
+        
+        Decided from the configuration alone, without creating a client.
+        """
+        if self._openai_client or self._openai_key:
+            return 'openai'
+        return 'sapi' if win32com else 'fallback'
+    
+    @property
+    def openai_client(self):
+        """OpenAI client, or None; created from OPENAI_API_KEY (and the SDK imported) on first use."""
+        if self._openai_client is None and self._openai_key:
+            with self._client_lock:
+                if self._openai_client is None and self._openai_key:
+                    self._openai_client = self._create_openai_client('OpenAI')
+        return self._openai_client
+    
+    @property
+    def async_openai_client(self):
+        """AsyncOpenAI client for the async job mode, or None.
+        
+        Created on first use when the sync client was configured from
+        OPENAI_API_KEY; an injected sync client gets no async counterpart.
+        """
+        if self._async_openai_client is None and self._openai_key:
+            with self._client_lock:
+                if self._async_openai_client is None and self._openai_key:
+                    self._async_openai_client = self._create_openai_client('AsyncOpenAI')
+        return self._async_openai_client
+    
+    def _create_openai_client(self, class_name):
         try:
-            if OpenAI:
-                openai_key = os.getenv('OPENAI_API_KEY')
-                if openai_key:
-                    print("Initializing OpenAI TTS...")
-                    self.openai_client = OpenAI(api_key=openai_key)
-                    print("OpenAI TTS initialized successfully")
-                else:
-                    print("OpenAI API key not found")
-            else:
-                print("OpenAI client not available")
-        except Exception as e:
-            print(f"Failed to initialize OpenAI TTS: {e}")
-            self.openai_client = None
+            import openai
+            # Retries go through _synthesize_chunk so each attempt is admitted
+            return getattr(openai, class_name)(api_key=self._openai_key, max_retries=0)
+        except Exception:
+            # Without the SDK (or with a bad configuration) fall back to the other backends
+            logger.exception("Failed to initialize OpenAI TTS")
+            self._openai_key = None
+            return None
     
     def create_audio(self, text):
-        print(f"AudioGenerator.create_audio called with {len(text)} characters")
-        print(f"OpenAI TTS available: {self.openai_client is not None}")
-        print(f"Windows SAPI available: {win32com is not None}")
-        
         if self.openai_client:
-            print("Using OpenAI TTS")
+            logger.info("Synthesizing with OpenAI TTS", extra={'chars': len(text)})
             return self._openai_tts(text)
         elif win32com:
-            print("Using Windows SAPI")
+            logger.info("Synthesizing with Windows SAPI", extra={'chars': len(text)})
             return self._windows_sapi(text)
         else:
-            print("Using fallback audio")
+            logger.warning("No TTS backend available, using fallback audio", extra={'chars': len(text)})
             return self._fallback_audio(text)
     
-    def _chunk_text(self, text, max_length=4500):
-        if len(text) <= max_length:
-            return [text]
+    def create_audio_streaming(self, segments, on_part=None, checkpoint=None):
+        """Synthesize text segments while they are still being produced.
+        
+        Each segment is submitted for synthesis as soon as it arrives, so TTS
+        overlaps with whatever is generating the segments (usually the script
+        stream). `on_part(index, audio_bytes)` is called in script order as
+        parts finish. Errors raised by the segment iterator propagate; TTS
+        failures stop further synthesis and return None once the iterator is
+        exhausted. With a `checkpoint` (utils.checkpoints.Checkpoint), every
+        finished part is saved to it and parts already there are reused.
+        """
+        if not self.openai_client:
+            return self.create_audio(' '.join(segments))
         
-        chunks = []
-        sentences = text.split('. ')
-        current_chunk = ""
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='tts')
+        futures = []
+        parts = _Parts(on_part)
         
-        for sentence in sentences:
-            if len(current_chunk + sentence) > max_length and current_chunk:
-                chunks.append(current_chunk.strip() + '.')
-                current_chunk = sentence
-            else:
-                current_chunk += sentence + '. ' if current_chunk else sentence
+        def drain(wait):
+            while not parts.failed and len(parts) < len(futures):
+                future = futures[len(parts)]
+                if not wait and not future.done():
+                    return
+                parts.collect(future.result)
         
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        try:
+            for segment in segments:
+                if parts.failed:
+                    continue  # keep consuming so the script still completes
+                futures.append(executor.submit(
+                    contextvars.copy_context().run, self._synthesize_chunk, len(futures), segment, checkpoint
+                ))
+                drain(wait=False)
+            drain(wait=True)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
         
-        return chunks
+        if not parts.complete:
+            return None
+        return parts.single or self._combine_audio_parts(parts.audio)
+    
+    def _chunk_text(self, text, max_length=4500):
+        return list(iter_chunks(text, max_chars=max_length))
     
     def _openai_tts(self, text):
-        """Generate audio using OpenAI TTS."""
+        """Generate audio using OpenAI TTS, synthesizing chunks concurrently."""
         try:
             chunks = self._chunk_text(text, max_length=4000)  # OpenAI limit
-            audio_parts = []
+            workers = max(1, min(self.max_concurrency, len(chunks)))
+            logger.info("Synthesizing chunks", extra={'chunks': len(chunks), 'workers': workers})
             
-            for i, chunk in enumerate(chunks):
-                print(f"Processing chunk {i+1}/{len(chunks)}: {len(chunk)} characters")
-                
-                # Simple retry for network issues
-                for attempt in range(2):
-                    try:
-                        response = self.openai_client.audio.speech.create(
-                            model="tts-1-hd",
-                            voice="alloy",
-                            input=chunk,
-                            response_format="mp3"
-                        )
-                        
-                        audio_bytes = response.content
-                        audio_parts.append(audio_bytes)
-                        print(f"Generated {len(audio_bytes)} bytes for chunk {i+1}")
-                        break
-                        
-                    except Exception as e:
-                        if attempt == 0:
-                            print(f"Chunk {i+1} failed, retrying once: {e}")
-                            import time
-                            time.sleep(1)
-                        else:
-                            print(f"Chunk {i+1} failed permanently: {e}")
-                            raise e
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+            try:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self._synthesize_chunk, i, chunk)
+                    for i, chunk in enumerate(chunks)
+                ]
+                # Collect in submission order so the parts stay in script order
+                audio_parts = [future.result() for future in futures]
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
             
             if len(audio_parts) == 1:
                 return audio_parts[0]
             
             return self._combine_audio_parts(audio_parts)
             
-        except Exception as e:
-            print(f"OpenAI TTS error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("OpenAI TTS error")
             return None
     
-    def _combine_audio_parts(self, audio_parts):
+    def synthesize_segment(self, text, voice=None, refresh=False):
+        """Synthesize one script segment with OpenAI TTS, for instance to re-record it in another voice.
+        
+        With `refresh` the audio cache is not read, so the segment is sent
+        to TTS again even in a voice it was already synthesized in; the new
+        take replaces the cached one. Returns the MP3 bytes, or None without
+        an OpenAI client; raises if every attempt fails.
+        """
+        if not self.openai_client:
+            return None
+        return self._synthesize_chunk(0, text, voice=voice, refresh=refresh)
+    
+    async def asynthesize_segment(self, text, voice=None, refresh=False):
+        """Async variant of synthesize_segment."""
+        client = self.async_openai_client
+        if not client:
+            return await asyncio.to_thread(self.synthesize_segment, text, voice, refresh)
+        return await self._asynthesize_chunk(client, 0, text, voice=voice, refresh=refresh)
+    
+    def _synthesize_chunk(self, index, chunk, checkpoint=None, voice=None, refresh=False):
+        """Synthesize one chunk, retrying with exponential backoff."""
+        voice = voice or TTS_VOICE
+        audio_bytes = self._stored_chunk(index, chunk, checkpoint, voice, refresh)
+        if audio_bytes is not None:
+            return audio_bytes
+        
+        for attempt in range(self.max_retries + 1):
+            admission = self.limiter.acquire()
+            try:
+                with self._chunk_span(index, chunk, attempt, admission) as fields:
+                    response = self.openai_client.audio.speech.create(
+                        model=TTS_MODEL,
+                        voice=voice,
+                        input=chunk,
+                        response_format="mp3"
+                    )
+                    fields['bytes'] = len(response.content)
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, index, e))
+                continue
+            self._store_chunk(index, chunk, checkpoint, voice, response.content)
+            return response.content
+    
+    def _stored_chunk(self, index, chunk, checkpoint, voice, refresh):
+        """Return a chunk's audio from the checkpoint or the cache, or None if it has to be synthesized.
+        
+        With `refresh` the cache is not read (the checkpoint still is).
+        """
+        if checkpoint:
+            saved_audio = checkpoint.get_chunk(index, chunk)
+            if saved_audio is not None:
+                logger.debug("Using checkpointed audio", extra={'chunk': index + 1})
+                return saved_audio
+        if refresh:
+            return None
+        
+        cache = get_cache()
+        cached_audio = cache.get('audio', cache.key(TTS_MODEL, voice, chunk))
+        if cached_audio is not None:
+            logger.debug("Using cached audio", extra={'chunk': index + 1})
+            if checkpoint:
+                checkpoint.set_chunk(index, chunk, cached_audio)
+        return cached_audio
+    
+    def _store_chunk(self, index, chunk, checkpoint, voice, audio_bytes):
+        cache = get_cache()
+        cache.set('audio', cache.key(TTS_MODEL, voice, chunk), audio_bytes)
+        if checkpoint:
+            checkpoint.set_chunk(index, chunk, audio_bytes)
+    
+    def _chunk_span(self, index, chunk, attempt, admission):
+        # Admission waits are recorded in the span, not timed by it
+        return span('tts_chunk', chunk=index + 1, chars=len(chunk), attempt=attempt + 1,
+                    admission_ms=round(admission * 1000, 1))
+    
+    def _retry_delay(self, attempt, index, error):
+        """Return the backoff before retrying a failed chunk; re-raises errors not worth retrying."""
+        if attempt < self.max_retries and _should_retry(error):
+            delay = self.limiter.backoff(attempt, error)
+            logger.warning("Chunk failed, retrying",
+                           extra={'chunk': index + 1, 'delay': round(delay, 1), 'error': str(error)})
+            return delay
+        logger.error("Chunk failed permanently", extra={'chunk': index + 1, 'error': str(error)})
+        raise error
+    
+    async def acreate_audio_streaming(self, segments, on_part=None, checkpoint=None):
+        """Async variant of create_audio_streaming for an async iterable of segments.
+        
+        At most `max_concurrency` chunks are synthesized at once. Without an
+        async OpenAI client the segments are collected first and handed to
+        create_audio_streaming in a worker thread.
+        """
+        client = self.async_openai_client
+        if not client:
+            collected = [segment async for segment in segments]
+            return await asyncio.to_thread(self.create_audio_streaming, collected, on_part, checkpoint)
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = []
+        parts = _Parts(on_part)
+        
+        async def synthesize(index, segment):
+            async with semaphore:
+                return await self._asynthesize_chunk(client, index, segment, checkpoint)
+        
+        async def drain(wait):
+            while not parts.failed and len(parts) < len(tasks):
+                task = tasks[len(parts)]
+                if not wait and not task.done():
+                    return
+                await asyncio.wait([task])
+                parts.collect(task.result)
+        
         try:
-            import tempfile
-            import subprocess
-            
-            temp_files = []
-            for i, part in enumerate(audio_parts):
-                temp_file = tempfile.NamedTemporaryFile(suffix=f'_part_{i}.mp3', delete=False)
-                temp_file.write(part)
-                temp_file.close()
-                temp_files.append(temp_file.name)
-            
-            output_file = tempfile.NamedTemporaryFile(suffix='_combined.mp3', delete=False)
-            output_file.close()
-            
-            file_list = tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False)
-            for temp_file in temp_files:
-                file_list.write(f"file '{temp_file}'\n")
-            file_list.close()
-            
+            async for segment in segments:
+                if parts.failed:
+                    continue  # keep consuming so the script still completes
+                tasks.append(asyncio.create_task(synthesize(len(tasks), segment)))
+                await drain(wait=False)
+            await drain(wait=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        if not parts.complete:
+            return None
+        return parts.single or await asyncio.to_thread(self._combine_audio_parts, parts.audio)
+    
+    async def _asynthesize_chunk(self, client, index, chunk, checkpoint=None, voice=None, refresh=False):
+        """Async variant of _synthesize_chunk."""
+        voice = voice or TTS_VOICE
+        audio_bytes = await asyncio.to_thread(self._stored_chunk, index, chunk, checkpoint, voice, refresh)
+        if audio_bytes is not None:
+            return audio_bytes
+        
+        for attempt in range(self.max_retries + 1):
+            admission = await self.limiter.aacquire()
             try:
-                subprocess.run([
-                    'ffmpeg', '-f', 'concat', '-safe', '0', 
-                    '-i', file_list.name, '-c', 'copy', output_file.name
-                ], check=True, capture_output=True)
-                
-                with open(output_file.name, 'rb') as f:
-                    combined_audio = f.read()
-            except:
-                combined_audio = b''.join(audio_parts)
-            
-            for temp_file in temp_files + [file_list.name, output_file.name]:
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
-            
-            return combined_audio
-        except:
+                with self._chunk_span(index, chunk, attempt, admission) as fields:
+                    response = await client.audio.speech.create(
+                        model=TTS_MODEL,
+                        voice=voice,
+                        input=chunk,
+                        response_format="mp3"
+                    )
+                    fields['bytes'] = len(response.content)
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, index, e))
+                continue
+            await asyncio.to_thread(self._store_chunk, index, chunk, checkpoint, voice, response.content)
+            return response.content
+    
+    def _combine_audio_parts(self, audio_parts):
+        """Join MP3 parts frame by frame, dropping each part's ID3 and Xing headers."""
+        with span('combine', parts=len(audio_parts)) as fields:
+            combined_audio = concat_mp3(audio_parts)
+            fields['bytes'] = len(combined_audio)
+        if not combined_audio:
+            logger.warning("No MP3 frames found in audio parts, joining raw bytes")
             return b''.join(audio_parts)
+        return combined_audio
     
     def _windows_sapi(self, text):
         try:
-            print("Initializing Windows SAPI...")
             voice = win32com.client.Dispatch("SAPI.SpVoice")
             chunks = self._chunk_text(text, 800)
-            print(f"Processing {len(chunks)} chunks with SAPI")
             
             with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
                 temp_path = tmp.name
@@ -171,35 +359,83 @@ class AudioGenerator:
             voice.AudioOutputStream = file_stream
             
             for i, chunk in enumerate(chunks):
-                print(f"Speaking chunk {i+1}/{len(chunks)}")
-                voice.Speak(chunk)
+                with span('sapi_chunk', chunk=i + 1, chars=len(chunk)):
+                    voice.Speak(chunk)
             
             file_stream.Close()
             
             with open(temp_path, 'rb') as f:
                 audio_data = f.read()
             
-            print(f"Generated {len(audio_data)} bytes of audio data")
             os.unlink(temp_path)
             return audio_data
-        except Exception as e:
-            print(f"Windows SAPI error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Windows SAPI error")
             return None
     
     def _fallback_audio(self, text):
-        duration = min(30, max(5, len(text) // 100))
-        sample_rate = 22050
-        samples = duration * sample_rate
+        """Generate a placeholder tone lasting as long as the script would take to read."""
+        words = len(text.split())
+        duration = max(1.0, words / FALLBACK_WORDS_PER_MINUTE * 60)
+        sample_rate = FALLBACK_SAMPLE_RATE
         
-        audio_data = bytearray()
-        for i in range(samples):
-            sample = int(16000 * math.sin(2 * math.pi * 440 * i / sample_rate))
-            audio_data.extend(struct.pack('<h', sample))
+        # One second holds a whole number of 440 Hz cycles, so it tiles seamlessly
+        block = _tone_block()
+        whole_seconds, remainder = divmod(int(duration * sample_rate), sample_rate)
+        audio_data = block * whole_seconds + block[:remainder * 2]
         
         header = struct.pack('<4sI4s4sIHHIIHH4sI',
             b'RIFF', 36 + len(audio_data), b'WAVE', b'fmt ', 16,
             1, 1, sample_rate, sample_rate * 2, 2, 16, b'data', len(audio_data))
         
-        return header + audio_data
\ No newline at end of file
+        return header + audio_data
+
+
+@functools.lru_cache(maxsize=1)
+def _tone_block():
+    """One second of a 440 Hz tone as 16-bit little-endian PCM."""
+    step = 2 * math.pi * 440 / FALLBACK_SAMPLE_RATE
+    samples = array.array('h', (int(16000 * math.sin(step * i)) for i in range(FALLBACK_SAMPLE_RATE)))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples.tobytes()
+
+
+class _Parts:
+    """Synthesized parts collected in script order; stops at the first failed one."""
+    
+    def __init__(self, on_part=None):
+        self.audio = []
+        self.failed = False
+        self._on_part = on_part
+    
+    def __len__(self):
+        return len(self.audio)
+    
+    def collect(self, result):
+        """Add the next part from `result()`, or mark the whole run failed if it raises."""
+        try:
+            part = result()
+        except Exception:
+            logger.exception("OpenAI TTS error")
+            self.failed = True
+            return
+        if self._on_part:
+            self._on_part(len(self.audio), part)
+        self.audio.append(part)
+    
+    @property
+    def complete(self):
+        return bool(self.audio) and not self.failed
+    
+    @property
+    def single(self):
+        """The only part, which needs no joining, or None."""
+        return self.audio[0] if len(self.audio) == 1 else None
+
+
+def _should_retry(error):
+    if is_retryable(error):
+        return True
+    import openai
+    return isinstance(error, openai.APIConnectionError)
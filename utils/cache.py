@@ -0,0 +1,153 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict, Counter
+
+
+class DiskCache:
+    """Content-addressed on-disk cache with size-bounded LRU eviction.
+
+    Entries are grouped into namespaces ('text', 'script', 'audio', ...) and
+    stored as one file each under root/namespace/. Recency is tracked in
+    memory and seeded from file modification times on startup.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def key(*parts):
+        """Hash any mix of str and bytes parts into a cache key."""
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            digest.update(len(part).to_bytes(8, 'big'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _load(self):
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith('.tmp'):
+                    os.unlink(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._size += size
+
+    def _path(self, namespace, key):
+        return os.path.join(self.root, namespace, key)
+
+    def get(self, namespace, key, max_age=None):
+        """Return cached bytes, or None on a miss or if older than max_age seconds."""
+        path = self._path(namespace, key)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                raise FileNotFoundError(path)
+            with open(path, 'rb') as f:
+                value = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses[namespace] += 1
+            return None
+
+        with self._lock:
+            self.hits[namespace] += 1
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        return value
+
+    def set(self, namespace, key, value):
+        """Store bytes atomically and evict least recently used entries over the size limit."""
+        if len(value) > self.max_bytes:
+            return
+
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(value)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._size -= self._entries.pop(path, 0)
+            self._entries[path] = len(value)
+            self._size += len(value)
+            while self._size > self.max_bytes and self._entries:
+                old_path, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                try:
+                    os.unlink(old_path)
+                except FileNotFoundError:
+                    pass
+
+    def get_text(self, namespace, key, max_age=None):
+        value = self.get(namespace, key, max_age=max_age)
+        return value.decode('utf-8') if value is not None else None
+
+    def set_text(self, namespace, key, text):
+        self.set(namespace, key, text.encode('utf-8'))
+
+    def stats(self):
+        """Return hit/miss counters per namespace and the current cache size."""
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            return {
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'entries': len(self._entries),
+                'hits': {ns: self.hits[ns] for ns in namespaces},
+                'misses': {ns: self.misses[ns] for ns in namespaces},
+            }
+
+
+class _NullCache:
+    """Stand-in used when caching is disabled; every lookup misses."""
+
+    key = staticmethod(DiskCache.key)
+
+    def get(self, namespace, key, max_age=None):
+        return None
+
+    def set(self, namespace, key, value):
+        pass
+
+    def get_text(self, namespace, key, max_age=None):
+        return None
+
+    def set_text(self, namespace, key, text):
+        pass
+
+    def stats(self):
+        return {'size_bytes': 0, 'max_bytes': 0, 'entries': 0, 'hits': {}, 'misses': {}}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the shared cache, configured from CACHE_DIR and CACHE_MAX_MB (0 disables it)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_mb = int(os.getenv('CACHE_MAX_MB', 1024))
+            if max_mb > 0:
+                _cache = DiskCache(os.getenv('CACHE_DIR', 'cache'), max_mb * 1024 * 1024)
+            else:
+                _cache = _NullCache()
+        return _cache
@@ -0,0 +1,99 @@
+"""Chapter index of a generated podcast: where each TTS segment sits in the script and in the audio."""
+from .mp3 import measure, strip_headers
+from .text_chunker import iter_sentences
+
+TITLE_CHARS = 60
+
+
+class ChapterRecorder:
+    """Collects what an index needs while a podcast is synthesized segment by segment.
+
+    Wrap the segments handed to create_audio_streaming with `segments`
+    (or `asegments`) and its `on_part` callback with `on_part`; once the
+    audio is complete, `index(script)` returns one chapter per segment.
+    """
+
+    def __init__(self, voice):
+        self.voice = voice
+        self._texts = []
+        self._parts = []
+
+    def segments(self, segments):
+        for segment in segments:
+            self._texts.append(segment)
+            yield segment
+
+    async def asegments(self, segments):
+        async for segment in segments:
+            self._texts.append(segment)
+            yield segment
+
+    def on_part(self, callback=None):
+        """Return an on_part callback that measures each part, then calls `callback`."""
+        def on_part(index, audio_bytes):
+            self._parts.append(measure(audio_bytes))
+            if callback:
+                callback(index, audio_bytes)
+        return on_part
+
+    def index(self, script):
+        """Return the chapter list, or None when the audio was not made of one MP3 part per segment."""
+        if not self._parts or len(self._parts) != len(self._texts) or not all(size for _, size, _ in self._parts):
+            return None  # no OpenAI TTS: the fallback audio is a single WAV or SAPI file
+        # A single part is stored as synthesized, headers included; several are joined frame by frame
+        offset = self._parts[0][0] if len(self._parts) == 1 else 0
+        chapters = []
+        start = 0.0
+        position = 0
+        for number, (text, (_, size, seconds)) in enumerate(zip(self._texts, self._parts)):
+            text_start = script.find(text, position)
+            if text_start < 0:
+                return None
+            position = text_start + len(text)
+            chapters.append({
+                'index': number,
+                'title': _title(text),
+                'text_start': text_start,
+                'text_end': position,
+                'byte_offset': offset,
+                'byte_length': size,
+                'start': round(start, 3),
+                'duration': round(seconds, 3),
+                'voice': self.voice,
+            })
+            offset += size
+            start += seconds
+        return chapters
+
+
+def splice(audio, chapters, index, part, voice):
+    """Replace chapter `index` of `audio` with the MP3 `part`; return (audio, chapters).
+
+    Only that chapter's bytes change hands: the other chapters' frames are
+    copied as they are and their offsets and start times shifted. The
+    result is headerless frames, like any podcast joined from several parts.
+    """
+    pieces = [audio[c['byte_offset']:c['byte_offset'] + c['byte_length']] for c in chapters]
+    pieces[index] = strip_headers(part)
+    _, _, seconds = measure(pieces[index])
+
+    spliced = []
+    offset = 0
+    start = 0.0
+    for chapter, piece in zip(chapters, pieces):
+        chapter = dict(chapter, byte_offset=offset, byte_length=len(piece), start=round(start, 3))
+        if chapter['index'] == index:
+            chapter.update(duration=round(seconds, 3), voice=voice)
+        spliced.append(chapter)
+        offset += len(piece)
+        start += chapter['duration']
+    return b''.join(pieces), spliced
+
+
+def _title(text):
+    """The segment's first sentence, shortened to about TITLE_CHARS characters."""
+    start, end = next(iter_sentences(text), (0, len(text)))
+    title = text[start:end].strip()
+    if len(title) > TITLE_CHARS:
+        title = title[:TITLE_CHARS].rsplit(' ', 1)[0].rstrip(',;:') + '…'
+    return title
@@ -0,0 +1,164 @@
+"""Per-source checkpoints so an interrupted generation resumes where it stopped."""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+from .storage import STORAGE_BYTES, STORAGE_EVICTIONS, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """One directory of checkpoints per job source key, removed `max_age` seconds after its last write.
+
+    Has the `name` and `sweep()` of a FileStore, so start_sweeper can
+    expire it alongside the other stores.
+    """
+
+    def __init__(self, directory, max_age=None):
+        self.name = 'checkpoints'
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, key):
+        """Return the Checkpoint for a source key such as `url:...` or `pdf:<sha256>`."""
+        directory = os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest()[:32])
+        # Writing a stage renames a file into the directory, which moves its
+        # mtime; reading one does not, so an abandoned checkpoint still expires
+        os.makedirs(directory, exist_ok=True)
+        return Checkpoint(directory)
+
+    def sweep(self):
+        """Remove checkpoints not written for `max_age` seconds and return the bytes left."""
+        now = time.time()
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_dir():
+                        continue
+                    if self.max_age is not None and now - entry.stat().st_mtime > self.max_age:
+                        shutil.rmtree(entry.path)
+                        STORAGE_EVICTIONS.inc(store=self.name, reason='expired')
+                        logger.info("Removed checkpoint", extra={'checkpoint': entry.name})
+                        continue
+                    with os.scandir(entry.path) as files:
+                        total += sum(f.stat().st_size for f in files if f.is_file())
+                except OSError:
+                    continue  # removed meanwhile
+        STORAGE_BYTES.set(total, store=self.name)
+        return total
+
+
+class Checkpoint:
+    """The finished stages of an unfinished run: extracted text, script, its segments and TTS chunks.
+
+    Every file is written atomically, so a process killed mid-write leaves
+    the previous state behind, never a truncated checkpoint. TTS chunks are
+    stored under their position and a hash of their text, so chunks of a
+    script that was later rewritten are never reused. Once a run has saved
+    its audio the whole checkpoint is discarded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get_text(self, name):
+        try:
+            with open(self._path(f"{name}.txt"), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set_text(self, name, text):
+        write_atomic(self._path(f"{name}.txt"), text.encode('utf-8'))
+
+    def open_partial(self, name, text=''):
+        """Replace `<name>.partial.txt` with `text` and open it for appending as more is produced.
+
+        Unlike the other checkpoints this one may end mid-sentence; read it
+        back with get_text(f"{name}.partial").
+        """
+        path = self._path(f"{name}.partial.txt")
+        write_atomic(path, text.encode('utf-8'))
+        return open(path, 'a', encoding='utf-8')
+
+    def get_json(self, name):
+        text = self.get_text(name)
+        return json.loads(text) if text is not None else None
+
+    def set_json(self, name, value):
+        self.set_text(name, json.dumps(value))
+
+    def remove(self, name):
+        try:
+            os.remove(self._path(f"{name}.txt"))
+        except FileNotFoundError:
+            pass
+
+    def get_chunk(self, index, text):
+        try:
+            with open(self._path(_chunk_name(index, text)), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set_chunk(self, index, text, audio_bytes):
+        write_atomic(self._path(_chunk_name(index, text)), audio_bytes)
+
+    def discard(self):
+        """Remove the checkpoint once the run it belongs to has finished."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def script_writer(self):
+        """Return a ScriptWriter that checkpoints a script stream as it arrives."""
+        return ScriptWriter(self)
+
+
+class ScriptWriter:
+    """Saves a script while Claude streams it, so an interrupted run can continue it.
+
+    `resume` is the text an earlier run already streamed ('' if none), to
+    pass on to stream_podcast_script. Inside `with writer:` hand every
+    delta to `write`, then `finish(script)` checkpoints the whole script
+    in place of the partial one.
+    """
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.resume = (checkpoint.get_text('script.partial') or '').rstrip()
+        if self.resume:
+            logger.info("Resuming interrupted script", extra={'chars': len(self.resume)})
+        self._file = None
+        self._skip = bool(self.resume)
+
+    def __enter__(self):
+        self._file = self.checkpoint.open_partial('script', self.resume)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def write(self, delta):
+        if self._skip:
+            # A resumed stream starts with the text already in the checkpoint
+            self._skip = False
+            return
+        self._file.write(delta)
+        self._file.flush()
+
+    def finish(self, script):
+        if script:
+            self.checkpoint.set_text('script', script)
+            self.checkpoint.remove('script.partial')
+
+
+def _chunk_name(index, text):
+    return f"chunk-{index:04d}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}.mp3"
@@ -1,14 +1,75 @@
+import re
+
+from .text_chunker import iter_chunks
+
+
+# Keyword hits per content type; keywords are lowercase and matched as whole words
+CONTENT_KEYWORDS = {
+    'research': ('abstract', 'methodology', 'results', 'conclusion', 'references', 'doi:', 'arxiv',
+                 'et al.', 'hypothesis', 'dataset', 'experiments', 'related work', 'peer-reviewed'),
+    'news': ('news', 'breaking', 'reported', 'according to', 'said on', 'told reporters',
+             'spokesperson', 'press release', 'officials said'),
+    'tutorial': ('tutorial', 'how to', 'step by step', 'guide', 'step 1', 'prerequisites',
+                 'in this tutorial', 'you will learn', 'install'),
+}
+
+# Only this many leading characters are scanned by default
+CLASSIFIER_SAMPLE_CHARS = 100000
+# Longer scans lowercase the text one window at a time instead of copying it all
+SCAN_WINDOW = 1024 * 1024
+# Hits in the first part of a document (title, abstract, lede) count double
+LEAD_FRACTION = 0.1
+LEAD_WEIGHT = 2.0
+# A type needs at least this score, otherwise the content is 'general'
+MIN_TYPE_SCORE = 3.0
+
+
+def _keyword_pattern():
+    alternatives = []
+    # Longest first so "in this tutorial" wins over "tutorial"
+    for keyword in sorted({k for words in CONTENT_KEYWORDS.values() for k in words}, key=len, reverse=True):
+        suffix = r'(?!\w)' if keyword[-1].isalnum() else ''
+        alternatives.append(re.escape(keyword) + suffix)
+    # Case-sensitive: matching lowercased windows is several times faster than re.IGNORECASE
+    return re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + ')')
+
+
+_KEYWORD_PATTERN = _keyword_pattern()
+_KEYWORD_TYPES = {keyword: content_type for content_type, words in CONTENT_KEYWORDS.items() for keyword in words}
+_KEYWORD_MAX_LENGTH = max(map(len, _KEYWORD_TYPES))
+
+
+def score_content_types(text, sample_chars=CLASSIFIER_SAMPLE_CHARS):
+    """Score each content type in one pass over (a sample of) the text.
+    
+    Every keyword hit adds 1, or LEAD_WEIGHT if it falls within the first
+    LEAD_FRACTION of the sample. Pass sample_chars=None to scan everything.
+    """
+    end = len(text) if not sample_chars else min(len(text), sample_chars)
+    lead_end = max(2000, int(end * LEAD_FRACTION))
+    
+    scores = dict.fromkeys(CONTENT_KEYWORDS, 0.0)
+    for window_start in range(0, end, SCAN_WINDOW):
+        window_end = min(end, window_start + SCAN_WINDOW)
+        # One character of context on each side for the whole-word checks,
+        # plus room for a keyword that starts inside this window
+        low = max(0, window_start - 1)
+        window = text[low:min(len(text), window_end + _KEYWORD_MAX_LENGTH + 1)].lower()
+        for match in _KEYWORD_PATTERN.finditer(window, window_start - low):
+            position = low + match.start()
+            if position >= window_end:
+                break
+            content_type = _KEYWORD_TYPES[match.group()]
+            scores[content_type] += LEAD_WEIGHT if position < lead_end else 1.0
+    return scores
+
+
 def detect_content_type(text):
     """Detect the type of content based on keywords and patterns."""
-    text = text.lower()
-    
-    if any(word in text for word in ['abstract', 'methodology', 'results', 'conclusion', 'references', 'doi:', 'arxiv']):
-        return 'research'
-    elif any(word in text for word in ['news', 'breaking', 'reported', 'according to']):
-        return 'news'
-    elif any(word in text for word in ['tutorial', 'how to', 'step by step', 'guide']):
-        return 'tutorial'
-    return 'general'
+    scores = score_content_types(text)
+    # max() keeps the first of equal scores, so ties go to research, then news
+    best = max(scores, key=scores.get)
+    return best if scores[best] >= MIN_TYPE_SCORE else 'general'
 
 
 def calculate_podcast_length(content_length):
@@ -24,28 +85,13 @@ def calculate_podcast_length(content_length):
     else:
         return "comprehensive"
 
-def chunk_large_document(text, max_chunk_size=600000):
+def chunk_large_document(text, max_chunk_size=600000, overlap=1000):
     """Advanced chunking for very large documents (600k+ characters - Claude Opus 4 can handle 200k tokens)."""
-    if len(text) < 600000:  # ~200k tokens worth of characters
+    if len(text) < max_chunk_size:  # ~200k tokens worth of characters by default
         return [text]  # No chunking needed for Claude Opus 4
     
-    # For extremely large docs, create chunks with overlap
-    chunks = []
-    paragraphs = text.split('\n\n')
-    current_chunk = ""
-    
-    for paragraph in paragraphs:
-        if len(current_chunk + paragraph) > max_chunk_size and current_chunk:
-            chunks.append(current_chunk.strip())
-            # Add small overlap for context
-            current_chunk = current_chunk[-1000:] + "\n\n" + paragraph
-        else:
-            current_chunk += "\n\n" + paragraph if current_chunk else paragraph
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    return chunks
+    # For extremely large docs, create chunks with a small overlap for context
+    return list(iter_chunks(text, max_chars=max_chunk_size, overlap=overlap))
 
 
 def chunk_content(text, max_chunk_size=600000):
@@ -54,18 +100,4 @@ def chunk_content(text, max_chunk_size=600000):
     if len(text) <= max_chunk_size:
         return [text]  # No chunking needed
     
-    chunks = []
-    sentences = text.split('. ')
-    current_chunk = ""
-    
-    for sentence in sentences:
-        if len(current_chunk + sentence) > max_chunk_size and current_chunk:
-            chunks.append(current_chunk.strip())
-            current_chunk = sentence + ". "
-        else:
-            current_chunk += sentence + ". "
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    return chunks
\ No newline at end of file
+    return list(iter_chunks(text, max_chars=max_chunk_size))
@@ -1,43 +1,206 @@
 import os
 import re
+import mmap
+import asyncio
+import hashlib
+import logging
 import tempfile
-import requests
-import fitz
-from bs4 import BeautifulSoup
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
+from .cache import get_cache
+from .http_fetcher import get_fetcher, get_async_fetcher
+from .metrics import PROCESSED_BYTES, span
 
-def extract_pdf_text(pdf_path):
-    """Extract text from PDF file using PyMuPDF."""
+logger = logging.getLogger(__name__)
+
+HTML_PARSER = os.getenv('HTML_PARSER', 'lxml')
+
+
+# Page and character caps for PDF extraction
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 2000))
+PDF_MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', 5000000))
+# Documents with more pages than this are spread across a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 100))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = 25
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def extract_pdf_text(source, max_pages=None, max_chars=None):
+    """Extract text from a PDF path or in-memory bytes using PyMuPDF."""
     try:
-        with fitz.open(pdf_path) as doc:
-            return ''.join(page.get_text() for page in doc)
-    except:
+        cache = get_cache()
+        cache_key = cache.key('pdf', pdf_digest(source), str(max_pages), str(max_chars))
+        
+        text = cache.get_text('text', cache_key)
+        if text is not None:
+            return text
+        
+        text = ''.join(iter_pdf_text(source, max_pages=max_pages, max_chars=max_chars))
+        cache.set_text('text', cache_key, text)
+        return text
+    except Exception:
+        logger.exception("PDF extraction error")
         return None
 
 
+def iter_pdf_text(source, max_pages=None, max_chars=None, workers=None):
+    """Yield the text of a PDF range by range, in page order.
+    
+    `source` is a file path or a bytes-like object. At most `max_pages`
+    pages and `max_chars` characters are extracted (PDF_MAX_PAGES and
+    PDF_MAX_CHARS by default). Long documents are split into page ranges
+    that a process pool extracts in parallel.
+    """
+    max_pages = max_pages or PDF_MAX_PAGES
+    max_chars = max_chars or PDF_MAX_CHARS
+    workers = workers or PDF_WORKERS
+    
+    with _open_pdf(source) as doc:
+        page_count = min(len(doc), max_pages)
+        if workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+            ranges = _parallel_page_text(source, page_count, workers)
+        else:
+            ranges = (doc[i].get_text() for i in range(page_count))
+        
+        remaining = max_chars
+        for text in ranges:
+            if len(text) >= remaining:
+                logger.warning("PDF text truncated", extra={'max_chars': max_chars})
+                yield text[:remaining]
+                return
+            remaining -= len(text)
+            yield text
+
+
+def _open_pdf(source):
+    import fitz  # PyMuPDF takes a noticeable part of startup, so it is loaded on first use
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    if isinstance(source, mmap.mmap):
+        source = memoryview(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+
+def pdf_digest(source):
+    """SHA-256 of the PDF bytes, read in blocks when given a path."""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        digest.update(source)
+    return digest.hexdigest()
+
+
+def _parallel_page_text(source, page_count, workers):
+    """Yield the text of PAGES_PER_TASK page ranges extracted by the process pool."""
+    spilled = None
+    if not isinstance(source, (str, os.PathLike)):
+        # Workers open the document themselves, so hand them a file instead of pickled bytes
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            tmp.write(source)
+        source = spilled = tmp.name
+    
+    try:
+        starts = range(0, page_count, PDF_PAGES_PER_TASK)
+        ends = [min(start + PDF_PAGES_PER_TASK, page_count) for start in starts]
+        futures = [_get_pdf_pool(workers).submit(_extract_page_range, os.fspath(source), start, end)
+                   for start, end in zip(starts, ends)]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    finally:
+        if spilled:
+            os.unlink(spilled)
+
+
+def _get_pdf_pool(workers):
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: forking a process that runs request threads is not safe
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pdf_pool
+
+
+def _extract_page_range(path, start, end):
+    """Process pool task: extract the text of pages [start, end)."""
+    import fitz
+    with fitz.open(path) as doc:
+        return ''.join(doc[i].get_text() for i in range(start, end))
+
+
 def extract_web_content(url):
     """Extract content from web URL, handling both HTML and PDF content."""
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-    
     try:
-        response = requests.get(url, timeout=30, headers=headers)
-        response.raise_for_status()
-        
-        if 'pdf' in response.headers.get('content-type', '') or url.endswith('.pdf'):
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                tmp.write(response.content)
-                text = extract_pdf_text(tmp.name)
-                os.unlink(tmp.name)
-                return text
-        
-        return parse_html_content(response.text)
-    except Exception as e:
-        print(f"Web extraction error: {e}")
+        with span('fetch', url=url) as fields:
+            page = get_fetcher().fetch(url)
+            fields.update(bytes=len(page.content), from_cache=page.from_cache)
+        return _extract_page(url, page)
+    except Exception:
+        logger.exception("Web extraction error", extra={'url': url})
+        return None
+
+
+async def aextract_web_content(url):
+    """Async variant of extract_web_content: fetches with httpx, parses in a worker thread."""
+    try:
+        with span('fetch', url=url) as fields:
+            page = await get_async_fetcher().fetch(url)
+            fields.update(bytes=len(page.content), from_cache=page.from_cache)
+        return await asyncio.to_thread(_extract_page, url, page)
+    except Exception:
+        logger.exception("Web extraction error", extra={'url': url})
         return None
 
 
-def parse_html_content(html):
-    """Parse HTML content and extract main text content."""
+def _extract_page(url, page):
+    """Extract the text of a fetched page (HTML or PDF)."""
+    PROCESSED_BYTES.inc(len(page.content), kind='fetched')
+    
+    if 'pdf' in page.content_type or page.content.startswith(b'%PDF') or url.endswith('.pdf'):
+        return extract_pdf_text(page.content)
+    
+    # Unchanged pages (same bytes) reuse the text extracted last time
+    cache = get_cache()
+    cache_key = cache.key('html', HTML_PARSER, page.content)
+    text = cache.get_text('text', cache_key)
+    if text is not None:
+        return text
+    
+    # Without a declared charset, let the parser read it from the document
+    html = page.content.decode(page.encoding, errors='replace') if page.encoding else page.content
+    text = parse_html_content(html)
+    if text:
+        cache.set_text('text', cache_key, text)
+    return text
+
+
+def parse_html_content(html, backend=None):
+    """Parse HTML content and extract main text content.
+    
+    Uses the lxml backend by default; set HTML_PARSER=bs4 (or pass
+    backend='bs4') for the original BeautifulSoup parser.
+    """
+    if (backend or HTML_PARSER) == 'lxml':
+        # Imported on first use, like bs4, so lxml stays out of startup
+        from .html_extractor import parse_html_lxml
+        return parse_html_lxml(html)
+    return _parse_html_bs4(html)
+
+
+def _parse_html_bs4(html):
+    """Parse HTML content with BeautifulSoup and extract main text content."""
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, 'html.parser')
     
     # Remove unwanted elements
@@ -65,7 +228,8 @@ def parse_html_content(html):
     text_parts = []
     
     for elem in text_elements:
-        text = elem.get_text(strip=True)
+        # Normalize whitespace instead of stripping each string, which would glue inline text together
+        text = ' '.join(elem.get_text().split())
         if text and len(text) > 15 and not text.lower().startswith(('cookie', 'subscribe', 'follow', 'share')):
             text_parts.append(text)
     
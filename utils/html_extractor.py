@@ -0,0 +1,116 @@
+import re
+
+from lxml import etree
+from lxml import html as lxml_html
+
+REMOVED_TAGS = ('script', 'style', 'nav', 'header', 'footer', 'aside', 'menu', 'form')
+MEDIA_TAGS = ('img', 'video', 'audio', 'iframe', 'button')
+BLOCK_TAGS = frozenset(('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote', 'div'))
+SKIPPED_PREFIXES = ('cookie', 'subscribe', 'follow', 'share')
+
+# Same priority as the BeautifulSoup selectors: article, main, [role="main"],
+# .content, .post-content, .entry-content, .article-content, #content, .post-body
+_CONTENT_CLASSES = {'content': 3, 'post-content': 4, 'entry-content': 5, 'article-content': 6, 'post-body': 8}
+
+
+def parse_html_lxml(html):
+    """Parse HTML with lxml and extract the main text content.
+
+    Produces the same kind of output as the BeautifulSoup parser, but picks
+    the content root in one traversal and walks it once, emitting the text
+    of nested blocks only once.
+    """
+    root = _parse(html)
+    if root is None:
+        return ''
+
+    etree.strip_elements(root, *REMOVED_TAGS, with_tail=False)
+    main_content = _find_content_root(root)
+
+    text_parts = [
+        text for text in _iter_block_text(main_content)
+        if len(text) > 15 and not text.lower().startswith(SKIPPED_PREFIXES)
+    ]
+
+    # Fallback for short content
+    if len(' '.join(text_parts)) < 300:
+        etree.strip_elements(main_content, *MEDIA_TAGS, with_tail=False)
+        full_text = ' '.join(main_content.itertext())
+        return re.sub(r'\s+', ' ', full_text).strip()
+
+    final_text = '\n\n'.join(text_parts)
+    return re.sub(r'\s+', ' ', final_text).strip()
+
+
+def _parse(html):
+    try:
+        return lxml_html.fromstring(html)
+    except ValueError:
+        # Strings carrying an XML encoding declaration must be parsed as bytes
+        return lxml_html.fromstring(html.encode('utf-8'))
+    except etree.ParserError:
+        return None
+
+
+def _selector_rank(element):
+    if element.tag == 'article':
+        return 0
+    if element.tag == 'main':
+        return 1
+    if element.get('role') == 'main':
+        return 2
+    rank = 7 if element.get('id') == 'content' else 9
+    for name in element.get('class', '').split():
+        rank = min(rank, _CONTENT_CLASSES.get(name, 9))
+    return rank
+
+
+def _find_content_root(root):
+    """Return the first element matching the highest-priority content selector."""
+    best_rank, best = 9, None
+    for element in root.iter(etree.Element):
+        rank = _selector_rank(element)
+        if rank < best_rank:
+            best_rank, best = rank, element
+            if rank == 0:
+                break
+
+    if best is not None:
+        return best
+    body = root.find('.//body') if root.tag != 'body' else root
+    return body if body is not None else root
+
+
+def _iter_block_text(main_content):
+    """Yield the whitespace-normalized text of each block element in document order.
+
+    Text inside a nested block belongs to that block only; the enclosing
+    block's text before and after it is emitted as separate pieces.
+    """
+    # Bottom buffer collects text outside any block, which is not emitted
+    stack = [[]]
+
+    def flush(buffer):
+        text = ' '.join(''.join(buffer).split())
+        buffer.clear()
+        return text
+
+    for event, element in etree.iterwalk(main_content, events=('start', 'end')):
+        is_element = isinstance(element.tag, str)
+        is_block = is_element and element.tag in BLOCK_TAGS and element is not main_content
+
+        if event == 'start':
+            if is_block:
+                text = flush(stack[-1])
+                if text and len(stack) > 1:
+                    yield text
+                stack.append([])
+            if is_element and element.text:
+                stack[-1].append(element.text)
+        else:
+            if is_block:
+                text = flush(stack.pop())
+                if text:
+                    yield text
+            if element.tail and element is not main_content:
+                stack[-1].append(element.tail)
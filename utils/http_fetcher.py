@@ -0,0 +1,254 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from .cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Types we can extract text from; anything else is rejected before the body is read
+SUPPORTED_TYPES = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml', 'text/plain', 'application/pdf')
+# Types that may still turn out to be a PDF or HTML once the first bytes are sniffed
+SNIFFED_TYPES = ('', 'application/octet-stream', 'binary/octet-stream', 'application/x-download')
+
+# Query parameters that only track where a link was shared and never change the page.
+# Generic names such as `ref` are left alone: sites use them for git refs, revisions
+# and the like, so dropping them could merge requests for different pages.
+TRACKING_PARAMS = ('fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref_src')
+
+FetchResult = namedtuple('FetchResult', 'content content_type encoding url from_cache')
+
+
+class FetchError(Exception):
+    """Raised when a URL cannot be fetched or its content is not usable."""
+
+
+class HttpFetcher:
+    """Shared HTTP client with connection pooling, size caps and conditional revalidation.
+
+    Responses carrying an ETag or Last-Modified header are kept in the disk
+    cache, and later fetches of the same URL send If-None-Match /
+    If-Modified-Since so unchanged pages come back as a cheap 304.
+
+    requests (like httpx for AsyncHttpFetcher) is imported when the first
+    fetcher is created, so importing this module for normalize_url stays cheap.
+    """
+
+    def __init__(self, max_bytes=None, timeout=(10, 30), pool_size=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.max_bytes = max_bytes or int(os.getenv('FETCH_MAX_MB', 50)) * 1024 * 1024
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, url):
+        """Download `url` and return a FetchResult, raising FetchError on failure."""
+        import requests
+        cache = get_cache()
+        meta_key, body_key, meta, headers = _revalidation(cache, url)
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304 and meta:
+                    content = cache.get('http', body_key)
+                    if content is not None:
+                        logger.info("Not modified, using cached copy", extra={'url': url})
+                        return FetchResult(content, meta['content_type'], meta['encoding'], meta['url'], True)
+                    # The body was evicted; fetch it again unconditionally
+                    cache.set('http', meta_key, b'')
+                    return self.fetch(url)
+
+                response.raise_for_status()
+                content_type = _content_type(response.headers)
+                _check_length(response.headers, self.max_bytes)
+
+                content = bytearray()
+                for block in response.iter_content(chunk_size=64 * 1024):
+                    _append_capped(content, block, content_type, self.max_bytes)
+                encoding = response.encoding if _declares_charset(response.headers) else None
+                result = FetchResult(bytes(content), content_type, encoding, response.url, False)
+                _remember(cache, meta_key, body_key, response.headers, result)
+                return result
+        except requests.RequestException as e:
+            raise FetchError(str(e)) from e
+
+
+class AsyncHttpFetcher:
+    """httpx.AsyncClient counterpart of HttpFetcher for the async job mode.
+
+    Shares the size cap, content-type checks and revalidation cache entries
+    with HttpFetcher. Must be used from a single event loop.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, max_bytes=None, timeout=(10, 30), pool_size=100, retries=2):
+        import httpx
+
+        self.max_bytes = max_bytes or int(os.getenv('FETCH_MAX_MB', 50)) * 1024 * 1024
+        self.retries = retries
+        self.client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=httpx.AsyncHTTPTransport(retries=retries),
+            follow_redirects=True,
+        )
+
+    async def fetch(self, url):
+        """Download `url` and return a FetchResult, raising FetchError on failure."""
+        import httpx
+        cache = get_cache()
+        meta_key, body_key, meta, headers = await asyncio.to_thread(_revalidation, cache, url)
+
+        try:
+            for attempt in range(self.retries + 1):
+                async with self.client.stream('GET', url, headers=headers) as response:
+                    if response.status_code in self.RETRY_STATUSES and attempt < self.retries:
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+                        continue
+
+                    if response.status_code == 304 and meta:
+                        content = await asyncio.to_thread(cache.get, 'http', body_key)
+                        if content is not None:
+                            logger.info("Not modified, using cached copy", extra={'url': url})
+                            return FetchResult(content, meta['content_type'], meta['encoding'], meta['url'], True)
+                        await asyncio.to_thread(cache.set, 'http', meta_key, b'')
+                        return await self.fetch(url)
+
+                    response.raise_for_status()
+                    content_type = _content_type(response.headers)
+                    _check_length(response.headers, self.max_bytes)
+
+                    content = bytearray()
+                    async for block in response.aiter_bytes(64 * 1024):
+                        _append_capped(content, block, content_type, self.max_bytes)
+                    encoding = response.charset_encoding if _declares_charset(response.headers) else None
+                    result = FetchResult(bytes(content), content_type, encoding, str(response.url), False)
+                    await asyncio.to_thread(_remember, cache, meta_key, body_key, response.headers, result)
+                    return result
+        except httpx.HTTPError as e:
+            raise FetchError(str(e)) from e
+
+
+def normalize_url(url):
+    """Canonical form of `url` for recognizing requests for the same page.
+
+    Lowercases the scheme and host, drops default ports, fragments and
+    tracking parameters (utm_*, fbclid, ...) and sorts the query string.
+    Raises ValueError if the URL cannot be parsed, e.g. for a port out of range.
+    """
+    parts = urlsplit(url.strip())
+    try:
+        port = parts.port
+    except ValueError:
+        raise ValueError(f"Invalid port in URL: {url}") from None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith('utm_') and name.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def _revalidation(cache, url):
+    """Cache keys, stored metadata and conditional request headers for `url`."""
+    meta_key = cache.key('meta', url)
+    body_key = cache.key('body', url)
+    meta = cache.get_text('http', meta_key)
+    meta = json.loads(meta) if meta else None
+
+    headers = {}
+    if meta:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    return meta_key, body_key, meta, headers
+
+
+def _remember(cache, meta_key, body_key, headers, result):
+    """Keep responses that carry validators so the next fetch can revalidate them."""
+    etag = headers.get('etag')
+    last_modified = headers.get('last-modified')
+    if etag or last_modified:
+        cache.set('http', body_key, result.content)
+        cache.set_text('http', meta_key, json.dumps({
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': result.content_type,
+            'encoding': result.encoding,
+            'url': result.url,
+        }))
+
+
+def _content_type(headers):
+    content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type not in SUPPORTED_TYPES and content_type not in SNIFFED_TYPES:
+        raise FetchError(f"Unsupported content type: {content_type}")
+    return content_type
+
+
+def _check_length(headers, max_bytes):
+    length = headers.get('content-length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise FetchError(f"Content is too large ({int(length)} bytes)")
+
+
+def _append_capped(content, block, content_type, max_bytes):
+    """Add a body block, sniffing the first block and enforcing max_bytes."""
+    if not content and content_type in SNIFFED_TYPES and not _looks_extractable(block):
+        raise FetchError(f"Unsupported content ({content_type or 'no content type'})")
+    content.extend(block)
+    if len(content) > max_bytes:
+        raise FetchError(f"Content is larger than {max_bytes} bytes")
+
+
+def _looks_extractable(block):
+    head = block[:512].lstrip().lower()
+    return head.startswith((b'%pdf', b'<!doctype', b'<html', b'<?xml', b'<head', b'<body', b'<!--'))
+
+
+def _declares_charset(headers):
+    """Whether the Content-Type header names a charset."""
+    return 'charset=' in headers.get('content-type', '').lower()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Return the shared fetcher so connections are pooled across requests."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = HttpFetcher()
+        return _fetcher
+
+
+_async_fetcher = None
+
+
+def get_async_fetcher():
+    """Return the shared async fetcher; call it from the job event loop only."""
+    global _async_fetcher
+    if _async_fetcher is None:
+        _async_fetcher = AsyncHttpFetcher()
+    return _async_fetcher
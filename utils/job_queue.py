@@ -0,0 +1,293 @@
+import os
+import json
+import asyncio
+import time
+import uuid
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import JOBS, COALESCED_JOBS
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job."""
+
+
+class JobError(Exception):
+    """Raised by a job function to fail the job with a user-facing message."""
+
+
+class JobQueue:
+    """Bounded worker pool with job state persisted in SQLite.
+
+    Job state lives in a SQLite file so any gunicorn worker process can answer
+    status requests, while the jobs themselves run on this process's threads.
+    """
+
+    asynchronous = False
+
+    def __init__(self, db_path, max_workers=2, max_pending=20):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._init_db()
+        self._start_workers()
+
+    def _start_workers(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, progress REAL DEFAULT 0, "
+                "result TEXT, error TEXT, owner INTEGER, created_at REAL, updated_at REAL, source_key TEXT)"
+            )
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'source_key' not in columns:
+                try:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN source_key TEXT")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+            # At most one active job per source, across every process sharing the database
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_source ON jobs (source_key) "
+                "WHERE status IN ('queued', 'running')"
+            )
+            # Jobs owned by processes that no longer exist (or by an earlier
+            # process that had our pid) will never finish
+            for row in conn.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall():
+                if row['owner'] == os.getpid() or not _pid_alive(row['owner']):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        ('Interrupted by server restart', time.time(), row['id'])
+                    )
+
+    def submit(self, func, *args):
+        """Queue func(job_id, *args) and return the new job id.
+
+        The function's return value becomes the job result; raising JobError
+        (or any other exception) marks the job as failed.
+        """
+        job_id, _ = self.submit_unique(None, func, *args)
+        return job_id
+
+    def submit_unique(self, key, func, *args):
+        """Like submit, but share one job between identical concurrent requests.
+
+        If a job with the same `key` is already queued or running (in any
+        process using this database), its id is returned instead and `func`
+        is not run again. Returns (job_id, created).
+        """
+        if key:
+            job_id = self.find_active(key)
+            if job_id:
+                COALESCED_JOBS.inc()
+                return job_id, False
+
+        with self._lock:
+            if self._closed:
+                raise QueueFullError("The server is shutting down, please try again shortly")
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Too many podcasts are being generated, please try again shortly")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, status, stage, progress, owner, created_at, updated_at, source_key) "
+                    "VALUES (?, 'queued', 'queued', 0, ?, ?, ?, ?)",
+                    (job_id, os.getpid(), now, now, key)
+                )
+        except sqlite3.IntegrityError:
+            # An identical request was queued between the lookup and the insert
+            self._release()
+            return self.submit_unique(key, func, *args)
+        except Exception:
+            self._release()
+            raise
+
+        self._dispatch(job_id, func, args)
+        return job_id, True
+
+    def find_active(self, key):
+        """Return the id of the queued or running job with this source key, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE source_key = ? AND status IN ('queued', 'running')", (key,)
+            ).fetchone()
+        return row['id'] if row else None
+
+    def active(self, job_id):
+        """Whether the job is queued or running in a process that still exists."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT status, owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row) and row['status'] in ('queued', 'running') and _pid_alive(row['owner'])
+
+    def _dispatch(self, job_id, func, args):
+        self._executor.submit(self._run, job_id, func, args)
+
+    def _run(self, job_id, func, args):
+        try:
+            self._set(job_id, status='running')
+            self._complete(job_id, func(job_id, *args))
+        except Exception as e:
+            self._fail(job_id, e)
+        finally:
+            self._release()
+
+    def _complete(self, job_id, result):
+        self._set(job_id, status='completed', stage='done', progress=1.0, result=json.dumps(result))
+        JOBS.inc(status='completed')
+
+    def _fail(self, job_id, error):
+        if isinstance(error, JobError):
+            logger.warning("Job failed", extra={'job_id': job_id, 'error': str(error)})
+            self._set(job_id, status='failed', error=str(error))
+        else:
+            logger.error("Job failed", extra={'job_id': job_id}, exc_info=error)
+            self._set(job_id, status='failed', error=f'Server error: {str(error)}')
+        JOBS.inc(status='failed')
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def update(self, job_id, stage, progress=None):
+        """Report the current stage and optional progress (0.0 - 1.0) of a job."""
+        if progress is None:
+            self._set(job_id, stage=stage)
+        else:
+            self._set(job_id, stage=stage, progress=max(0.0, min(1.0, progress)))
+
+    def update_result(self, job_id, update):
+        """Replace the result of a finished job with update(result) and return the new result.
+
+        The database write lock is taken before the result is read, so
+        concurrent updates of one job, from any process, apply one after
+        the other instead of overwriting each other. Exceptions raised by
+        `update` leave the result unchanged. Returns None if the job has no
+        result.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row or not row['result']:
+                return None
+            result = update(json.loads(row['result']))
+            conn.execute("UPDATE jobs SET result = ?, updated_at = ? WHERE id = ?",
+                         (json.dumps(result), time.time(), job_id))
+        return result
+
+    def _set(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'progress': row['progress'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+        }
+        if row['result']:
+            job['result'] = json.loads(row['result'])
+        if row['error']:
+            job['error'] = row['error']
+        return job
+
+    def stats(self):
+        """Return worker pool capacity and the number of queued or running jobs."""
+        with self._lock:
+            return {'workers': self.max_workers, 'max_pending': self.max_pending, 'pending': self._pending}
+
+    def alive(self):
+        """Whether the workers can still pick up jobs (the queue has not been shut down)."""
+        return not self._closed
+
+    def shutdown(self):
+        """Stop taking jobs and wait for the running ones to finish."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=True)
+
+
+class AsyncJobQueue(JobQueue):
+    """JobQueue that runs coroutine jobs on one event loop thread.
+
+    Jobs spend most of their time waiting on the network, so instead of
+    pinning a worker thread each, every job is a task on a shared loop and
+    only `max_pending` bounds how many run at once. Jobs must hand blocking
+    work (extraction, MP3 joins, disk writes) to `asyncio.to_thread`.
+    SQLite updates are short enough to run on the loop directly.
+    """
+
+    asynchronous = True
+
+    def _start_workers(self):
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='job-loop', daemon=True).start()
+
+    def alive(self):
+        return not self._closed and self._loop.is_running()
+
+    def shutdown(self):
+        """Stop taking jobs and stop the loop; jobs still running are failed when the queue next starts."""
+        with self._lock:
+            self._closed = True
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _dispatch(self, job_id, func, args):
+        asyncio.run_coroutine_threadsafe(self._run(job_id, func, args), self._loop)
+
+    async def _run(self, job_id, func, args):
+        try:
+            self._set(job_id, status='running')
+            self._complete(job_id, await func(job_id, *args))
+        except Exception as e:
+            self._fail(job_id, e)
+        finally:
+            self._release()
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,33 @@
+import os
+import logging
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Format records as `time level logger message key=value ...` using the `extra` fields."""
+
+    def formatMessage(self, record):
+        # format() appends any traceback after this line, so the fields stay on it
+        line = super().formatMessage(record)
+        fields = {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRIBUTES}
+        if fields:
+            line += ' ' + ' '.join(f"{key}={_format_value(value)}" for key, value in fields.items())
+        return line
+
+
+def _format_value(value):
+    text = str(value)
+    if not text or any(char.isspace() or char in '="' for char in text):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+
+def configure_logging(level=None):
+    """Send application logs to stderr in key=value form at LOG_LEVEL (default INFO)."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(KeyValueFormatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level or os.getenv('LOG_LEVEL', 'INFO').upper())
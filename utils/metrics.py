@@ -0,0 +1,184 @@
+"""In-process metrics with Prometheus text exposition and per-stage timing spans."""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-second cache hits up to multi-minute LLM streams
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, state):
+        counts, total, count = state
+        lines = []
+        for bound, bucket_count in zip(self.buckets, counts):
+            labels = _label_text(self.labelnames + ('le',), key + (repr(float(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+        labels = _label_text(self.labelnames + ('le',), key + ('+Inf',))
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """Register a callable that refreshes metrics right before they are rendered."""
+        self._collectors.append(collector)
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector failed")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'narrator_stage_seconds', 'Time spent in each pipeline stage', ('stage',))
+STAGE_ERRORS = REGISTRY.counter(
+    'narrator_stage_errors_total', 'Pipeline stages that raised an error', ('stage',))
+SCRIPT_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    'narrator_script_first_token_seconds', 'Time from sending the script request to the first streamed token')
+PROCESSED_BYTES = REGISTRY.counter(
+    'narrator_bytes_total', 'Bytes processed by kind (upload, fetched, audio)', ('kind',))
+PROCESSED_CHARACTERS = REGISTRY.counter(
+    'narrator_characters_total', 'Characters processed by kind (extracted, script)', ('kind',))
+JOBS = REGISTRY.counter(
+    'narrator_jobs_total', 'Finished generation jobs by status', ('status',))
+LLM_TOKENS = REGISTRY.counter(
+    'narrator_llm_tokens_total', 'Claude tokens by call (script, outline) and kind (input, output, cache_write, cache_read)',
+    ('call', 'kind'))
+COALESCED_JOBS = REGISTRY.counter(
+    'narrator_jobs_coalesced_total', 'Requests attached to an identical job that was already in progress')
+
+
+@contextmanager
+def span(stage, **fields):
+    """Time a pipeline stage, record it in STAGE_SECONDS and log its duration.
+
+    Extra keyword arguments are added to the log record. The yielded dict
+    can be updated inside the block to attach results (sizes, counts) to
+    the log line.
+    """
+    start = time.perf_counter()
+    try:
+        yield fields
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.warning("Stage failed", extra={'stage': stage, 'duration_ms': round(elapsed * 1000, 1), **fields})
+        raise
+    elapsed = time.perf_counter() - start
+    STAGE_SECONDS.observe(elapsed, stage=stage)
+    logger.info("Stage finished", extra={'stage': stage, 'duration_ms': round(elapsed * 1000, 1), **fields})
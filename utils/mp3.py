@@ -0,0 +1,167 @@
+"""Minimal MPEG audio frame parser for joining and measuring MP3 streams in-process."""
+from collections import namedtuple
+
+FrameInfo = namedtuple('FrameInfo', 'length samples sample_rate bitrate version layer channels')
+
+_BITRATES = {
+    # (MPEG-1?, layer) -> kbps by bitrate index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),   # MPEG-2.5
+}
+
+_LAYERS = {3: 1, 2: 2, 1: 3}
+
+
+def parse_frame_header(data, offset=0):
+    """Parse the 4-byte frame header at `offset`, returning FrameInfo or None if invalid."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = (b1 >> 3) & 0x03
+    layer = _LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+
+    channels = 1 if (b3 >> 6) == 3 else 2
+    return FrameInfo(length, samples, sample_rate, bitrate, version, layer, channels)
+
+
+def _id3v2_size(data, offset):
+    if data[offset:offset + 3] != b'ID3' or offset + 10 > len(data):
+        return 0
+    size = 0
+    for byte in data[offset + 6:offset + 10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[offset + 5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(data, offset, frame):
+    """True for the Xing/Info/VBRI metadata frame encoders put at the start of a file."""
+    if frame.version == 3:
+        side_info = 17 if frame.channels == 1 else 32
+    else:
+        side_info = 9 if frame.channels == 1 else 17
+    crc = 0 if data[offset + 1] & 0x01 else 2
+    tag = data[offset + 4 + crc + side_info:offset + 8 + crc + side_info]
+    return tag in (b'Xing', b'Info') or data[offset + 36:offset + 40] == b'VBRI'
+
+
+def iter_frames(data):
+    """Yield (offset, FrameInfo) for every audio frame in `data`.
+
+    ID3v2 tags, the trailing ID3v1 tag, Xing/Info/VBRI metadata frames and
+    any bytes that are not a valid frame are skipped.
+    """
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b'TAG':
+        end -= 128
+
+    offset = 0
+    first = True
+    while offset + 4 <= end:
+        tag_size = _id3v2_size(data, offset)
+        if tag_size:
+            offset += tag_size
+            continue
+
+        frame = parse_frame_header(data, offset)
+        if not frame or frame.length < 4 or offset + frame.length > end:
+            # Resynchronise on the next possible frame start
+            next_sync = data.find(b'\xff', offset + 1, end)
+            if next_sync < 0:
+                return
+            offset = next_sync
+            continue
+
+        if first:
+            first = False
+            if _is_info_frame(data, offset, frame):
+                offset += frame.length
+                continue
+
+        yield offset, frame
+        offset += frame.length
+
+
+def iter_audio_spans(data):
+    """Yield memoryviews over the contiguous runs of audio frames in `data`."""
+    view = memoryview(data)
+    run_start = run_end = None
+    for offset, frame in iter_frames(data):
+        if offset != run_end:
+            if run_start is not None:
+                yield view[run_start:run_end]
+            run_start = offset
+        run_end = offset + frame.length
+    if run_start is not None:
+        yield view[run_start:run_end]
+
+
+def strip_headers(data):
+    """Return only the audio frames of an MP3 byte string."""
+    return b''.join(iter_audio_spans(data))
+
+
+def iter_concat(parts):
+    """Yield the audio frames of each part in order, ready to be written as one stream."""
+    for part in parts:
+        yield from iter_audio_spans(part)
+
+
+def concat_mp3(parts, out=None):
+    """Join MP3 parts into one stream without per-part headers.
+
+    Writes to the file object `out` if given (returning the number of bytes
+    written), otherwise returns the joined bytes.
+    """
+    if out is None:
+        return b''.join(iter_concat(parts))
+
+    written = 0
+    for span in iter_concat(parts):
+        written += out.write(span)
+    return written
+
+
+def duration(data):
+    """Return the playing time of an MP3 byte string in seconds."""
+    return sum(frame.samples / frame.sample_rate for _, frame in iter_frames(data))
+
+
+def measure(data):
+    """Return (offset of the first audio frame or None, bytes of audio frames, seconds) of an MP3 byte string."""
+    first = None
+    size = 0
+    seconds = 0.0
+    for offset, frame in iter_frames(data):
+        if first is None:
+            first = offset
+        size += frame.length
+        seconds += frame.samples / frame.sample_rate
+    return first, size, seconds
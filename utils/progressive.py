@@ -0,0 +1,178 @@
+import os
+import time
+import tempfile
+import threading
+
+from .storage import FileStore
+
+# Finished streams stay readable this long so listeners that connected just
+# before the job completed can still read them
+FINISHED_STREAM_TTL = 120
+# Streams left behind by a process that died mid-job are swept after this long
+ABANDONED_STREAM_AGE = 3600
+# How often a listener looks for newly appended parts
+POLL_INTERVAL = 0.25
+# How often a waiting listener checks that the job writing the stream is still alive
+ALIVE_CHECK_INTERVAL = 5.0
+
+
+class ProgressiveAudio:
+    """Append-only audio file that readers can consume while it is still growing.
+
+    The job appends each finished part to `<key>.mp3` and marks the end
+    with an empty `<key>.done` or `<key>.failed` file. Readers only look at
+    the files, so any worker process sharing the directory can serve a
+    stream, and no audio is held in memory while nobody is listening.
+    """
+
+    def __init__(self, directory, key):
+        self.path = os.path.join(directory, f"{key}.mp3")
+        self._done_path = os.path.join(directory, f"{key}.done")
+        self._failed_path = os.path.join(directory, f"{key}.failed")
+
+    @property
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def finished(self):
+        return self.failed or os.path.exists(self._done_path)
+
+    @property
+    def failed(self):
+        return os.path.exists(self._failed_path)
+
+    def append(self, data):
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def finish(self, failed=False):
+        with open(self._failed_path if failed else self._done_path, 'wb'):
+            pass
+
+    def remove(self):
+        for path in (self.path, self._done_path, self._failed_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def read(self, start, end=None):
+        """Return the bytes in [start, end) that are available right now."""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                return f.read(-1 if end is None else max(0, end - start))
+        except FileNotFoundError:
+            return b''
+
+    def iter_from(self, start, block_size=64 * 1024, alive=None):
+        """Yield bytes from `start` onwards, waiting for new data until the stream finishes.
+
+        A TTS part (with its retries) may take minutes, so there is no time
+        limit; instead, while waiting, `alive()` is called every
+        ALIVE_CHECK_INTERVAL seconds and the listener stops once it returns
+        False, i.e. the job died without finishing the stream.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(start)
+            waited = 0.0
+            while True:
+                # Checked before reading, so a part appended just before the end is still read
+                finished = self.finished
+                chunk = f.read(block_size)
+                if chunk:
+                    yield chunk
+                elif finished:
+                    return
+                elif waited >= ALIVE_CHECK_INTERVAL:
+                    if alive and not alive():
+                        return
+                    waited = 0.0
+                else:
+                    time.sleep(POLL_INTERVAL)
+                    waited += POLL_INTERVAL
+
+
+_directory = None
+_directory_lock = threading.Lock()
+_max_listeners = 2
+# Requests following each stream in this process
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+def init_streams(directory, max_listeners):
+    """Keep streams in `directory` and let at most `max_listeners` requests follow each one.
+
+    Every listener holds a server thread for as long as it follows a
+    stream, so the cap keeps one popular podcast from taking every thread
+    from status polls and health checks. Returns a store to sweep streams
+    of jobs that never finished.
+    """
+    global _directory, _max_listeners
+    os.makedirs(directory, exist_ok=True)
+    _directory = directory
+    _max_listeners = max_listeners
+    return FileStore('streams', directory, max_age=ABANDONED_STREAM_AGE)
+
+
+def _stream_directory():
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            # Not configured (e.g. benchmarks): private to this process
+            _directory = tempfile.mkdtemp(prefix='streams-')
+        return _directory
+
+
+def open_stream(key):
+    """Create the (empty) progressive stream for a job."""
+    stream = ProgressiveAudio(_stream_directory(), key)
+    stream.remove()
+    with open(stream.path, 'wb'):
+        pass
+    return stream
+
+
+def get_stream(key):
+    """Return the stream of a job still being synthesized (or just finished), or None."""
+    if not key.isalnum():
+        return None
+    stream = ProgressiveAudio(_stream_directory(), key)
+    return stream if os.path.exists(stream.path) else None
+
+
+def finish_stream(key, failed=False):
+    """Mark a job's stream as complete and remove it after FINISHED_STREAM_TTL seconds."""
+    stream = get_stream(key)
+    if not stream:
+        return
+    stream.finish(failed=failed)
+    timer = threading.Timer(FINISHED_STREAM_TTL, stream.remove)
+    timer.daemon = True
+    timer.start()
+
+
+def acquire_listener(key):
+    """Take one of the listener slots of a job's stream without waiting; False if all are in use."""
+    with _listeners_lock:
+        count = _listeners.get(key, 0)
+        if count >= _max_listeners:
+            return False
+        _listeners[key] = count + 1
+        return True
+
+
+def release_listener(key):
+    with _listeners_lock:
+        count = _listeners.pop(key) - 1
+        if count:
+            _listeners[key] = count
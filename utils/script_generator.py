@@ -1,21 +1,127 @@
-import anthropic
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import get_cache
+from .admission import get_limiter, is_retryable
+from .metrics import SCRIPT_FIRST_TOKEN_SECONDS, LLM_TOKENS, span
 from .content_analyzer import detect_content_type, calculate_podcast_length, chunk_content, chunk_large_document
 
+logger = logging.getLogger(__name__)
+
+MODEL = "claude-opus-4-1-20250805"
+
+# Prompt cache breakpoint: the prompt up to and including a block marked with
+# this is cached for a few minutes, so repeat requests for the same document
+# and retries after failures are billed at the cache-read rate
+CACHE_CONTROL = {"type": "ephemeral"}
+# Usage fields reported by the API, and the `kind` label they are counted under
+USAGE_FIELDS = {
+    'input_tokens': 'input',
+    'output_tokens': 'output',
+    'cache_creation_input_tokens': 'cache_write',
+    'cache_read_input_tokens': 'cache_read',
+}
+
+# Retries of a script request rejected before streaming (rate limited, overloaded,
+# connection failed); the SDK's own retries are off so every attempt is admitted
+REQUEST_MAX_RETRIES = int(os.getenv('ANTHROPIC_MAX_RETRIES', 4))
+
+# Documents longer than this are outlined section by section before the final script pass
+MAP_REDUCE_THRESHOLD = int(os.getenv('MAP_REDUCE_THRESHOLD', 600000))
+
+OUTLINE_SYSTEM_PROMPT = (
+    "You are a meticulous research assistant preparing notes for a podcast host. You extract "
+    "every important idea, finding, number and example from the text you are given, without "
+    "commentary and without losing nuance."
+)
+
+OUTLINE_PROMPT = (
+    "This is one section of a much longer document. Write a detailed outline of this section: "
+    "its main arguments, key findings and data, notable examples and quotes, and how it connects "
+    "to the rest of the document. Use concise bullet points grouped under short headings."
+)
+
+
+class EmptyResponseError(RuntimeError):
+    """The model answered without any text; asking again usually helps."""
+
 
 class ScriptGenerator:
-    def __init__(self, api_key):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self, api_key, section_concurrency=None, section_max_retries=None, client=None,
+                 async_client=None, limiter=None):
+        self.api_key = api_key
+        self._client = client
+        self._async_client = async_client
+        self._client_lock = threading.Lock()
+        self.limiter = limiter or get_limiter('anthropic')
+        self.section_concurrency = section_concurrency or int(os.getenv('SECTION_CONCURRENCY', 4))
+        self.section_max_retries = (
+            section_max_retries if section_max_retries is not None else int(os.getenv('SECTION_MAX_RETRIES', 2))
+        )
+    
+    @property
+    def configured(self):
+        """Whether there is a client or an API key to create one; never contacts the API."""
+        return bool(self._client or self._async_client or self.api_key)
+    
+    @property
+    def client(self):
+        """Anthropic client, created (and the SDK imported) on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import anthropic
+                    self._client = anthropic.Anthropic(api_key=self.api_key, max_retries=0)
+        return self._client
+    
+    @property
+    def async_client(self):
+        """AsyncAnthropic client for the async job mode, created on first use."""
+        if self._async_client is None:
+            with self._client_lock:
+                if self._async_client is None:
+                    import anthropic
+                    self._async_client = anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+        return self._async_client
     
     def create_podcast_script(self, text):
         """Generate podcast script from text content."""
-        print(f"create_podcast_script called with {len(text) if text else 0} characters")
+        try:
+            request = self._script_request(text)
+        except Exception:
+            logger.exception("Document outlining failed")
+            return None
+        if not request:
+            return None
+        return self._generate_single_script(*request)
+    
+    def stream_podcast_script(self, text, usage=None, resume=None):
+        """Yield the podcast script as text deltas while Claude writes it.
         
+        Unlike create_podcast_script, API errors are raised to the caller.
+        If a `usage` dict is given it is filled with the token counts of the
+        script request (input, output and prompt cache reads/writes).
+        `resume` is the beginning of a script whose stream was interrupted:
+        it is yielded first and Claude continues from where it ends.
+        """
+        request = self._script_request(text)
+        if request:
+            yield from self._stream_single_script(*request, usage=usage, resume=resume)
+    
+    def _script_request(self, text):
+        """Build the arguments for _generate_single_script, or None if the text is too short."""
         if not text or len(text.strip()) < 50:
-            print("Text too short, returning None")
+            logger.warning("Text too short for a script", extra={'chars': len(text.strip()) if text else 0})
             return None
         
         content_type = detect_content_type(text)
-        print(f"Content type: {content_type}, Content length: {len(text)} characters")
+        logger.info("Classified content", extra={'content_type': content_type, 'chars': len(text)})
         
         system_prompt = (
             "You are an expert podcast host with deep knowledge across all fields. Your specialty is "
@@ -48,47 +154,354 @@ class ScriptGenerator:
             'general': "Extract key insights and explain their significance."
         }
         
-        # Generate script directly without chunking - let Claude handle the full content
-        return self._generate_single_script(
+        content_instruction = content_instructions.get(content_type, content_instructions['general'])
+        
+        # Documents that fit in one context window go to Claude as-is;
+        # larger ones are reduced to per-section outlines first
+        if len(text) > MAP_REDUCE_THRESHOLD:
+            text = self._outline_document(text)
+            content_instruction += (
+                " The content below is a section-by-section outline of a long document;"
+                " cover the document as a whole, not section by section."
+            )
+        
+        return (
             text, system_prompt, structure_prompt,
             "Create an extensive, comprehensive podcast with deep analysis covering all aspects, lasting as long as needed to thoroughly explore the content.",
-            content_instructions.get(content_type, content_instructions['general'])
+            content_instruction
         )
     
-    def _generate_single_script(self, content, system_prompt, structure_prompt, length_instruction, content_instruction):
-        """Generate script for single chunk of content."""
-        full_prompt = (
-            f"{length_instruction} "
-            f"{content_instruction}\n\n"
-            f"{structure_prompt}\n\n"
-            f"Content: {content}"
+    def _outline_document(self, text):
+        """Split a long document and outline its sections in parallel.
+        
+        Each section's outline is cached, so after a failure only the sections
+        that did not finish are sent again.
+        """
+        sections = chunk_large_document(text, max_chunk_size=MAP_REDUCE_THRESHOLD)
+        workers = max(1, min(self.section_concurrency, len(sections)))
+        logger.info("Outlining document", extra={'sections': len(sections), 'workers': workers})
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='outline') as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._outline_section, i, section, len(sections))
+                for i, section in enumerate(sections)
+            ]
+            # Wait for every section so successful ones are cached before raising
+            errors = [future.exception() for future in futures]
+        
+        failed = [i + 1 for i, error in enumerate(errors) if error]
+        if failed:
+            raise RuntimeError(f"Failed to outline sections {failed} of {len(sections)}") from errors[failed[0] - 1]
+        
+        return "\n\n".join(
+            f"Section {i + 1} of {len(sections)}:\n{future.result()}" for i, future in enumerate(futures)
         )
+    
+    def _outline_section(self, index, section, total):
+        """Outline one section, retrying with exponential backoff."""
+        cache = get_cache()
+        cache_key = cache.key(MODEL, OUTLINE_SYSTEM_PROMPT, OUTLINE_PROMPT, section)
+        cached_outline = cache.get_text('outline', cache_key)
+        if cached_outline is not None:
+            logger.debug("Using cached outline", extra={'section': index + 1, 'total': total})
+            return cached_outline
         
+        params = dict(
+            model=MODEL,
+            max_tokens=4000,
+            temperature=0.3,
+            system=OUTLINE_SYSTEM_PROMPT,
+            messages=[
+                # Cached so a retry of the same section reads the prompt from the cache
+                {"role": "user", "content": [{
+                    "type": "text",
+                    "text": f"{OUTLINE_PROMPT}\n\nSection:\n{section}",
+                    "cache_control": CACHE_CONTROL,
+                }]}
+            ],
+            stream=True
+        )
+        tokens = _estimate_tokens(params)
+        for attempt in range(self.section_max_retries + 1):
+            try:
+                admission = self.limiter.acquire(tokens)
+                with span('outline_section', section=index + 1, chars=len(section),
+                          admission_ms=round(admission * 1000, 1)):
+                    stream = self.client.messages.create(**params)
+                    usage = {}
+                    parts = []
+                    for chunk in stream:
+                        _record_usage(usage, chunk)
+                        if chunk.type == "content_block_delta":
+                            parts.append(chunk.delta.text)
+                    self.limiter.settle(tokens, _billed_input_tokens(usage))
+                    _count_tokens('outline', usage)
+                    outline = ''.join(parts).strip()
+                if not outline:
+                    raise EmptyResponseError("Empty outline returned")
+                cache.set_text('outline', cache_key, outline)
+                return outline
+            except Exception as e:
+                if attempt < self.section_max_retries and (_should_retry(e) or isinstance(e, EmptyResponseError)):
+                    delay = self.limiter.backoff(attempt, e)
+                    logger.warning("Section failed, retrying",
+                                   extra={'section': index + 1, 'delay': round(delay, 1), 'error': str(e)})
+                    time.sleep(delay)
+                else:
+                    logger.error("Section failed permanently", extra={'section': index + 1, 'error': str(e)})
+                    raise
+    
+    def _generate_single_script(self, content, system_prompt, structure_prompt, length_instruction, content_instruction):
+        """Generate script for single chunk of content."""
         try:
-            print(f"Making API call with {len(full_prompt)} character prompt...")
-            print("Using streaming to avoid timeout...")
-            
-            stream = self.client.messages.create(
-                model="claude-opus-4-1-20250805",
-                max_tokens=32000,
-                temperature=0.7,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": full_prompt}
-                ],
-                stream=True
-            )
-            
-            content = ""
-            for chunk in stream:
-                if chunk.type == "content_block_delta":
-                    content += chunk.delta.text
-            print("Streaming API call successful")
-            return content.strip()
-        except Exception as e:
-            print(f"Anthropic API Error: {e}")
-            print(f"Error type: {type(e)}")
-            import traceback
-            traceback.print_exc()
+            parts = list(self._stream_single_script(
+                content, system_prompt, structure_prompt, length_instruction, content_instruction
+            ))
+            return ''.join(parts).strip()
+        except Exception:
+            logger.exception("Anthropic API error")
             return None
     
+    def _stream_single_script(self, content, system_prompt, structure_prompt, length_instruction,
+                              content_instruction, usage=None, resume=None):
+        """Stream script deltas for single chunk of content, caching the finished script."""
+        request = _ScriptStream(content, system_prompt, structure_prompt,
+                                f"{length_instruction} {content_instruction}", usage, resume)
+        cached_script = request.cache.get_text('script', request.cache_key)
+        if cached_script is not None:
+            logger.info("Using cached script")
+            yield cached_script
+            return
+        
+        # Streaming avoids the request timeout on long scripts
+        with request.span(self.limiter.acquire(request.tokens)) as fields:
+            stream, started = self._create_stream(request.params, request.tokens, fields)
+            yield from request.start(started)
+            for event in stream:
+                text = request.add(event)
+                if text:
+                    yield text
+        script = request.finish(self.limiter)
+        if script:
+            request.cache.set_text('script', request.cache_key, script)
+    
+    def _create_stream(self, params, tokens, fields):
+        """Send a streaming request, retrying retryable errors with backoff.
+        
+        The caller has already admitted the first attempt; each retry waits
+        for admission again after its backoff. Returns the stream and the
+        perf_counter time the successful attempt was sent.
+        """
+        for attempt in range(REQUEST_MAX_RETRIES + 1):
+            if attempt:
+                fields['admission_ms'] += round(self.limiter.acquire(tokens) * 1000, 1)
+            try:
+                sent = time.perf_counter()
+                return self.client.messages.create(**params), sent
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+    
+    def _retry_delay(self, attempt, error):
+        """Return the backoff before retrying a failed script request; re-raises errors not worth retrying."""
+        if attempt == REQUEST_MAX_RETRIES or not _should_retry(error):
+            raise error
+        delay = self.limiter.backoff(attempt, error)
+        logger.warning("Claude request failed, retrying",
+                       extra={'attempt': attempt + 1, 'delay': round(delay, 1), 'error': str(error)})
+        return delay
+    
+    async def _acreate_stream(self, params, tokens, fields):
+        """Async variant of _create_stream."""
+        for attempt in range(REQUEST_MAX_RETRIES + 1):
+            if attempt:
+                fields['admission_ms'] += round(await self.limiter.aacquire(tokens) * 1000, 1)
+            try:
+                sent = time.perf_counter()
+                return await self.async_client.messages.create(**params), sent
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+    
+    async def astream_podcast_script(self, text, usage=None, resume=None):
+        """Async variant of stream_podcast_script using the AsyncAnthropic client.
+        
+        Prompt building (and outlining very long documents, which uses its
+        own thread pool) runs in a worker thread.
+        """
+        request = await asyncio.to_thread(self._script_request, text)
+        if request:
+            async for delta in self._astream_single_script(*request, usage=usage, resume=resume):
+                yield delta
+    
+    async def _astream_single_script(self, content, system_prompt, structure_prompt, length_instruction,
+                                     content_instruction, usage=None, resume=None):
+        request = _ScriptStream(content, system_prompt, structure_prompt,
+                                f"{length_instruction} {content_instruction}", usage, resume)
+        cached_script = await asyncio.to_thread(request.cache.get_text, 'script', request.cache_key)
+        if cached_script is not None:
+            logger.info("Using cached script")
+            yield cached_script
+            return
+        
+        with request.span(await self.limiter.aacquire(request.tokens)) as fields:
+            stream, started = await self._acreate_stream(request.params, request.tokens, fields)
+            for text in request.start(started):
+                yield text
+            async for event in stream:
+                text = request.add(event)
+                if text:
+                    yield text
+        script = request.finish(self.limiter)
+        if script:
+            await asyncio.to_thread(request.cache.set_text, 'script', request.cache_key, script)
+
+
+class _ScriptStream:
+    """Bookkeeping of one streamed script request, shared by the sync and async generators.
+    
+    The generators do the I/O (cache, admission, the API stream) and hand
+    each stream event to `add`, which records token usage and the time to
+    the first token and returns the event's text, if any.
+    """
+    
+    def __init__(self, content, system_prompt, structure_prompt, instructions, usage, resume):
+        self.content = content
+        self.params = _script_params(content, system_prompt, structure_prompt, instructions)
+        self.prefix = _resume_prefix(self.params, resume)
+        self.tokens = _estimate_tokens(self.params)
+        self.usage = {} if usage is None else usage
+        self.cache = get_cache()
+        self.cache_key = _script_cache_key(self.cache, self.params)
+        self.parts = []
+        self._fields = None
+        self._started = None
+    
+    @contextmanager
+    def span(self, admission):
+        """Time the request in a `script_llm` span that opens once it was admitted."""
+        # Admission waits are recorded in the span, not timed by it
+        with span('script_llm', prompt_chars=len(self.content), admission_ms=round(admission * 1000, 1)) as fields:
+            self._fields = fields
+            yield fields
+            fields['script_chars'] = sum(map(len, self.parts))
+            fields.update(self.usage)
+    
+    def start(self, started):
+        """Note when the request was sent; returns the resumed prefix to yield first, if any."""
+        self._started = started
+        if not self.prefix:
+            return []
+        self._fields['resumed_chars'] = len(self.prefix)
+        self.parts.append(self.prefix)
+        return [self.prefix]
+    
+    def add(self, event):
+        _record_usage(self.usage, event)
+        if event.type != "content_block_delta":
+            return None
+        if self._started is not None:
+            _record_first_token(self._fields, self._started)
+            self._started = None
+        self.parts.append(event.delta.text)
+        return event.delta.text
+    
+    def finish(self, limiter):
+        """Settle the admitted token estimate and return the finished script."""
+        limiter.settle(self.tokens, _billed_input_tokens(self.usage))
+        _count_tokens('script', self.usage)
+        return ''.join(self.parts).strip()
+
+
+def _script_params(content, system_prompt, structure_prompt, instructions):
+    """Messages API arguments for a script, laid out for prompt caching.
+    
+    The static instructions (system and structure prompt) and the document
+    each end in a cache breakpoint, so a repeat request for the same
+    document, or a retry, reads them from Anthropic's prompt cache instead
+    of paying for them again. The per-request instructions come last,
+    after the breakpoints, so changing them does not invalidate the cache.
+    """
+    return dict(
+        model=MODEL,
+        max_tokens=32000,
+        temperature=0.7,
+        system=[
+            {"type": "text", "text": f"{system_prompt}\n\n{structure_prompt}", "cache_control": CACHE_CONTROL}
+        ],
+        messages=[
+            {"role": "user", "content": [
+                {"type": "text", "text": f"Content: {content}", "cache_control": CACHE_CONTROL},
+                {"type": "text", "text": instructions},
+            ]}
+        ],
+        stream=True
+    )
+
+
+def _script_cache_key(cache, params):
+    return cache.key(MODEL, params['system'][0]['text'],
+                     *(block['text'] for block in params['messages'][0]['content']))
+
+
+def _resume_prefix(params, resume):
+    """Prefill the assistant turn with an interrupted script so Claude continues it.
+    
+    Returns the prefix (the API rejects a prefill ending in whitespace, so
+    it is stripped), or None when there is nothing to resume.
+    """
+    prefix = (resume or '').rstrip()
+    if not prefix:
+        return None
+    params['messages'].append({"role": "assistant", "content": prefix})
+    return prefix
+
+
+def _estimate_tokens(params):
+    """Rough input token count of a request (four characters per token) for admission control."""
+    texts = [params['system']] if isinstance(params['system'], str) else [b['text'] for b in params['system']]
+    for message in params['messages']:
+        content = message['content']
+        texts.extend([content] if isinstance(content, str) else [b['text'] for b in content])
+    return sum(map(len, texts)) // 4
+
+
+def _billed_input_tokens(usage):
+    """Input tokens that count against the rate limit; cache reads do not."""
+    if 'input_tokens' not in usage:
+        return None
+    return usage['input_tokens'] + (usage.get('cache_creation_input_tokens') or 0)
+
+
+def _should_retry(error):
+    if is_retryable(error):
+        return True
+    import anthropic
+    return isinstance(error, anthropic.APIConnectionError)
+
+
+def _record_usage(usage, event):
+    """Copy token counts from message_start / message_delta stream events into `usage`.
+    
+    Both events report running totals, so later values replace earlier ones.
+    """
+    if event.type == 'message_start':
+        source = getattr(event.message, 'usage', None)
+    elif event.type == 'message_delta':
+        source = getattr(event, 'usage', None)
+    else:
+        return
+    for field in USAGE_FIELDS:
+        value = getattr(source, field, None)
+        if value is not None:
+            usage[field] = value
+
+
+def _count_tokens(call, usage):
+    for field, kind in USAGE_FIELDS.items():
+        if usage.get(field):
+            LLM_TOKENS.inc(usage[field], call=call, kind=kind)
+
+
+def _record_first_token(fields, started):
+    first_token = time.perf_counter() - started
+    SCRIPT_FIRST_TOKEN_SECONDS.observe(first_token)
+    fields['first_token_ms'] = round(first_token * 1000, 1)
@@ -0,0 +1,140 @@
+"""Content-addressed file storage with a size/age quota and a background sweeper."""
+import os
+import re
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BYTES = REGISTRY.gauge('narrator_storage_bytes', 'Bytes kept in each storage directory', ('store',))
+STORAGE_EVICTIONS = REGISTRY.counter('narrator_storage_evictions_total', 'Files removed by the sweeper',
+                                     ('store', 'reason'))
+
+# Files written by FileStore.save: 32 hex characters of SHA-256 plus the extension
+CONTENT_NAME = re.compile(r'^[0-9a-f]{32}\.\w+$')
+TEMP_PREFIX = '.tmp-'
+# Last-use times are only refreshed this often, so serving a file rarely writes metadata
+TOUCH_INTERVAL = 60
+
+
+class FileStore:
+    """A directory of files kept under `max_bytes` and `max_age` seconds.
+
+    `save` names files after a hash of their content and writes them
+    atomically (temporary file, then rename), so concurrent identical saves
+    are harmless and readers never see a partial file. A file's mtime is
+    its last use: `sweep` removes files older than `max_age`, then the
+    least recently used ones until the directory fits in `max_bytes`.
+    Either limit may be None.
+    """
+
+    def __init__(self, name, directory, max_bytes=None, max_age=None):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, data, extension):
+        """Store `data` and return its filename (stable for identical content)."""
+        filename = hashlib.sha256(data).hexdigest()[:32] + extension
+        path = os.path.join(self.directory, filename)
+        if os.path.exists(path):
+            os.utime(path)
+            return filename
+
+        write_atomic(path, data)
+        return filename
+
+    def save_as(self, filename, data):
+        """Store `data` under `filename` (e.g. metadata named after a saved file), replacing it if present."""
+        write_atomic(os.path.join(self.directory, filename), data)
+        return filename
+
+    def exists(self, filename):
+        return os.path.isfile(os.path.join(self.directory, filename))
+
+    def touch(self, filename):
+        """Record that `filename` was just used."""
+        path = os.path.join(self.directory, filename)
+        try:
+            if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def sweep(self):
+        """Remove expired files, then least recently used ones while over the quota."""
+        now = time.time()
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.name))
+                except OSError:
+                    continue  # removed meanwhile
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, name in files:
+            if name.startswith(TEMP_PREFIX):
+                # Leftover of an interrupted save; live ones are seconds old
+                reason = 'abandoned' if now - mtime > 3600 else None
+            elif self.max_age is not None and now - mtime > self.max_age:
+                reason = 'expired'
+            elif self.max_bytes is not None and total > self.max_bytes:
+                reason = 'quota'
+            else:
+                reason = None
+            if reason and self._remove(name, reason):
+                total -= size
+
+        STORAGE_BYTES.set(total, store=self.name)
+        return total
+
+    def _remove(self, name, reason):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            return True  # another process swept it
+        except OSError:
+            logger.exception("Could not remove stored file", extra={'store': self.name, 'file': name})
+            return False
+        STORAGE_EVICTIONS.inc(store=self.name, reason=reason)
+        logger.info("Removed stored file", extra={'store': self.name, 'file': name, 'reason': reason})
+        return True
+
+
+def write_atomic(path, data):
+    """Write `data` to `path` through a temporary file, so readers never see a partial file."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def start_sweeper(stores, interval):
+    """Sweep `stores` now and then every `interval` seconds on a daemon thread."""
+    def run():
+        while True:
+            for store in stores:
+                try:
+                    store.sweep()
+                except Exception:
+                    logger.exception("Storage sweep failed", extra={'store': store.name})
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='storage-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,86 @@
+from .text_chunker import SENTENCE_BOUNDARY
+
+
+class SentenceSplitter:
+    """Cut completed sentences out of a stream of text deltas.
+
+    Deltas are buffered until a sentence or paragraph boundary at or past
+    `min_chars` is final, then everything up to that first boundary is
+    emitted as one segment, so the cuts depend only on the text and not on
+    how it arrived in deltas. The first segment uses `first_min_chars` so
+    the first audio can start as early as possible. Segments never exceed
+    `max_chars`; a run without any boundary is split on whitespace instead.
+    """
+
+    def __init__(self, min_chars=1500, max_chars=4000, first_min_chars=200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_min_chars = first_min_chars
+        self._buffer = ''
+        self._scan_from = 0
+        self._last_boundary = 0
+        self._emitted = 0
+
+    def feed(self, delta):
+        """Add a delta and return the list of segments it completed."""
+        self._buffer += delta
+        segments = []
+
+        while True:
+            threshold = self.first_min_chars if not self._emitted else self.min_chars
+            cut = 0
+            for match in SENTENCE_BOUNDARY.finditer(self._buffer, self._scan_from):
+                # A boundary at the very end may still grow (e.g. "..." or more whitespace)
+                if match.end() == len(self._buffer) or match.end() > self.max_chars:
+                    break
+                if match.end() >= threshold:
+                    cut = match.end()
+                    break
+                self._last_boundary = match.end()
+            # Boundaries before the last final one never change; rescan from there
+            self._scan_from = self._last_boundary
+
+            if cut:
+                segments.append(self._cut(cut))
+            elif len(self._buffer) > self.max_chars:
+                cut = self._last_boundary or self._buffer.rfind(' ', 0, self.max_chars) + 1 or self.max_chars
+                segments.append(self._cut(cut))
+            else:
+                break
+
+        return [segment for segment in segments if segment]
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended."""
+        segment = self._buffer.strip()
+        self._buffer = ''
+        self._scan_from = self._last_boundary = 0
+        return segment
+
+    def _cut(self, position):
+        segment = self._buffer[:position].strip()
+        self._buffer = self._buffer[position:]
+        self._scan_from = self._last_boundary = 0
+        self._emitted += 1
+        return segment
+
+
+def iter_segments(deltas, **kwargs):
+    """Yield speakable segments from an iterable of text deltas as soon as they complete."""
+    splitter = SentenceSplitter(**kwargs)
+    for delta in deltas:
+        yield from splitter.feed(delta)
+    remainder = splitter.flush()
+    if remainder:
+        yield remainder
+
+
+async def aiter_segments(deltas, **kwargs):
+    """Async variant of iter_segments for an async iterable of text deltas."""
+    splitter = SentenceSplitter(**kwargs)
+    async for delta in deltas:
+        for segment in splitter.feed(delta):
+            yield segment
+    remainder = splitter.flush()
+    if remainder:
+        yield remainder
@@ -0,0 +1,132 @@
+"""Sentence-aware text chunking shared by TTS and the content analyzer."""
+import re
+
+# Words that end in a period without ending the sentence
+ABBREVIATIONS = frozenset((
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'e.g', 'i.e', 'cf', 'fig', 'figs',
+    'eq', 'eqs', 'al', 'no', 'nos', 'vol', 'pp', 'ch', 'sec', 'inc', 'ltd', 'co', 'corp', 'approx',
+    'u.s', 'u.k', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+))
+
+
+def _boundary_pattern():
+    # One fixed-width lookbehind per abbreviation length (plus single-letter
+    # initials) keeps the whole boundary test inside the regex engine
+    by_length = {}
+    for word in ABBREVIATIONS:
+        by_length.setdefault(len(word), []).append(re.escape(word))
+    not_abbreviation = ''.join(
+        rf"(?<!\b(?:{'|'.join(sorted(words))})\.)" for _, words in sorted(by_length.items())
+    ) + r"(?<!\b[^\W\d_]\.)"
+    return re.compile(
+        rf"(?:\.{not_abbreviation}|[!?])[.!?]*[\"')\]]*\s+|\n\s*\n",
+        re.IGNORECASE
+    )
+
+
+# Sentence end (punctuation plus closing quotes/brackets, then whitespace,
+# not after an abbreviation or initial) or paragraph break
+SENTENCE_BOUNDARY = _boundary_pattern()
+
+
+def iter_sentences(text):
+    """Yield (start, end) spans of the sentences in `text`, trailing whitespace included."""
+    start = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        yield start, match.end()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token for English prose)."""
+    return (len(text) + 3) // 4
+
+
+def iter_chunks(text, max_chars=None, max_tokens=None, count_tokens=estimate_tokens, overlap=0):
+    """Lazily split `text` into chunks of whole sentences.
+
+    In character mode every chunk is guaranteed to be at most `max_chars`
+    long; sentences that are longer on their own are split on whitespace
+    (or mid-word as a last resort). In token-budget mode (`max_tokens`)
+    chunk sizes are measured with `count_tokens` instead. `overlap` repeats
+    up to that many trailing characters of the previous chunk at the start
+    of the next one. Runs in time linear in the length of the text.
+    """
+    if (max_chars is None) == (max_tokens is None):
+        raise ValueError("Pass exactly one of max_chars or max_tokens")
+    limit = max_chars if max_chars is not None else max_tokens
+    if limit < 1 or overlap >= (max_chars or float('inf')):
+        raise ValueError("Chunk limit must be positive and larger than the overlap")
+
+    def cost(start, end):
+        return end - start if max_chars is not None else count_tokens(text[start:end])
+
+    chunk_start = chunk_end = 0
+    chunk_cost = 0
+    for start, end in iter_sentences(text):
+        sentence_cost = cost(start, end)
+
+        if chunk_cost + sentence_cost > limit and chunk_end > chunk_start:
+            chunk = text[chunk_start:chunk_end].strip()
+            if chunk:
+                yield chunk
+            chunk_start = _overlap_start(text, chunk_start, chunk_end, overlap)
+            chunk_cost = cost(chunk_start, start)
+            if chunk_cost + sentence_cost > limit:
+                chunk_start, chunk_cost = start, 0
+
+        if sentence_cost > limit:
+            # Too long on its own (anything pending was emitted above)
+            yield from _split_long(text, start, end, limit, cost)
+            chunk_start = chunk_end = end
+            chunk_cost = 0
+            continue
+
+        chunk_end = end
+        chunk_cost += sentence_cost
+
+    chunk = text[chunk_start:chunk_end].strip()
+    if chunk:
+        yield chunk
+
+
+def _overlap_start(text, chunk_start, chunk_end, overlap):
+    """Where the next chunk starts: chunk_end, or up to `overlap` characters earlier on a word boundary."""
+    if not overlap:
+        return chunk_end
+    start = max(chunk_start, chunk_end - overlap)
+    space = text.find(' ', start, chunk_end)
+    return space + 1 if space >= 0 else chunk_end
+
+
+def _split_long(text, start, end, limit, cost):
+    """Split one oversized sentence into pieces within the limit, preferring whitespace."""
+    piece_start = piece_end = start
+    piece_cost = 0
+    for word in re.finditer(r'\S+\s*', text[start:end]):
+        word_start, word_end = start + word.start(), start + word.end()
+        word_cost = cost(word_start, word_end)
+
+        if piece_cost + word_cost > limit and piece_end > piece_start:
+            yield text[piece_start:piece_end].strip()
+            piece_start, piece_cost = word_start, 0
+
+        if word_cost > limit:
+            # A single "word" over the limit (e.g. a URL or base64 blob): cut it
+            step = max(1, (word_end - word_start) * limit // word_cost)
+            for cut in range(word_start, word_end, step):
+                piece = text[cut:min(cut + step, word_end)].strip()
+                if piece:
+                    yield piece
+            piece_start = piece_end = word_end
+            piece_cost = 0
+            continue
+
+        piece_end = word_end
+        piece_cost += word_cost
+
+    piece = text[piece_start:piece_end].strip()
+    if piece:
+        yield piece
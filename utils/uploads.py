@@ -0,0 +1,45 @@
+"""Hand uploaded PDFs to extraction without saving them to the upload folder."""
+import io
+import os
+import mmap
+import tempfile
+
+from flask import Request
+
+# Uploads up to this size stay in memory; larger ones go to an anonymous temporary file
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_MB', 16)) * 1024 * 1024
+
+
+class UploadRequest(Request):
+    """Request that buffers file uploads in memory up to UPLOAD_SPOOL_BYTES.
+
+    The request body is still capped by MAX_CONTENT_LENGTH while it is
+    streamed in, including chunked uploads without a Content-Length.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        size = content_length or total_content_length
+        if size is not None and size <= UPLOAD_SPOOL_BYTES:
+            return io.BytesIO()
+        return tempfile.TemporaryFile('w+b')
+
+
+def upload_source(file_storage):
+    """Return an upload as bytes, or as a read-only mmap of the temporary file it was spooled to.
+
+    The mmap stays valid after the request closes the file; pass it to
+    release_upload once it is no longer needed.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, io.BytesIO):
+        return stream.getvalue()
+    stream.flush()
+    if os.fstat(stream.fileno()).st_size == 0:
+        return b''
+    return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def release_upload(source):
+    """Free the buffer returned by upload_source."""
+    if isinstance(source, mmap.mmap):
+        source.close()